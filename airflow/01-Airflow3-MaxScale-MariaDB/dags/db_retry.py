@@ -0,0 +1,110 @@
+"""
+Reintentos de operaciones de DB tolerantes a failover, compartidos por los DAGs.
+
+Reemplaza el patrón "sleep fijo de 5s y reintentar cualquier excepción":
+
+  - Backoff exponencial con jitter completo, empezando en milisegundos: tras
+    un failover de MaxScale la mayoría de las operaciones se recupera en el
+    primer o segundo reintento, y el jitter evita que todas las tareas
+    reintenten en el mismo instante.
+  - Solo se reintentan errores transitorios de MySQL/MariaDB (conexión
+    perdida, conexión matada por MaxScale, primary en read-only). Un error
+    de SQL o de permisos falla enseguida. En Airflow 3 Variable/XCom pasan
+    por el API server: sus 5xx y errores de transporte también son
+    transitorios (el API server está esperando a la DB).
+  - Ante un error transitorio se descarta el pool del engine: las conexiones
+    que quedaron apuntando al primary viejo fallarían una por una.
+  - Deadline total en segundos, no cantidad de intentos.
+
+Uso:
+    from db_retry import db_op_with_retry
+
+    db_op_with_retry(lambda: Variable.set(k, v))
+    db_op_with_retry(lambda: insert(conn), engine=engine, deadline=10)
+"""
+import logging
+import random
+import re
+import time
+
+# Errores transitorios durante un failover
+TRANSIENT_MYSQL_ERRORS = {
+    2002,  # CR_CONNECTION_ERROR: no se pudo conectar (socket)
+    2003,  # CR_CONN_HOST_ERROR: no se pudo conectar (MaxScale/DB caído)
+    2006,  # CR_SERVER_GONE_ERROR: MySQL server has gone away
+    2013,  # CR_SERVER_LOST: Lost connection to MySQL server during query
+    1927,  # ER_CONNECTION_KILLED: MaxScale cierra las sesiones del primary viejo
+    1290,  # ER_OPTION_PREVENTS_STATEMENT: --read-only (primary degradado)
+    1792,  # ER_CANT_EXECUTE_IN_READ_ONLY_TRANSACTION
+    1836,  # ER_READ_ONLY_MODE
+}
+
+# Errores que llegan sin código (ej. re-lanzados por el API server de Airflow
+# con el mensaje de MySQL adentro)
+_TRANSIENT_PATTERN = re.compile(
+    r"\((?:%s)[,)]|server has gone away|lost connection to (?:mysql|server)|"
+    r"connection was killed|read-only|read_only|can't connect to mysql server" %
+    "|".join(str(code) for code in sorted(TRANSIENT_MYSQL_ERRORS)),
+    re.IGNORECASE,
+)
+
+
+# Errores de transporte HTTP (httpx) y de socket al hablar con el API server
+_TRANSIENT_TRANSPORT = {
+    "ConnectError", "ConnectTimeout", "ReadError", "ReadTimeout", "RemoteProtocolError",
+}
+
+
+def mysql_error_code(exc):
+    """Código de error MySQL de una excepción DBAPI o SQLAlchemy, o None."""
+    orig = getattr(exc, "orig", None) or exc
+    args = getattr(orig, "args", ())
+    if args and isinstance(args[0], int):
+        return args[0]
+    return None
+
+
+def is_transient(exc):
+    """True si la operación puede reintentarse (error de failover, no de la operación)."""
+    # Antes que el código: un OSError trae errno en args[0], no un código MySQL
+    if isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in _TRANSIENT_TRANSPORT:
+        return True
+    code = mysql_error_code(exc)
+    if code is not None:
+        return code in TRANSIENT_MYSQL_ERRORS
+    if getattr(exc, "connection_invalidated", False):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int) and status >= 500:
+        return True
+    return bool(_TRANSIENT_PATTERN.search(str(exc)))
+
+
+def db_op_with_retry(func, engine=None, deadline=30.0, base_delay=0.05, max_delay=2.0, log=None):
+    """
+    Ejecuta func() reintentando errores transitorios hasta `deadline` segundos.
+
+    Espera entre intentos: uniforme en [0, min(max_delay, base_delay * 2^n)]
+    (full jitter). Si se pasa `engine` (SQLAlchemy), se descarta su pool
+    antes de cada reintento. Al vencer el deadline, o ante un error no
+    transitorio, se re-lanza la excepción original.
+    """
+    log = log or logging.getLogger("airflow.task")
+    give_up_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                log.error(f"[RETRY] deadline de {deadline:g}s vencido tras {attempt + 1} intentos: {e}")
+                raise
+            if engine is not None:
+                engine.dispose()
+            delay = min(remaining, random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+            attempt += 1
+            log.warning(f"[RETRY {attempt}] {type(e).__name__}: {e} → reintento en {delay * 1000:.0f}ms")
+            time.sleep(delay)
@@ -11,20 +11,12 @@ import time
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 
-logger = logging.getLogger(__name__)
+from db_retry import db_op_with_retry
 
+logger = logging.getLogger(__name__)
 
-def _db_op_with_retry(func, max_retries=5, delay=5):
-    """Ejecuta una operación de DB con reintentos para sobrevivir failover."""
-    log = logging.getLogger("airflow.task")
-    for attempt in range(max_retries):
-        try:
-            return func()
-        except Exception as e:
-            log.warning(f"[RETRY {attempt+1}/{max_retries}] {e}")
-            if attempt < max_retries - 1:
-                time.sleep(delay)
-    raise Exception(f"Failed after {max_retries} retries")
+# Tiempo máximo que una operación espera a que termine el failover
+DB_OP_DEADLINE = 60
 
 
 def db_continuous_write(task_num, **context):
@@ -35,7 +27,7 @@ def db_continuous_write(task_num, **context):
     for i in range(6):
         ts = datetime.now().isoformat()
         key = f"ft_{task_num}_{i}"
-        _db_op_with_retry(lambda k=key, v=f"{hostname}|{ts}": Variable.set(k, v))
+        db_op_with_retry(lambda k=key, v=f"{hostname}|{ts}": Variable.set(k, v), deadline=DB_OP_DEADLINE)
         print(f"[WRITE {i+1}/6] {key} = {hostname} @ {ts}")
         time.sleep(5)
 
@@ -48,7 +40,8 @@ def db_continuous_read(task_num, **context):
     hostname = socket.gethostname()
 
     for i in range(6):
-        val = _db_op_with_retry(lambda idx=i: Variable.get(f"ft_1_{idx}", default_var="NOT_FOUND"))
+        val = db_op_with_retry(lambda idx=i: Variable.get(f"ft_1_{idx}", default_var="NOT_FOUND"),
+                               deadline=DB_OP_DEADLINE)
         print(f"[READ {i+1}/6] ft_1_{i} = {val} (from {hostname})")
         time.sleep(5)
 
@@ -64,7 +57,7 @@ def final_validation(**context):
     for t in range(1, 4):
         for i in range(6):
             key = f"ft_{t}_{i}"
-            val = _db_op_with_retry(lambda k=key: Variable.get(k, default_var=None))
+            val = db_op_with_retry(lambda k=key: Variable.get(k, default_var=None), deadline=DB_OP_DEADLINE)
             if val:
                 found += 1
                 print(f"  OK {key} = {val}")
@@ -0,0 +1,397 @@
+"""
+DAG de benchmark de failover: mide la ventana de indisponibilidad de la DB.
+
+Escribe y lee a alta frecuencia (rate_hz, default 20/s) contra la misma DB
+de metadata de Airflow (mismo sql_alchemy_conn: MaxScale o HAProxy según la
+topología), con un pool de conexiones propio y timeouts cortos. Cada operación
+se registra con timestamp, latencia y error; al final se calcula:
+
+  - max_unavailable_s: mayor hueco entre dos operaciones exitosas
+  - p99 de latencia total y durante el failover
+  - escrituras perdidas (confirmadas al cliente pero ausentes) y duplicadas
+    (reintento de una escritura cuyo commit sí llegó)
+
+El mismo archivo está en dags/ de los casos 01–04: el resumen queda en
+failover_bench_summary con la topología, para compararlos.
+
+El param retry_mode compara estrategias de reintento por operación:
+  none    → un intento por tick (mide la ventana cruda del failover)
+  fixed   → el patrón anterior de failover_test: sleep fijo de 5s, cualquier error
+  backoff → db_retry.db_op_with_retry (backoff con jitter desde 50ms + dispose del pool)
+Con fixed/backoff la latencia de una operación incluye sus reintentos, así
+que max_unavailable_s es el tiempo de recuperación que ve una tarea.
+
+Uso: disparar el DAG y, mientras write_load/read_load corren, provocar el
+failover (docker stop mariadb-primary, cortar MaxScale, etc.).
+"""
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import time
+
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+
+from db_retry import db_op_with_retry
+
+logger = logging.getLogger(__name__)
+
+WRITES_TABLE = "failover_bench_writes"
+OPS_TABLE = "failover_bench_ops"
+SUMMARY_TABLE = "failover_bench_summary"
+
+# Margen alrededor del primer/último error que se considera "durante el failover"
+FAILOVER_MARGIN_S = 2.0
+# Deadline por operación en los modos con reintento
+OP_DEADLINE_S = 60.0
+
+
+def _engine():
+    """Engine con pool propio: no compite con el pool del ORM de Airflow."""
+    from airflow.configuration import conf
+    from sqlalchemy import create_engine
+
+    return create_engine(
+        conf.get("database", "sql_alchemy_conn"),
+        pool_size=2,
+        max_overflow=0,
+        pool_recycle=300,
+        # Sin timeouts cortos una operación contra un primary caído queda
+        # colgada y la ventana medida sería el timeout TCP, no el failover.
+        connect_args={"connect_timeout": 2, "read_timeout": 3, "write_timeout": 3},
+    )
+
+
+def _fixed_retry(func, max_retries=5, delay=5):
+    """Línea base: el reintento previo de failover_test (sleep fijo, cualquier error)."""
+    for attempt in range(max_retries):
+        try:
+            return func()
+        except Exception:
+            if attempt == max_retries - 1:
+                raise
+            time.sleep(delay)
+
+
+def _wrap_op(op, mode, engine):
+    """Aplica la estrategia de reintento del param retry_mode a una operación."""
+    if mode == "fixed":
+        return lambda seq: _fixed_retry(lambda: op(seq))
+    if mode == "backoff":
+        return lambda seq: db_op_with_retry(lambda: op(seq), engine=engine, deadline=OP_DEADLINE_S)
+    return op
+
+
+def _topology(params):
+    """Etiqueta para comparar casos: param explícito o host de la conexión."""
+    from airflow.configuration import conf
+    from sqlalchemy.engine import make_url
+
+    if params.get("topology"):
+        return params["topology"]
+    if os.getenv("FAILOVER_BENCH_TOPOLOGY"):
+        return os.environ["FAILOVER_BENCH_TOPOLOGY"]
+    url = make_url(conf.get("database", "sql_alchemy_conn"))
+    return f"{url.host}:{url.port}"
+
+
+def setup_tables(**context):
+    """Crea las tablas del benchmark (idempotente)."""
+    from sqlalchemy import text
+
+    engine = _engine()
+    statements = [
+        # Sin UNIQUE en (run_id, seq): un duplicado es justamente lo que se mide
+        f"""CREATE TABLE IF NOT EXISTS {WRITES_TABLE} (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            run_id VARCHAR(250) NOT NULL,
+            seq INT NOT NULL,
+            client_ts DOUBLE NOT NULL,
+            writer VARCHAR(64) NOT NULL,
+            KEY idx_run_seq (run_id, seq)
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS {OPS_TABLE} (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            run_id VARCHAR(250) NOT NULL,
+            kind VARCHAR(8) NOT NULL,
+            seq INT NOT NULL,
+            started DOUBLE NOT NULL,
+            latency_ms DOUBLE NOT NULL,
+            ok BOOLEAN NOT NULL,
+            error VARCHAR(255),
+            host VARCHAR(64) NOT NULL,
+            KEY idx_run (run_id, kind)
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            run_id VARCHAR(250) PRIMARY KEY,
+            topology VARCHAR(128) NOT NULL,
+            retry_mode VARCHAR(16) NOT NULL DEFAULT 'none',
+            created_at DATETIME NOT NULL,
+            duration_s DOUBLE NOT NULL,
+            rate_hz DOUBLE NOT NULL,
+            writes_ok INT, writes_failed INT,
+            reads_ok INT, reads_failed INT,
+            write_max_unavailable_s DOUBLE,
+            read_max_unavailable_s DOUBLE,
+            write_p99_ms DOUBLE, write_p99_failover_ms DOUBLE,
+            read_p99_ms DOUBLE, read_p99_failover_ms DOUBLE,
+            lost_writes INT, duplicated_writes INT
+        )""",
+    ]
+
+    def create():
+        with engine.begin() as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
+
+    db_op_with_retry(create, engine=engine, deadline=OP_DEADLINE_S)
+    engine.dispose()
+    print(f"[SETUP] tablas listas ({WRITES_TABLE}, {OPS_TABLE}, {SUMMARY_TABLE})")
+
+
+def _run_load(kind, op, duration_s, rate_hz):
+    """
+    Ejecuta op(seq) a rate_hz durante duration_s. Sin ráfagas de recuperación:
+    si una operación se atrasa, la siguiente sale inmediatamente y el ritmo
+    se retoma desde ahí. op devuelve True si la operación avanza la secuencia.
+    """
+    interval = 1.0 / rate_hz
+    ops = []
+    seq = 0
+    deadline = time.monotonic() + duration_s
+    next_at = time.monotonic()
+
+    while time.monotonic() < deadline:
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            advance = op(seq)
+            ok, error = True, None
+        except Exception as e:
+            advance, ok, error = False, False, f"{type(e).__name__}: {e}"[:255]
+        ops.append((kind, seq, started, (time.perf_counter() - t0) * 1000, ok, error))
+        if advance:
+            seq += 1
+
+        next_at = max(next_at + interval, time.monotonic())
+        time.sleep(max(0.0, next_at - time.monotonic()))
+    return ops
+
+
+def _store_ops(engine, run_id, ops):
+    from sqlalchemy import text
+
+    hostname = socket.gethostname()
+    rows = [
+        {"run_id": run_id, "kind": k, "seq": s, "started": st, "latency_ms": lat,
+         "ok": ok, "error": err, "host": hostname}
+        for k, s, st, lat, ok, err in ops
+    ]
+
+    def insert():
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {OPS_TABLE} WHERE run_id = :run_id AND kind = :kind"),
+                         {"run_id": run_id, "kind": ops[0][0]})
+            for i in range(0, len(rows), 1000):
+                conn.execute(text(
+                    f"INSERT INTO {OPS_TABLE} (run_id, kind, seq, started, latency_ms, ok, error, host) "
+                    "VALUES (:run_id, :kind, :seq, :started, :latency_ms, :ok, :error, :host)"
+                ), rows[i:i + 1000])
+
+    if rows:
+        db_op_with_retry(insert, engine=engine, deadline=OP_DEADLINE_S)
+
+
+def write_load(**context):
+    """
+    Inserta una fila por operación con seq creciente. Si falla, reintenta el
+    MISMO seq en el próximo tick (como haría una aplicación): si el commit sí
+    había llegado y se perdió el ack, queda un duplicado.
+    """
+    from sqlalchemy import text
+
+    params = context["params"]
+    run_id = context["run_id"]
+    hostname = socket.gethostname()
+    engine = _engine()
+    stmt = text(f"INSERT INTO {WRITES_TABLE} (run_id, seq, client_ts, writer) "
+                "VALUES (:run_id, :seq, :ts, :writer)")
+
+    def op(seq):
+        with engine.begin() as conn:
+            conn.execute(stmt, {"run_id": run_id, "seq": seq, "ts": time.time(), "writer": hostname})
+        return True
+
+    ops = _run_load("write", _wrap_op(op, params["retry_mode"], engine),
+                    float(params["duration_s"]), float(params["rate_hz"]))
+    _store_ops(engine, run_id, ops)
+    engine.dispose()
+    failed = sum(1 for o in ops if not o[4])
+    print(f"[WRITE] {len(ops)} operaciones, {failed} fallidas, desde {hostname}")
+    return {"ops": len(ops), "failed": failed, "host": hostname}
+
+
+def read_load(**context):
+    """Lee el último seq escrito del run: mide disponibilidad y latencia de lectura."""
+    from sqlalchemy import text
+
+    params = context["params"]
+    run_id = context["run_id"]
+    engine = _engine()
+    stmt = text(f"SELECT MAX(seq) FROM {WRITES_TABLE} WHERE run_id = :run_id")
+
+    def op(seq):
+        with engine.connect() as conn:
+            conn.execute(stmt, {"run_id": run_id}).scalar()
+        return True
+
+    ops = _run_load("read", _wrap_op(op, params["retry_mode"], engine),
+                    float(params["duration_s"]), float(params["rate_hz"]))
+    _store_ops(engine, run_id, ops)
+    engine.dispose()
+    failed = sum(1 for o in ops if not o[4])
+    print(f"[READ] {len(ops)} operaciones, {failed} fallidas, desde {socket.gethostname()}")
+    return {"ops": len(ops), "failed": failed}
+
+
+def _p99(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))], 1)
+
+
+def _analyze_kind(ops):
+    """Métricas de un tipo de operación. ops: [(seq, started, latency_ms, ok)]."""
+    ops = sorted(ops, key=lambda o: o[1])
+    ok_ops = [o for o in ops if o[3]]
+    failed = [o for o in ops if not o[3]]
+
+    # Indisponibilidad: mayor hueco entre el fin de un éxito y el fin del siguiente
+    ends = [o[1] + o[2] / 1000 for o in ok_ops]
+    max_unavailable = max((b - a for a, b in zip(ends, ends[1:])), default=None)
+
+    p99_failover = None
+    if failed:
+        start = failed[0][1] - FAILOVER_MARGIN_S
+        end = failed[-1][1] + failed[-1][2] / 1000 + FAILOVER_MARGIN_S
+        p99_failover = _p99([o[2] for o in ops if start <= o[1] <= end])
+
+    return {
+        "ok": len(ok_ops),
+        "failed": len(failed),
+        "max_unavailable_s": round(max_unavailable, 3) if max_unavailable is not None else None,
+        "p99_ms": _p99([o[2] for o in ok_ops]),
+        "p99_failover_ms": p99_failover,
+    }
+
+
+def analyze(**context):
+    """Calcula indisponibilidad, p99 y escrituras perdidas/duplicadas; guarda el resumen."""
+    from sqlalchemy import text
+
+    params = context["params"]
+    run_id = context["run_id"]
+    engine = _engine()
+
+    def load():
+        with engine.connect() as conn:
+            ops = conn.execute(text(
+                f"SELECT kind, seq, started, latency_ms, ok FROM {OPS_TABLE} WHERE run_id = :run_id"
+            ), {"run_id": run_id}).fetchall()
+            written = conn.execute(text(
+                f"SELECT seq, COUNT(*) FROM {WRITES_TABLE} WHERE run_id = :run_id GROUP BY seq"
+            ), {"run_id": run_id}).fetchall()
+        return ops, dict(written)
+
+    ops, written = db_op_with_retry(load, engine=engine, deadline=OP_DEADLINE_S)
+    writes = _analyze_kind([(s, st, lat, bool(ok)) for k, s, st, lat, ok in ops if k == "write"])
+    reads = _analyze_kind([(s, st, lat, bool(ok)) for k, s, st, lat, ok in ops if k == "read"])
+
+    acked = {s for k, s, st, lat, ok in ops if k == "write" and ok}
+    lost = sorted(acked - set(written))
+    duplicated = sorted(s for s, n in written.items() if n > 1)
+
+    summary = {
+        "run_id": run_id,
+        "topology": _topology(params),
+        "retry_mode": params["retry_mode"],
+        "created_at": datetime.now(),
+        "duration_s": float(params["duration_s"]),
+        "rate_hz": float(params["rate_hz"]),
+        "writes_ok": writes["ok"], "writes_failed": writes["failed"],
+        "reads_ok": reads["ok"], "reads_failed": reads["failed"],
+        "write_max_unavailable_s": writes["max_unavailable_s"],
+        "read_max_unavailable_s": reads["max_unavailable_s"],
+        "write_p99_ms": writes["p99_ms"], "write_p99_failover_ms": writes["p99_failover_ms"],
+        "read_p99_ms": reads["p99_ms"], "read_p99_failover_ms": reads["p99_failover_ms"],
+        "lost_writes": len(lost), "duplicated_writes": len(duplicated),
+    }
+
+    def store():
+        columns = ", ".join(summary)
+        values = ", ".join(f":{c}" for c in summary)
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {SUMMARY_TABLE} WHERE run_id = :run_id"), {"run_id": run_id})
+            conn.execute(text(f"INSERT INTO {SUMMARY_TABLE} ({columns}) VALUES ({values})"), summary)
+
+    db_op_with_retry(store, engine=engine, deadline=OP_DEADLINE_S)
+    engine.dispose()
+
+    print(f"[BENCH] topología={summary['topology']} retry={summary['retry_mode']} run={run_id}")
+    print(f"  writes: ok={writes['ok']} failed={writes['failed']} "
+          f"max_unavailable={writes['max_unavailable_s']}s p99={writes['p99_ms']}ms "
+          f"p99_failover={writes['p99_failover_ms']}ms")
+    print(f"  reads:  ok={reads['ok']} failed={reads['failed']} "
+          f"max_unavailable={reads['max_unavailable_s']}s p99={reads['p99_ms']}ms "
+          f"p99_failover={reads['p99_failover_ms']}ms")
+    print(f"  lost_writes={len(lost)} {lost[:20]} duplicated_writes={len(duplicated)} {duplicated[:20]}")
+    return {k: v for k, v in summary.items() if k != "created_at"}
+
+
+with DAG(
+    dag_id="failover_benchmark",
+    description="Benchmark de failover: ventana de indisponibilidad, p99 y escrituras perdidas/duplicadas",
+    schedule=None,
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    tags=["ha", "failover", "benchmark"],
+    params={
+        "duration_s": 120,
+        "rate_hz": 20,
+        # Vacío: FAILOVER_BENCH_TOPOLOGY o host:puerto de sql_alchemy_conn
+        "topology": "",
+        # none | fixed | backoff (ver docstring)
+        "retry_mode": "none",
+    },
+    default_args={
+        # Las cargas no se reintentan: un retry reiniciaría la medición
+        "retries": 0,
+        "retry_delay": timedelta(seconds=15),
+    },
+) as dag:
+
+    setup = PythonOperator(
+        task_id="setup_tables",
+        python_callable=setup_tables,
+    )
+
+    writer = PythonOperator(
+        task_id="write_load",
+        python_callable=write_load,
+    )
+
+    reader = PythonOperator(
+        task_id="read_load",
+        python_callable=read_load,
+    )
+
+    report = PythonOperator(
+        task_id="analyze",
+        python_callable=analyze,
+        trigger_rule="all_done",
+    )
+
+    setup >> [writer, reader] >> report
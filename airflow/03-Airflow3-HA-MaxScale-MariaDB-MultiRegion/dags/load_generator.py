@@ -0,0 +1,67 @@
+"""
+DAG generador de carga para CeleryExecutor + Redis + MaxScale.
+
+Cada run expande N task instances (dynamic task mapping) que no hacen nada
+o duermen sleep_s segundos. No toca la DB desde la tarea: lo que se mide es
+el costo del scheduler, el broker y la DB de metadata por task instance.
+
+Lo dispara airflow/tools/load_driver.py a un ritmo fijo y después lee de la DB de
+metadata las latencias queued → running → success de cada task instance.
+El mismo archivo está en dags/ de los casos 01–04.
+"""
+from datetime import datetime, timedelta
+import time
+
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+
+
+def plan_tasks(**context):
+    """Genera los kwargs de cada task instance mapeada."""
+    params = context["params"]
+    n = int(params["tasks"])
+    sleep_s = float(params["sleep_s"])
+    print(f"[PLAN] {n} tareas, sleep={sleep_s}s")
+    return [{"index": i, "sleep_s": sleep_s} for i in range(n)]
+
+
+def work(index, sleep_s, **context):
+    """
+    No-op o sleep corto: el costo es el ciclo de vida de la task instance.
+    Retorna None para no escribir un XCom por task instance en la DB.
+    """
+    if sleep_s > 0:
+        time.sleep(sleep_s)
+
+
+with DAG(
+    dag_id="load_generator",
+    description="Generador de carga: N task instances mapeadas por run",
+    schedule=None,
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    # El driver dispara varios runs a la vez; el límite real lo pone
+    # la concurrencia de los workers, que es lo que se quiere medir.
+    max_active_runs=32,
+    max_active_tasks=256,
+    tags=["ha", "load", "benchmark"],
+    params={
+        "tasks": 50,
+        "sleep_s": 0.0,
+    },
+    default_args={
+        "retries": 0,
+        "retry_delay": timedelta(seconds=5),
+    },
+) as dag:
+
+    plan = PythonOperator(
+        task_id="plan",
+        python_callable=plan_tasks,
+    )
+
+    # Una task instance por elemento de la lista que devuelve plan
+    PythonOperator.partial(
+        task_id="work",
+        python_callable=work,
+    ).expand(op_kwargs=plan.output)
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+ FEDERATION SIMULATOR — Elección de líder con 2..N regiones (Caso 04)
+==============================================================================
+
+ Ejecuta el código REAL de site-controller/site_controller.py (una copia del
+ módulo por región) en modo federación contra fakes servidos localmente:
+
+   Healthcheck local → /hc/{region}/ready (salud derivada del mundo simulado)
+   Peers             → /sc/{observador}/{destino}/federation, delegado al
+                       handle_federation real del destino
+
+ Todo corre sobre un event loop con RELOJ VIRTUAL: cuando no hay I/O listo,
+ el reloj salta directo al próximo timer, así que un escenario de minutos
+ tarda milisegundos y el resultado es reproducible por seed.
+
+ MODELO DE SALUD:
+ ────────────────
+   Una región está sana si su Airflow responde y su MaxScale ve Master.
+   Con cooperative_monitoring_locks=majority_of_running, MaxScale solo ve
+   Master si alcanza a la mayoría de los votantes: las N regiones más el
+   árbitro (witness). Una región aislada de la mayoría queda unhealthy.
+
+ ESCENARIOS (la falla se inyecta tras el warmup):
+ ─────────────────────────────────────────────────
+   leader_isolated → la región líder queda aislada de todas (y del árbitro)
+   minority_split  → el líder queda en el lado chico de la red, con
+                     max(1, ⌊(N-1)/2⌋) regiones (sin el árbitro)
+   half_split      → N par partido a la mitad; el árbitro queda del lado
+                     sin el líder y desempata (N ≥ 4)
+   asymmetric_link → solo se corta el enlace líder ↔ segunda región (N ≥ 3)
+   leader_crash    → cae Airflow en la región líder
+   isolate_heal    → líder aislado 60s y luego la red se recupera
+
+ MÉTRICAS:
+ ─────────
+   converge     → falla → único ACTIVE = región esperada, estable hasta el fin
+   dual_active  → segundos con más de una región ACTIVE (debe ser 0)
+
+ USO:
+ ────
+   python simulation/federation_sim.py
+   python simulation/federation_sim.py --regions 3,5,8 --scenarios minority_split --seeds 50
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import selectors
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SITE_CONTROLLER_PATH = BASE_DIR / 'site-controller' / 'site_controller.py'
+
+REGION_NAMES = ("hornos", "sanlorenzo", "cordoba", "mendoza",
+                "rosario", "salta", "neuquen", "ushuaia")
+WARMUP = 40.0            # segundos virtuales antes de inyectar la falla
+DURATION = 200.0         # duración total del escenario (virtual)
+HEAL_AFTER = 60.0        # isolate_heal: duración del aislamiento
+SAMPLE_EVERY = 0.5       # resolución del muestreo de roles
+BLACKHOLE = 3600.0       # request "colgada" por partición (el cliente hace timeout)
+
+
+# =============================================================================
+# RELOJ VIRTUAL
+# =============================================================================
+
+class VirtualSelector(selectors.BaseSelector):
+    """
+    Selector que nunca bloquea en tiempo real mientras haya timers pendientes:
+    si no hay I/O listo, avanza el reloj virtual del loop hasta el próximo timer.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self.loop: Optional["VirtualClockLoop"] = None
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            return self._selector.select(1.0)
+        self.loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop cuyo time() es un reloj virtual que arranca en 0."""
+
+    def __init__(self):
+        self._virtual_now = 0.0
+        selector = VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+
+    def time(self) -> float:
+        return self._virtual_now
+
+    def advance(self, seconds: float):
+        self._virtual_now += max(0.0, seconds)
+
+
+# =============================================================================
+# MUNDO SIMULADO
+# =============================================================================
+
+WITNESS = "witness"
+
+
+class World:
+    """Red entre regiones + árbitro, y estado de Airflow por región."""
+
+    def __init__(self, regions: List[str]):
+        self.regions = regions
+        # Prioridad = posición en la lista (menor gana)
+        self.priority = {r: i for i, r in enumerate(regions)}
+        self.cut: Set[frozenset] = set()
+        self.airflow_up = {r: True for r in regions}
+
+    def link_up(self, a: str, b: str) -> bool:
+        return a == b or frozenset((a, b)) not in self.cut
+
+    def isolate(self, group: List[str]):
+        """Corta todo enlace entre group y el resto (árbitro incluido)."""
+        outside = [n for n in [*self.regions, WITNESS] if n not in group]
+        for a in group:
+            for b in outside:
+                self.cut.add(frozenset((a, b)))
+
+    def heal(self):
+        self.cut.clear()
+
+    def healthy(self, region: str) -> bool:
+        voters = [*self.regions, WITNESS]
+        reachable = sum(self.link_up(region, v) for v in voters)
+        return self.airflow_up[region] and reachable * 2 > len(voters)
+
+    def expected_leader(self) -> Optional[str]:
+        healthy = [r for r in self.regions if self.healthy(r)]
+        return min(healthy, key=lambda r: self.priority[r]) if healthy else None
+
+
+def build_fake_app(world: World, controllers: Dict[str, object]) -> web.Application:
+
+    async def local_ready(request):
+        region = request.match_info['r']
+        return web.json_response({"critical_healthy": world.healthy(region)})
+
+    async def federation(request):
+        o, t = request.match_info['o'], request.match_info['t']
+        if not world.link_up(o, t):
+            await asyncio.sleep(BLACKHOLE)
+        return await controllers[t].handle_federation(request)
+
+    app = web.Application()
+    app.router.add_get('/hc/{r}/ready', local_ready)
+    app.router.add_get('/sc/{o}/{t}/federation', federation)
+    return app
+
+
+_module_seq = itertools.count()
+
+
+def load_module(path: Path, **overrides):
+    """Carga una copia aislada del módulo (estado global propio) y aplica config."""
+    name = f"{path.stem}_fed_{next(_module_seq)}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for key, value in overrides.items():
+        if not hasattr(module, key):
+            raise AttributeError(f"{path.name} no define {key}")
+        setattr(module, key, value)
+    return module
+
+
+# =============================================================================
+# ESCENARIOS
+# =============================================================================
+
+SCENARIOS = ("leader_isolated", "minority_split", "half_split", "asymmetric_link",
+             "leader_crash", "isolate_heal")
+
+
+def applicable(scenario: str, n: int) -> bool:
+    if scenario == "asymmetric_link":
+        # Con 2 regiones no hay un tercero que observe el enlace cortado: ambas
+        # ven al árbitro, ambas quedan sanas y cada una elige a sí misma.
+        return n >= 3
+    if scenario == "half_split":
+        # Con N=2 la mitad es el líder solo: es leader_isolated
+        return n >= 4 and n % 2 == 0
+    return True
+
+
+def inject(world: World, scenario: str) -> List[Tuple[float, str]]:
+    """Aplica la falla y retorna acciones diferidas (offset, acción)."""
+    leader, rest = world.regions[0], world.regions[1:]
+    if scenario == "leader_isolated":
+        world.isolate([leader])
+    elif scenario == "minority_split":
+        size = max(1, (len(world.regions) - 1) // 2)
+        world.isolate([leader, *rest[:size - 1]])
+    elif scenario == "half_split":
+        world.isolate([leader, *rest[:len(world.regions) // 2 - 1]])
+    elif scenario == "asymmetric_link":
+        world.cut.add(frozenset((leader, rest[0])))
+    elif scenario == "leader_crash":
+        world.airflow_up[leader] = False
+    elif scenario == "isolate_heal":
+        world.isolate([leader])
+        return [(HEAL_AFTER, "heal")]
+    else:
+        raise ValueError(f"escenario desconocido: {scenario}")
+    return []
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+@dataclass
+class RunResult:
+    regions: int
+    scenario: str
+    seed: int
+    warmup_ok: bool
+    expected: Optional[str]
+    converge_s: Optional[float]
+    dual_active_s: float
+    max_active: int
+    transitions: int
+
+
+async def run_scenario(n: int, scenario: str, seed: int, check_interval: int) -> RunResult:
+    loop = asyncio.get_running_loop()
+    rng = random.Random(f"{n}:{scenario}:{seed}")
+    regions = list(REGION_NAMES[:n])
+    world = World(regions)
+    controllers: Dict[str, object] = {}
+
+    fake_app = build_fake_app(world, controllers)
+    runner = web.AppRunner(fake_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    for r in regions:
+        peers_raw = ",".join(
+            f"{p}:{world.priority[p]}:{base}/sc/{r}/{p}" for p in regions if p != r
+        )
+        module = load_module(
+            SITE_CONTROLLER_PATH,
+            REGION_NAME=r,
+            CHECK_INTERVAL=check_interval,
+            HEALTHCHECK_URL=f"{base}/hc/{r}",
+            FEDERATION_PEERS_RAW=peers_raw,
+            REGION_PRIORITY=world.priority[r],
+        )
+        module.PEERS = module._parse_peers()
+        controllers[r] = module
+
+    ctrls, tasks = [], []
+
+    async def staggered(ctrl, delay: float):
+        # Ticks desfasados entre regiones, como en un despliegue real
+        await asyncio.sleep(delay)
+        await ctrl.control_loop()
+
+    for r in regions:
+        ctrl = controllers[r].SiteController()
+        ctrl._docker_available = False
+        await ctrl.start()
+        ctrls.append(ctrl)
+        tasks.append(asyncio.create_task(staggered(ctrl, rng.uniform(0, check_interval))))
+
+    def roles() -> Dict[str, str]:
+        return {r: controllers[r].site_state["role"] for r in regions}
+
+    # --- warmup ---
+    t0 = loop.time()
+    while loop.time() - t0 < WARMUP:
+        await asyncio.sleep(SAMPLE_EVERY)
+    warm = roles()
+    warmup_ok = [r for r, role in warm.items() if role == "active"] == [regions[0]]
+
+    # --- falla + muestreo ---
+    fault_at = loop.time() + rng.uniform(0, check_interval)
+    while loop.time() < fault_at:
+        await asyncio.sleep(SAMPLE_EVERY)
+    deferred = inject(world, scenario)
+
+    dual_active_s, max_active, transitions = 0.0, 0, 0
+    converged_since: Optional[float] = None
+    previous = roles()
+    while loop.time() - t0 < DURATION:
+        now = loop.time() - fault_at
+        for offset, action in list(deferred):
+            if now >= offset and action == "heal":
+                world.heal()
+                deferred.remove((offset, action))
+        await asyncio.sleep(SAMPLE_EVERY)
+        current = roles()
+        transitions += sum(current[r] != previous[r] for r in regions)
+        previous = current
+        active = [r for r, role in current.items() if role == "active"]
+        max_active = max(max_active, len(active))
+        if len(active) > 1:
+            dual_active_s += SAMPLE_EVERY
+        expected = world.expected_leader()
+        if active == ([expected] if expected else []):
+            if converged_since is None:
+                converged_since = loop.time() - fault_at
+        else:
+            converged_since = None
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for ctrl in ctrls:
+        await ctrl.stop()
+    await runner.cleanup()
+
+    return RunResult(
+        regions=n,
+        scenario=scenario,
+        seed=seed,
+        warmup_ok=warmup_ok,
+        expected=world.expected_leader(),
+        converge_s=round(converged_since, 1) if converged_since is not None else None,
+        dual_active_s=round(dual_active_s, 1),
+        max_active=max_active,
+        transitions=transitions,
+    )
+
+
+def run_one(args: Tuple[int, str, int, int]) -> RunResult:
+    """Corre un escenario en un loop virtual nuevo (apto para ProcessPool)."""
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger().setLevel(logging.CRITICAL)
+    n, scenario, seed, check_interval = args
+    loop = VirtualClockLoop()
+    try:
+        return loop.run_until_complete(run_scenario(n, scenario, seed, check_interval))
+    finally:
+        loop.close()
+
+
+# =============================================================================
+# REPORTE
+# =============================================================================
+
+def _pct(values: List[float], q: float) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    return f"{values[min(len(values) - 1, int(q * len(values)))]:.1f}"
+
+
+def summarize(results: List[RunResult]) -> List[Dict]:
+    rows = []
+    groups: Dict[Tuple[int, str], List[RunResult]] = {}
+    for r in results:
+        groups.setdefault((r.regions, r.scenario), []).append(r)
+    for (n, scenario), runs in sorted(groups.items()):
+        valid = [r for r in runs if r.warmup_ok]
+        converges = [r.converge_s for r in valid if r.converge_s is not None]
+        rows.append({
+            "regions": n,
+            "scenario": scenario,
+            "runs": len(runs),
+            "warmup_failed": len(runs) - len(valid),
+            "converge_p50": _pct(converges, 0.5),
+            "converge_p95": _pct(converges, 0.95),
+            "converged": f"{len(converges)}/{len(valid)}",
+            "dual_active_runs": sum(r.dual_active_s > 0 for r in valid),
+            "dual_active_max_s": max((r.dual_active_s for r in valid), default=0.0),
+        })
+    return rows
+
+
+def print_report(rows: List[Dict]):
+    headers = ["regions", "scenario", "runs", "warmup_failed", "converge_p50", "converge_p95",
+               "converged", "dual_active_runs", "dual_active_max_s"]
+    widths = {h: max(len(h), *(len(str(row[h])) for row in rows)) for h in headers}
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    print("  ".join("─" * widths[h] for h in headers))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(widths[h]) for h in headers))
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def _csv(kind):
+    return lambda raw: [kind(v) for v in raw.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de federación N regiones")
+    parser.add_argument('--regions', type=_csv(int), default=list(range(2, 9)))
+    parser.add_argument('--scenarios', type=_csv(str), default=list(SCENARIOS))
+    parser.add_argument('--seeds', type=int, default=10, help="corridas por escenario y N")
+    parser.add_argument('--check-interval', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--json', help="guardar resultados crudos en este archivo")
+    args = parser.parse_args()
+
+    if any(n < 2 or n > len(REGION_NAMES) for n in args.regions):
+        parser.error(f"--regions debe estar entre 2 y {len(REGION_NAMES)}")
+    jobs = [
+        (n, scenario, seed, args.check_interval)
+        for n in args.regions for scenario in args.scenarios if applicable(scenario, n)
+        for seed in range(args.seeds)
+    ]
+
+    print(f"Corriendo {len(jobs)} escenarios en {args.workers} workers...")
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(run_one, jobs, chunksize=2))
+    else:
+        results = [run_one(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    print()
+    print_report(summarize(results))
+    print()
+    print(f"{len(results)} escenarios en {elapsed:.1f}s reales "
+          f"({DURATION:.0f}s virtuales c/u, CHECK_INTERVAL={args.check_interval}s)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+        print(f"Resultados crudos → {args.json}")
+
+
+if __name__ == '__main__':
+    main()
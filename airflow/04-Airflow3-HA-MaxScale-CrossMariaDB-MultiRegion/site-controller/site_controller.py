@@ -31,11 +31,29 @@
    Si la preferida cae, la otra se promueve.
    Esto evita que ambas se activen simultáneamente.
 
+ FEDERACIÓN (N regiones):
+ ────────────────────────
+   Con FEDERATION_PEERS cada site-controller conoce a todos los demás con su
+   prioridad, los consulta en paralelo (GET /federation) y elige líder de
+   forma determinista: la región sana con menor (prioridad, nombre).
+     - Observación indirecta: si un peer no responde, vale lo que reportan
+       de él los peers que sí responden (una partición de un solo enlace no
+       lo da por caído).
+     - Quórum: con 3+ regiones, para ser ACTIVE hay que alcanzar a la
+       mayoría de la federación (en un empate exacto desempata MaxScale).
+     - Handoff: no se promueve mientras un peer alcanzable siga ACTIVE.
+     - Fencing: si un peer ACTIVE deja de responder, se espera FENCING_DELAY
+       (lo que tarda en demotearse solo) antes de promover.
+   El modo de 2 regiones (PEER_HEALTHCHECK_URL + PREFERRED_REGION) es el
+   mismo algoritmo con prioridades 0 (preferida) y 1.
+
  CONFIGURACIÓN:
  ──────────────
    HEALTHCHECK_URL      → URL del healthcheck local
-   PEER_HEALTHCHECK_URL → URL del healthcheck de la otra región
-   PREFERRED_REGION     → true/false: soy la región preferida
+   PEER_HEALTHCHECK_URL → URL del healthcheck de la otra región (modo 2 regiones)
+   PREFERRED_REGION     → true/false: soy la región preferida (modo 2 regiones)
+   FEDERATION_PEERS     → nombre:prioridad:url_site_controller,... (modo N regiones)
+   REGION_PRIORITY      → prioridad propia (menor gana)
    SCHEDULER_CONTAINER  → Container a pausar/despausar
 """
 
@@ -43,7 +61,7 @@ import asyncio
 import logging
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 import aiohttp
 from aiohttp import web
@@ -65,6 +83,22 @@ PEER_HEALTHCHECK_URL = os.getenv('PEER_HEALTHCHECK_URL', '')
 # --- Región preferida ---
 PREFERRED_REGION = os.getenv('PREFERRED_REGION', 'false').lower() == 'true'
 
+# --- Federación N regiones ---
+# Formato: nombre:prioridad:url,... donde url es el site-controller del peer.
+# Ejemplo: FEDERATION_PEERS=sanlorenzo:1:http://site-controller-sanlorenzo:8100,
+#                           cordoba:2:http://site-controller-cordoba:8100
+# Todas las regiones deben tener la misma tabla de prioridades (menor gana).
+FEDERATION_PEERS_RAW = os.getenv('FEDERATION_PEERS', '')
+REGION_PRIORITY = int(os.getenv('REGION_PRIORITY', '0' if PREFERRED_REGION else '1'))
+PEER_TIMEOUT = float(os.getenv('PEER_TIMEOUT', '2'))
+# auto → quórum solo con 3+ regiones: con 2, perder al peer es justamente
+# el caso de failover y no puede bloquear la promoción.
+FEDERATION_QUORUM = os.getenv('FEDERATION_QUORUM', 'auto').lower()
+# Un peer ACTIVE que deja de responder puede seguir ACTIVE hasta que su propio
+# loop lo demotee: FAILOVER_THRESHOLD ticks (+ el timeout de sus consultas).
+# Promover antes de eso abriría una ventana con dos regiones ACTIVE.
+FENCING_DELAY = float(os.getenv('FENCING_DELAY', '0') or 0)
+
 # --- Containers a controlar ---
 SCHEDULER_CONTAINER = os.getenv('SCHEDULER_CONTAINER', 'airflow-scheduler-hornos')
 DAG_PROCESSOR_CONTAINER = os.getenv('DAG_PROCESSOR_CONTAINER', 'airflow-dag-processor-hornos')
@@ -74,6 +108,29 @@ FAILOVER_THRESHOLD = int(os.getenv('FAILOVER_THRESHOLD', '2'))
 RECOVERY_THRESHOLD = int(os.getenv('RECOVERY_THRESHOLD', '1'))
 
 
+
+
+def _parse_peers() -> List[Dict]:
+    """FEDERATION_PEERS → [{name, priority, url, kind}]; sin federación, el peer único."""
+    peers = []
+    for entry in FEDERATION_PEERS_RAW.split(','):
+        parts = entry.strip().split(':', 2)
+        if len(parts) == 3:
+            peers.append({
+                "name": parts[0], "priority": int(parts[1]),
+                "url": parts[2].rstrip('/'), "kind": "controller",
+            })
+    if not peers and PEER_HEALTHCHECK_URL:
+        peers.append({
+            "name": "peer", "priority": 1 if PREFERRED_REGION else 0,
+            "url": PEER_HEALTHCHECK_URL.rstrip('/'), "kind": "healthcheck",
+        })
+    return peers
+
+
+PEERS = _parse_peers()
+
+
 # =============================================================================
 # LOGGING
 # =============================================================================
@@ -100,9 +157,56 @@ site_state = {
     "last_check": None,
     "last_transition": None,
     "transition_reason": None,
+
+    # Federación: líder elegido, quórum y observación directa de cada peer
+    "leader": None,
+    "quorum": True,
+    "peers": {},
 }
 
 
+# =============================================================================
+# ELECCIÓN DE LÍDER
+# =============================================================================
+
+def merge_peer_views(observations: Dict[str, dict]) -> Dict[str, bool]:
+    """
+    Salud de cada peer desde esta región. La observación directa manda; si
+    el peer no responde, se considera sano si algún peer alcanzable lo
+    observó sano directamente (solo se propagan observaciones directas, así
+    un rumor no se sostiene a sí mismo).
+    """
+    healthy = {}
+    for name, obs in observations.items():
+        if obs["reachable"]:
+            healthy[name] = obs["healthy"]
+        else:
+            healthy[name] = any(
+                other["reachable"] and other.get("direct", {}).get(name) is True
+                for other in observations.values()
+            )
+    return healthy
+
+
+def elect_leader(priorities: Dict[str, int], healthy: Dict[str, bool]) -> Optional[str]:
+    """Región sana con menor (prioridad, nombre). None si no hay ninguna sana."""
+    candidates = [name for name, ok in healthy.items() if ok]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda name: (priorities[name], name))
+
+
+def fencing_delay() -> float:
+    """FENCING_DELAY explícito, o el peor caso de auto-demote de un peer."""
+    return FENCING_DELAY or FAILOVER_THRESHOLD * CHECK_INTERVAL + PEER_TIMEOUT + 1
+
+
+def quorum_required() -> bool:
+    if FEDERATION_QUORUM == 'auto':
+        return len(PEERS) + 1 >= 3
+    return FEDERATION_QUORUM == 'true'
+
+
 # =============================================================================
 # SITE CONTROLLER
 # =============================================================================
@@ -112,6 +216,10 @@ class SiteController:
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
         self._docker_available = os.path.exists('/var/run/docker.sock')
+        # Último rol observado de cada peer y hasta cuándo se lo considera
+        # posiblemente ACTIVE tras dejar de responder (reloj del event loop)
+        self.peer_roles: Dict[str, Optional[str]] = {}
+        self.fenced_until: Dict[str, float] = {}
 
     async def start(self):
         timeout = aiohttp.ClientTimeout(total=8)
@@ -121,8 +229,14 @@ class SiteController:
         logger.info(f"  SITE CONTROLLER — Región: {REGION_NAME}")
         logger.info("=" * 70)
         logger.info(f"  Healthcheck URL:      {HEALTHCHECK_URL}")
-        logger.info(f"  Peer Healthcheck URL: {PEER_HEALTHCHECK_URL or 'not configured'}")
-        logger.info(f"  Preferred Region:     {'✅ SÍ' if PREFERRED_REGION else '⛔ NO'}")
+        if FEDERATION_PEERS_RAW:
+            logger.info(f"  Federación:           {len(PEERS) + 1} regiones, prioridad propia={REGION_PRIORITY}")
+            for peer in PEERS:
+                logger.info(f"    - {peer['name']} (prioridad {peer['priority']}): {peer['url']}")
+            logger.info(f"  Quórum:               {'✅ requerido' if quorum_required() else '⛔ no'}")
+        else:
+            logger.info(f"  Peer Healthcheck URL: {PEER_HEALTHCHECK_URL or 'not configured'}")
+            logger.info(f"  Preferred Region:     {'✅ SÍ' if PREFERRED_REGION else '⛔ NO'}")
         logger.info(f"  Scheduler:            {SCHEDULER_CONTAINER}")
         logger.info(f"  Docker Socket:        {'✅' if self._docker_available else '⚠️ dry-run'}")
         logger.info("=" * 70)
@@ -147,24 +261,64 @@ class SiteController:
             logger.warning(f"No se pudo consultar healthcheck local: {e}")
             return {"critical_healthy": False, "needs_failover": False, "error": str(e)}
 
-    async def get_peer_health(self) -> dict:
+    async def get_peer_health(self, peer: dict) -> dict:
         """
-        Consulta el healthcheck de la otra región.
-        Si no está configurado o no responde, asumimos que el peer está caído.
+        Consulta un peer: GET /federation de su site-controller, o GET /ready
+        de su healthcheck en el modo de 2 regiones.
+        Si no responde dentro de PEER_TIMEOUT, el peer se da por no alcanzable.
         """
-        if not PEER_HEALTHCHECK_URL:
-            return {"critical_healthy": False, "reachable": False}
+        path = "/federation" if peer["kind"] == "controller" else "/ready"
         try:
-            url = f"{PEER_HEALTHCHECK_URL}/ready"
-            async with self.session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    data["reachable"] = True
-                    return data
-                return {"critical_healthy": False, "reachable": True}
+            timeout = aiohttp.ClientTimeout(total=PEER_TIMEOUT)
+            async with self.session.get(f"{peer['url']}{path}", timeout=timeout) as resp:
+                if resp.status != 200:
+                    return {"reachable": True, "healthy": False}
+                data = await resp.json()
         except Exception as e:
-            logger.debug(f"Peer healthcheck no disponible: {e}")
-            return {"critical_healthy": False, "reachable": False}
+            logger.debug(f"Peer {peer['name']} no disponible: {e}")
+            return {"reachable": False, "healthy": False}
+
+        if peer["kind"] == "healthcheck":
+            return {"reachable": True, "healthy": data.get("critical_healthy", False)}
+        if data.get("priority") != peer["priority"]:
+            logger.warning(
+                f"Peer {peer['name']} reporta prioridad {data.get('priority')} "
+                f"pero FEDERATION_PEERS dice {peer['priority']}"
+            )
+        return {
+            "reachable": True,
+            "healthy": bool(data.get("healthy")),
+            "role": data.get("role"),
+            "direct": data.get("direct", {}),
+        }
+
+    async def poll_peers(self) -> Dict[str, dict]:
+        """Consulta todos los peers en paralelo."""
+        results = await asyncio.gather(*(self.get_peer_health(p) for p in PEERS))
+        return {peer["name"]: obs for peer, obs in zip(PEERS, results)}
+
+    def blocking_peers(self, observations: Dict[str, dict]) -> List[str]:
+        """
+        Peers que pueden seguir ACTIVE: los alcanzables que reportan ACTIVE y
+        los que estaban ACTIVE y dejaron de responder hace menos de
+        fencing_delay() (todavía no garantizamos que se hayan demoteado).
+        """
+        now = asyncio.get_running_loop().time()
+        blocking = []
+        for name, obs in observations.items():
+            if obs["reachable"]:
+                self.fenced_until.pop(name, None)
+                self.peer_roles[name] = obs.get("role")
+                if obs.get("role") == "active":
+                    blocking.append(name)
+            elif self.peer_roles.get(name) == "active":
+                deadline = self.fenced_until.setdefault(name, now + fencing_delay())
+                if now < deadline:
+                    blocking.append(name)
+                else:
+                    self.peer_roles[name] = None
+                    self.fenced_until.pop(name, None)
+        return blocking
 
     # =========================================================================
     # ACCIONES: SCHEDULER
@@ -223,46 +377,66 @@ class SiteController:
         Loop principal:
 
         1. Consultar healthcheck local (¿MaxScale OK + Airflow OK?)
-        2. Consultar healthcheck peer (¿la otra región está sana?)
-        3. Decidir:
-           a) Yo sano + soy preferida → ACTIVE
-           b) Yo sano + peer caído → ACTIVE (failover)
-           c) Yo sano + peer sano + no soy preferida → PASSIVE
-           d) Yo no sano → PASSIVE
+        2. Consultar los peers en paralelo (¿qué regiones están sanas?)
+        3. Elegir líder entre las sanas: menor (prioridad, nombre)
+        4. Decidir:
+           a) Yo sano + soy el líder (+ quórum) → ACTIVE
+           b) Otro es el líder, o yo no sano → PASSIVE
+
+        Con 2 regiones y prioridades 0/1 equivale a la lógica original:
+        la preferida sana es ACTIVE; la otra solo si la preferida está caída.
         """
         logger.info(f"Iniciando control loop (intervalo={CHECK_INTERVAL}s)")
 
         while True:
             try:
                 # ─── 1. CONSULTAR ───
-                local_health, peer_health = await asyncio.gather(
+                local_health, observations = await asyncio.gather(
                     self.get_local_health(),
-                    self.get_peer_health(),
+                    self.poll_peers(),
                 )
 
                 critical_healthy = local_health.get("critical_healthy", False)
-                peer_critical_healthy = peer_health.get("critical_healthy", False)
-                peer_reachable = peer_health.get("reachable", False)
+                peer_healthy = merge_peer_views(observations)
+                peer_critical_healthy = any(peer_healthy.values())
+                peer_reachable = sum(obs["reachable"] for obs in observations.values())
+
+                # ─── 2. ELEGIR LÍDER ───
+                # (la preferida gana cuando ambas están sanas: esto no es
+                #  "retorno automático" sino resolución de quién manda)
+                priorities = {REGION_NAME: REGION_PRIORITY, **{p["name"]: p["priority"] for p in PEERS}}
+                leader = elect_leader(priorities, {REGION_NAME: critical_healthy, **peer_healthy})
+                # Empate exacto (N par partido a la mitad): desempata MaxScale, que
+                # solo ve Master en la mitad que alcanza al árbitro.
+                reach = (peer_reachable + 1) * 2
+                has_quorum = (
+                    not quorum_required()
+                    or reach > len(priorities)
+                    or (reach == len(priorities) and critical_healthy)
+                )
 
                 site_state["critical_healthy"] = critical_healthy
                 site_state["peer_healthy"] = peer_critical_healthy
+                site_state["leader"] = leader
+                site_state["quorum"] = has_quorum
+                site_state["peers"] = {
+                    name: {
+                        "reachable": obs["reachable"],
+                        "healthy": obs["healthy"] if obs["reachable"] else None,
+                        "healthy_merged": peer_healthy[name],
+                        "role": obs.get("role"),
+                    }
+                    for name, obs in observations.items()
+                }
                 site_state["last_check"] = datetime.now().isoformat()
 
-                # ─── 2. DETERMINAR SI DEBO SER ACTIVE ───
-                should_be_active = False
-
-                if critical_healthy:
-                    if PREFERRED_REGION:
-                        # Soy preferida y estoy sana → ACTIVE (siempre)
-                        should_be_active = True
-                    elif not peer_critical_healthy:
-                        # No soy preferida pero el peer está caído → ACTIVE
-                        should_be_active = True
-                    # else: no soy preferida y el peer está sano → PASSIVE
-                    # (la preferida gana, esto no es "retorno automático"
-                    #  sino resolución de quién manda cuando ambas están sanas)
-
-                # ─── 3. CONTADORES CON HYSTERESIS ───
+                # ─── 3. DETERMINAR SI DEBO SER ACTIVE ───
+                should_be_active = critical_healthy and leader == REGION_NAME and has_quorum
+                # Peers que todavía pueden estar ACTIVE: se espera su demote
+                # antes de promover (handoff + fencing)
+                active_peers = self.blocking_peers(observations)
+
+                # ─── 4. CONTADORES CON HYSTERESIS ───
                 if should_be_active:
                     site_state["consecutive_should_active"] += 1
                     site_state["consecutive_should_passive"] = 0
@@ -272,12 +446,15 @@ class SiteController:
 
                 current_role = site_state["role"]
 
-                # ─── 4. TRANSICIONES ───
+                # ─── 5. TRANSICIONES ───
 
                 # PROMOTE: passive → active
                 if current_role == "passive" and should_be_active:
-                    if site_state["consecutive_should_active"] >= RECOVERY_THRESHOLD:
-                        reason = "preferred_and_healthy" if PREFERRED_REGION else "peer_down_failover"
+                    if active_peers:
+                        logger.info(f"Líder electo, esperando demote/fencing de {', '.join(active_peers)}")
+                    elif site_state["consecutive_should_active"] >= RECOVERY_THRESHOLD:
+                        top = min(priorities.values())
+                        reason = "preferred_and_healthy" if REGION_PRIORITY == top else "peer_down_failover"
                         logger.info("=" * 70)
                         logger.info(f"  ✅ PROMOTE: {REGION_NAME} → ACTIVE ({reason})")
                         logger.info("=" * 70)
@@ -291,6 +468,8 @@ class SiteController:
                     if site_state["consecutive_should_passive"] >= FAILOVER_THRESHOLD:
                         if not critical_healthy:
                             reason = "local_unhealthy"
+                        elif not has_quorum:
+                            reason = "no_quorum"
                         else:
                             reason = "preferred_region_recovered"
                         logger.info("=" * 70)
@@ -301,7 +480,7 @@ class SiteController:
                         site_state["last_transition"] = datetime.now().isoformat()
                         site_state["transition_reason"] = reason
 
-                # ─── 5. SAFETY CHECKS (contra estado real del container) ───
+                # ─── 6. SAFETY CHECKS (contra estado real del container) ───
                 scheduler_paused = await self.is_container_paused(SCHEDULER_CONTAINER)
 
                 if site_state["role"] == "active" and scheduler_paused is True:
@@ -317,9 +496,10 @@ class SiteController:
                     f"[{REGION_NAME}] "
                     f"role={site_state['role']} | "
                     f"healthy={critical_healthy} | "
-                    f"peer_healthy={peer_critical_healthy} | "
-                    f"peer_reachable={peer_reachable} | "
-                    f"preferred={PREFERRED_REGION} | "
+                    f"peers_healthy={sum(peer_healthy.values())}/{len(PEERS)} | "
+                    f"peers_reachable={peer_reachable}/{len(PEERS)} | "
+                    f"leader={leader} | "
+                    f"quorum={has_quorum} | "
                     f"scheduler={'ON' if site_state['scheduler_running'] else 'OFF'}"
                 )
 
@@ -340,6 +520,10 @@ async def handle_health(request):
         "state": site_state,
         "config": {
             "preferred_region": PREFERRED_REGION,
+            "region_priority": REGION_PRIORITY,
+            "peers": {p["name"]: p["priority"] for p in PEERS},
+            "quorum_required": quorum_required(),
+            "fencing_delay_s": fencing_delay() if PEERS and PEERS[0]["kind"] == "controller" else None,
             "failover_threshold": FAILOVER_THRESHOLD,
             "recovery_threshold": RECOVERY_THRESHOLD,
         }
@@ -376,6 +560,24 @@ async def handle_role(request):
     return web.json_response({"region": REGION_NAME, "role": site_state["role"]})
 
 
+async def handle_federation(request):
+    """
+    GET /federation — Lo que consultan los demás site-controllers.
+    "direct" solo incluye peers observados directamente en el último ciclo.
+    """
+    return web.json_response({
+        "region": REGION_NAME,
+        "priority": REGION_PRIORITY,
+        "healthy": site_state["critical_healthy"],
+        "role": site_state["role"],
+        "direct": {
+            name: peer["healthy"]
+            for name, peer in site_state["peers"].items()
+            if peer["reachable"]
+        },
+    })
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -390,6 +592,7 @@ async def main():
     app.router.add_get('/health', handle_health)
     app.router.add_get('/region-health', handle_region_health)
     app.router.add_get('/role', handle_role)
+    app.router.add_get('/federation', handle_federation)
 
     runner = aiohttp.web_runner.AppRunner(app)
     await runner.setup()
@@ -400,6 +603,7 @@ async def main():
     logger.info("  GET /health        → Estado detallado")
     logger.info("  GET /region-health → Para HAProxy (200/503)")
     logger.info("  GET /role          → Solo el rol")
+    logger.info("  GET /federation    → Vista para los peers de la federación")
 
     try:
         await loop_task
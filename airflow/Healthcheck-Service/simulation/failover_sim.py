@@ -0,0 +1,794 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+ FAILOVER SIMULATOR — Harness determinista para healthcheck + site-controller
+==============================================================================
+
+ Ejecuta el código REAL de healthcheck.py y site_controller.py (una copia del
+ módulo por región) contra fakes servidos localmente:
+
+   MaxScale REST   → /v1/servers, /v1/servers/{id}, switchover
+   Airflow health  → /api/v2/monitor/health
+   Redis           → PING / PONG sobre TCP
+   Docker API      → inspect, pause/unpause y /events sobre unix socket
+
+ Todo corre sobre un event loop con RELOJ VIRTUAL: cuando no hay I/O listo,
+ el reloj salta directo al próximo timer. Los sleeps, ticks y timeouts HTTP
+ (8s) no consumen tiempo real, así que un escenario de minutos tarda
+ milisegundos y el resultado es reproducible por seed.
+
+ ESCENARIOS:
+ ───────────
+   none             → sin fallas (línea base de falsos failovers)
+   primary_crash    → cae la DB primary; MaxScale promueve la réplica
+   partition        → la región activa queda aislada de las demás
+   maxscale_outage  → cae el MaxScale de la región activa
+   flapping         → el MaxScale local pierde el Master por ráfagas cortas
+   dual_primary     → los MaxScale reportan Masters distintos
+   airflow_down     → cae Airflow en la región activa (DB sigue local)
+   airflow_brownout → Airflow de la región activa responde en 6s (SLO p95=2s)
+   airflow_down_both→ cae Airflow en las dos regiones: mover la DB no sirve
+
+ MÉTRICAS POR CONFIGURACIÓN DE THRESHOLDS:
+ ─────────────────────────────────────────
+   detection     → falla → primera transición de rol o switchover
+   converge      → falla → estado esperado estable (rol + scheduler real)
+   false_failover→ se movió el rol activo en un escenario que no lo requería
+   split_brain   → algún instante con >1 región activa o >1 scheduler corriendo
+
+ CHECK DE CONVERGENCIA:
+ ──────────────────────
+   Los escenarios que requieren failover (primary_crash, partition,
+   airflow_down, airflow_brownout) tienen que converger en todas las
+   corridas válidas. Si alguno no converge el simulador lista las corridas
+   y sale con código 1 (apto para CI).
+
+ USO:
+ ────
+   python simulation/failover_sim.py
+   python simulation/failover_sim.py --scenarios partition,flapping --seeds 50
+   python simulation/failover_sim.py --failure-thresholds 1,2 --failover-windows 0,10 --json out.json
+   python simulation/failover_sim.py --scenarios partition --seeds 1 --timeline-dir dump
+   python tools/timeline_merge.py dump/*/*.json   ← desglose por fase del incidente
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import selectors
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HEALTHCHECK_PATH = BASE_DIR / 'healthcheck' / 'healthcheck.py'
+SITE_CONTROLLER_PATH = BASE_DIR / 'site-controller' / 'site_controller.py'
+
+REGIONS = ("hornos", "sanlorenzo")
+WARMUP = 30.0            # segundos virtuales antes de inyectar la falla
+DURATION = 150.0         # duración total del escenario (virtual)
+SAMPLE_EVERY = 0.1       # resolución del muestreo de estado
+MAXSCALE_FAILOVER_DELAY = 5.0  # auto_failover de MaxScale tras perder el primary
+BLACKHOLE = 3600.0       # request "colgada" por partición (el cliente hace timeout)
+
+
+# =============================================================================
+# RELOJ VIRTUAL
+# =============================================================================
+
+class VirtualSelector(selectors.BaseSelector):
+    """
+    Selector que nunca bloquea en tiempo real mientras haya timers pendientes:
+    si no hay I/O listo, avanza el reloj virtual del loop hasta el próximo timer.
+    Los fakes corren en el mismo proceso sobre loopback/unix sockets, así que
+    cualquier I/O en vuelo ya está listo cuando se consulta con timeout 0.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self.loop: Optional["VirtualClockLoop"] = None
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # Sin timers: solo queda esperar I/O real (no debería ocurrir)
+            return self._selector.select(1.0)
+        self.loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop cuyo time() es un reloj virtual que arranca en 0."""
+
+    def __init__(self):
+        self._virtual_now = 0.0
+        selector = VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+
+    def time(self) -> float:
+        return self._virtual_now
+
+    def advance(self, seconds: float):
+        self._virtual_now += max(0.0, seconds)
+
+
+# =============================================================================
+# MUNDO SIMULADO
+# =============================================================================
+
+def _server_id(region: str) -> str:
+    return region.upper()
+
+
+def _region_of(server_id: str) -> str:
+    return server_id.lower()
+
+
+class World:
+    """Estado de la infraestructura simulada que consultan los fakes."""
+
+    def __init__(self):
+        self.master: Optional[str] = _server_id(REGIONS[0])
+        self.db_up = {_server_id(r): True for r in REGIONS}
+        self.maxscale_up = {r: True for r in REGIONS}
+        self.maxscale_lost_master = {r: False for r in REGIONS}
+        self.maxscale_master_override: Dict[str, Optional[str]] = {r: None for r in REGIONS}
+        self.airflow_up = {r: True for r in REGIONS}
+        self.airflow_delay = {r: 0.0 for r in REGIONS}
+        self.redis_up = {r: True for r in REGIONS}
+        self.isolated: Optional[str] = None
+        # Los containers arrancan pausados: ambas regiones parten como passive
+        self.paused = {c: True for r in REGIONS for c in containers_of(r)}
+        self.event_queues: Dict[str, List[asyncio.Queue]] = {r: [] for r in REGIONS}
+        self.stream_tasks: set = set()
+        self.switchovers: List[Tuple[float, str, bool]] = []
+        self.replication_lag = {_server_id(r): 0 for r in REGIONS}
+
+    # --- red ---
+    def link_up(self, a: str, b: str) -> bool:
+        return a == b or self.isolated not in (a, b)
+
+    # --- MaxScale ---
+    def server_state(self, maxscale: str, server_id: str) -> str:
+        if not self.db_up[server_id] or not self.link_up(maxscale, _region_of(server_id)):
+            return "Down"
+        master = self.maxscale_master_override[maxscale] or self.master
+        if self.maxscale_lost_master[maxscale] or (self.isolated == maxscale and not self.maxscale_master_override[maxscale]):
+            master = None
+        if server_id == master:
+            return "Master, Running"
+        return "Slave, Running"
+
+    def server_attributes(self, maxscale: str, server_id: str) -> dict:
+        state = self.server_state(maxscale, server_id)
+        attrs = {"state": state, "gtid_current_pos": f"0-1-{1000 - self.replication_lag[server_id]}"}
+        if "Slave" in state:
+            attrs["replication_lag"] = self.replication_lag[server_id]
+        return attrs
+
+    def switchover(self, maxscale: str, target: Optional[str] = None) -> bool:
+        visible = [s for s in self.db_up if self.server_state(maxscale, s) != "Down"]
+        if len(visible) < len(self.db_up) or self.master is None or target == self.master:
+            return False
+        if target is not None and target not in self.db_up:
+            return False
+        self.master = target or next(s for s in self.db_up if s != self.master)
+        return True
+
+    # --- Docker ---
+    def set_paused(self, region: str, container: str, paused: bool) -> bool:
+        if self.paused[container] == paused:
+            return False
+        self.paused[container] = paused
+        event = {
+            "Type": "container",
+            "Action": "pause" if paused else "unpause",
+            "Actor": {"Attributes": {"name": container}},
+        }
+        for queue in self.event_queues[region]:
+            queue.put_nowait(event)
+        return True
+
+
+def containers_of(region: str) -> Tuple[str, str]:
+    return (f"airflow-scheduler-{region}", f"airflow-dag-processor-{region}")
+
+
+# =============================================================================
+# FAKES (servidos localmente)
+# =============================================================================
+
+async def _network(world: World, observer: str, target: str):
+    """Partición: la request queda colgada hasta el timeout del cliente."""
+    if not world.link_up(observer, target):
+        await asyncio.sleep(BLACKHOLE)
+
+
+def build_fake_app(world: World) -> web.Application:
+    """
+    Una sola app HTTP por escenario. Cada (observador, destino) tiene su propio
+    prefijo para poder simular particiones por enlace:
+      /mx/{observador}/{maxscale}/v1/...   → MaxScale REST
+      /af/{region}/api/v2/monitor/health   → Airflow
+      /hc/{region}/ready                   → healthcheck real (montado aparte)
+    """
+
+    async def mx_server(request):
+        o, t = request.match_info['o'], request.match_info['t']
+        await _network(world, o, t)
+        if not world.maxscale_up[t]:
+            return web.Response(status=503)
+        sid = request.match_info['sid']
+        if sid not in world.db_up:
+            return web.Response(status=404)
+        return web.json_response({"data": {"id": sid, "attributes": world.server_attributes(t, sid)}})
+
+    async def mx_servers(request):
+        o, t = request.match_info['o'], request.match_info['t']
+        await _network(world, o, t)
+        if not world.maxscale_up[t]:
+            return web.Response(status=503)
+        return web.json_response({"data": [
+            {"id": sid, "attributes": world.server_attributes(t, sid)} for sid in world.db_up
+        ]})
+
+    async def mx_switchover(request):
+        o, t = request.match_info['o'], request.match_info['t']
+        await _network(world, o, t)
+        if not world.maxscale_up[t]:
+            return web.Response(status=503)
+        # ?<monitor>[&<target>] — mismo formato que la API de MaxScale
+        args = request.query_string.split('&')
+        ok = world.switchover(t, args[1] if len(args) > 1 else None)
+        world.switchovers.append((asyncio.get_running_loop().time(), o, ok))
+        if ok:
+            return web.Response(status=204)
+        return web.Response(status=500, text="switchover failed: cluster not fully visible")
+
+    async def airflow_health(request):
+        if world.airflow_delay[request.match_info['r']]:
+            await asyncio.sleep(world.airflow_delay[request.match_info['r']])
+        if world.airflow_up[request.match_info['r']]:
+            return web.json_response({"metadatabase": {"status": "healthy"}})
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get('/mx/{o}/{t}/v1/servers', mx_servers)
+    app.router.add_get('/mx/{o}/{t}/v1/servers/{sid}', mx_server)
+    app.router.add_post('/mx/{o}/{t}/v1/maxscale/modules/mariadbmon/switchover', mx_switchover)
+    app.router.add_get('/af/{r}/api/v2/monitor/health', airflow_health)
+    return app
+
+
+def build_docker_app(world: World, socket_region: Dict[str, str]) -> web.Application:
+    """Docker Engine API mínima; la región se deduce del unix socket de entrada."""
+
+    def region_of(request) -> str:
+        return socket_region[request.transport.get_extra_info('sockname')]
+
+    async def inspect(request):
+        c = request.match_info['c']
+        if c not in world.paused:
+            return web.Response(status=404)
+        return web.json_response({"State": {"Paused": world.paused[c], "Running": True}})
+
+    async def action(request):
+        c, a = request.match_info['c'], request.match_info['a']
+        if c not in world.paused or a not in ("pause", "unpause"):
+            return web.Response(status=404)
+        changed = world.set_paused(region_of(request), c, a == "pause")
+        return web.Response(status=204 if changed else 304)
+
+    async def events(request):
+        region = region_of(request)
+        queue: asyncio.Queue = asyncio.Queue()
+        world.event_queues[region].append(queue)
+        world.stream_tasks.add(asyncio.current_task())
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        try:
+            while True:
+                event = await queue.get()
+                await resp.write((json.dumps(event) + "\n").encode())
+        except asyncio.CancelledError:
+            return resp
+        finally:
+            world.event_queues[region].remove(queue)
+            world.stream_tasks.discard(asyncio.current_task())
+
+    app = web.Application()
+    app.router.add_get('/containers/{c}/json', inspect)
+    app.router.add_post('/containers/{c}/{a}', action)
+    app.router.add_get('/events', events)
+    return app
+
+
+async def start_fake_redis(world: World, region: str) -> asyncio.AbstractServer:
+    async def handle(reader, writer):
+        try:
+            await reader.read(64)
+            if world.redis_up[region]:
+                writer.write(b"+PONG\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+# =============================================================================
+# CARGA DE LOS SERVICIOS REALES
+# =============================================================================
+
+_module_seq = itertools.count()
+
+
+def load_module(path: Path, **overrides):
+    """Carga una copia aislada del módulo (estado global propio) y aplica config."""
+    name = f"{path.stem}_sim_{next(_module_seq)}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for key, value in overrides.items():
+        if not hasattr(module, key):
+            raise AttributeError(f"{path.name} no define {key}")
+        setattr(module, key, value)
+    return module
+
+
+# =============================================================================
+# ESCENARIOS
+# =============================================================================
+
+@dataclass
+class Scenario:
+    name: str
+    # Región que debería quedar ACTIVE al final
+    expect_active: str
+    # ¿El escenario requiere mover el rol activo?
+    failover_expected: bool
+    # (offset desde la falla, acción sobre el mundo)
+    schedule: List[Tuple[float, Callable[[World], None]]] = field(default_factory=list)
+
+
+def _set(attr: str, key, value):
+    def apply(world: World):
+        getattr(world, attr)[key] = value
+    return apply
+
+
+def _promote(server_id: str):
+    def apply(world: World):
+        world.master = server_id
+    return apply
+
+
+def build_scenario(name: str, rng: random.Random) -> Scenario:
+    a, b = REGIONS
+    if name == "none":
+        return Scenario(name, a, False)
+    if name == "primary_crash":
+        return Scenario(name, b, True, [
+            (0.0, _set("db_up", _server_id(a), False)),
+            (MAXSCALE_FAILOVER_DELAY + rng.uniform(0, 2), _promote(_server_id(b))),
+        ])
+    if name == "partition":
+        def isolate(world: World):
+            world.isolated = a
+        return Scenario(name, b, True, [
+            (0.0, isolate),
+            (MAXSCALE_FAILOVER_DELAY + rng.uniform(0, 2), _promote(_server_id(b))),
+        ])
+    if name == "maxscale_outage":
+        return Scenario(name, a, False, [(0.0, _set("maxscale_up", a, False))])
+    if name == "flapping":
+        schedule, t = [], 0.0
+        while t < DURATION - WARMUP:
+            blip = rng.uniform(1.0, 4.0)
+            schedule.append((t, _set("maxscale_lost_master", a, True)))
+            schedule.append((t + blip, _set("maxscale_lost_master", a, False)))
+            t += blip + rng.uniform(8.0, 25.0)
+        return Scenario(name, a, False, schedule)
+    if name == "dual_primary":
+        return Scenario(name, a, False, [(0.0, _set("maxscale_master_override", b, _server_id(b)))])
+    if name == "airflow_down":
+        return Scenario(name, b, True, [(0.0, _set("airflow_up", a, False))])
+    if name == "airflow_brownout":
+        return Scenario(name, b, True, [(0.0, _set("airflow_delay", a, 6.0))])
+    if name == "airflow_down_both":
+        return Scenario(name, a, False, [(0.0, _set("airflow_up", a, False)),
+                                         (0.0, _set("airflow_up", b, False))])
+    raise ValueError(f"escenario desconocido: {name}")
+
+
+SCENARIOS = ("none", "primary_crash", "partition", "maxscale_outage",
+             "flapping", "dual_primary", "airflow_down", "airflow_brownout", "airflow_down_both")
+
+
+# =============================================================================
+# EJECUCIÓN DE UN ESCENARIO
+# =============================================================================
+
+@dataclass
+class ThresholdConfig:
+    failure_threshold: int      # healthcheck: fallos antes de unhealthy
+    failover_window: float      # controller: segundos antes de demote
+    switchover_window: float    # controller: segundos antes de switchover
+    recovery_window: float = 0.0
+    check_interval: int = 10
+
+    def label(self) -> str:
+        return (f"ft={self.failure_threshold} fw={self.failover_window:g}s "
+                f"sw={self.switchover_window:g}s")
+
+
+@dataclass
+class RunResult:
+    config: str
+    scenario: str
+    seed: int
+    warmup_ok: bool
+    detection_s: Optional[float]
+    converge_s: Optional[float]
+    false_failover: bool
+    split_brain: bool
+    split_brain_s: float
+    switchovers: int
+    expects_failover: bool
+
+
+def dump_timelines(directory: str, modules: Dict[str, object], loop: asyncio.AbstractEventLoop):
+    """Guarda el timeline de cada servicio con el mismo formato que GET /timeline."""
+    os.makedirs(directory, exist_ok=True)
+    for label, module in modules.items():
+        service, region = label.split('@')
+        with open(os.path.join(directory, f"{service}-{region}.json"), 'w') as f:
+            json.dump({
+                "region": region,
+                "service": service,
+                "clock": {"monotonic": loop.time(), "wall": time.time()},
+                "capacity": module.TIMELINE_SIZE,
+                "events": list(module.timeline),
+            }, f)
+
+
+async def run_scenario(name: str, seed: int, cfg: ThresholdConfig,
+                       timeline_dir: Optional[str] = None) -> RunResult:
+    loop = asyncio.get_running_loop()
+    rng = random.Random(f"{name}:{seed}")
+    world = World()
+    tmpdir = tempfile.mkdtemp(prefix="fsim-")
+
+    # --- fakes ---
+    fake_app = build_fake_app(world)
+    socket_region = {os.path.join(tmpdir, f"docker-{r}.sock"): r for r in REGIONS}
+    docker_app = build_docker_app(world, socket_region)
+    redis_servers = {r: await start_fake_redis(world, r) for r in REGIONS}
+
+    # --- servicios reales (una copia por región) ---
+    healthchecks, controllers = {}, {}
+    fake_runner = None
+    for r in REGIONS:
+        healthchecks[r] = load_module(
+            HEALTHCHECK_PATH,
+            REGION_NAME=r,
+            CHECK_INTERVAL=cfg.check_interval,
+            ENABLED_CHECKS=['airflow', 'redis', 'db_primary'],
+            CRITICAL_CHECKS=['airflow', 'db_primary'],
+            FAILURE_THRESHOLD=cfg.failure_threshold,
+            REDIS_HOST='127.0.0.1',
+            REDIS_PORT=redis_servers[r].sockets[0].getsockname()[1],
+            LOCAL_DB_SERVER=_server_id(r),
+            LATENCY_SLOS={'airflow': {'p95': 2.0}},
+        )
+        fake_app.router.add_get(f'/hc/{r}/ready', healthchecks[r].handle_ready)
+
+    fake_runner = web.AppRunner(fake_app, access_log=None)
+    await fake_runner.setup()
+    fake_site = web.TCPSite(fake_runner, '127.0.0.1', 0)
+    await fake_site.start()
+    base = f"http://127.0.0.1:{fake_runner.addresses[0][1]}"
+
+    docker_runner = web.AppRunner(docker_app, access_log=None)
+    await docker_runner.setup()
+    for path in socket_region:
+        await web.UnixSite(docker_runner, path).start()
+
+    for r in REGIONS:
+        hc = healthchecks[r]
+        hc.AIRFLOW_URL = f"{base}/af/{r}"
+        hc.MAXSCALE_URL = f"{base}/mx/{r}/{r}"
+        # La región propia primero, como en docker-compose.yml
+        maxscale_urls = [f"{base}/mx/{r}/{t}" for t in sorted(REGIONS, key=lambda t: t != r)]
+        scheduler, dag_processor = containers_of(r)
+        controllers[r] = load_module(
+            SITE_CONTROLLER_PATH,
+            REGION_NAME=r,
+            CHECK_INTERVAL=cfg.check_interval,
+            HEALTHCHECK_URL=f"{base}/hc/{r}",
+            PEER_HEALTHCHECK_URLS={_server_id(t): f"{base}/hc/{t}" for t in REGIONS if t != r},
+            MAXSCALE_URLS=maxscale_urls,
+            MAXSCALE_URL=maxscale_urls[0],
+            LOCAL_DB_SERVER=_server_id(r),
+            SCHEDULER_CONTAINER=scheduler,
+            DAG_PROCESSOR_CONTAINER=dag_processor,
+            MANAGED_CONTAINERS=(scheduler, dag_processor),
+            STANDBY_PAUSED_CONTAINERS=(scheduler, dag_processor),
+            AIRFLOW_URL=f"{base}/af/{r}",
+            # La latencia de promoción se mide con timestamps de la DB de
+            # Airflow (reloj de pared): no tiene sentido con reloj virtual.
+            PROMOTION_PROBE_TIMEOUT=0,
+            DOCKER_SOCKET=os.path.join(tmpdir, f"docker-{r}.sock"),
+            FAILOVER_WINDOW=cfg.failover_window,
+            SWITCHOVER_WINDOW=cfg.switchover_window,
+            RECOVERY_WINDOW=cfg.recovery_window,
+        )
+
+    tasks: List[asyncio.Task] = []
+    checkers, ctrls = [], []
+    for r in REGIONS:
+        checker = healthchecks[r].HealthChecks()
+        await checker.start()
+        checkers.append(checker)
+        tasks.append(asyncio.create_task(healthchecks[r].check_loop(checker)))
+    for r in REGIONS:
+        ctrl = controllers[r].SiteController()
+        await ctrl.start()
+        ctrls.append(ctrl)
+        tasks.append(asyncio.create_task(ctrl.control_loop()))
+
+    # --- muestreo + inyección de fallas ---
+    scenario = build_scenario(name, rng)
+    t0 = loop.time()
+    fault_at = t0 + WARMUP + rng.uniform(0, cfg.check_interval)
+    schedule = sorted(((fault_at + off, act) for off, act in scenario.schedule), key=lambda x: x[0])
+
+    def roles() -> Dict[str, str]:
+        return {r: controllers[r].site_state["role"] for r in REGIONS}
+
+    def running(r: str) -> bool:
+        return not world.paused[containers_of(r)[0]]
+
+    pre_fault_roles: Optional[Dict[str, str]] = None
+    warmup_ok = False
+    detection = None
+    converged_since = None
+    false_failover = False
+    split_brain_s = 0.0
+    switchovers_before = 0
+
+    while loop.time() - t0 < DURATION:
+        now = loop.time()
+        while schedule and schedule[0][0] <= now:
+            schedule.pop(0)[1](world)
+
+        current = roles()
+        if pre_fault_roles is None and now >= fault_at:
+            pre_fault_roles = current
+            warmup_ok = current[REGIONS[0]] == "active" and current[REGIONS[1]] == "passive"
+            switchovers_before = len(world.switchovers)
+
+        if pre_fault_roles is not None:
+            executed = len(world.switchovers) > switchovers_before
+            if detection is None and (current != pre_fault_roles or executed):
+                detection = now - fault_at
+            if not scenario.failover_expected and (
+                    current[REGIONS[0]] != "active" or any(ok for _, _, ok in world.switchovers[switchovers_before:])):
+                false_failover = True
+
+            actives = sum(1 for r in REGIONS if current[r] == "active")
+            schedulers = sum(1 for r in REGIONS if running(r))
+            if actives > 1 or schedulers > 1:
+                split_brain_s += SAMPLE_EVERY
+
+            expected = all(
+                (current[r] == "active") == (r == scenario.expect_active)
+                and running(r) == (r == scenario.expect_active)
+                for r in REGIONS
+            )
+            if expected:
+                if converged_since is None:
+                    converged_since = now - fault_at
+            else:
+                converged_since = None
+
+        await asyncio.sleep(SAMPLE_EVERY)
+
+    if timeline_dir:
+        dump_timelines(
+            os.path.join(timeline_dir, f"{name}-{seed}-{cfg.label().replace(' ', '_')}"),
+            {**{f"healthcheck@{r}": healthchecks[r] for r in REGIONS},
+             **{f"site-controller@{r}": controllers[r] for r in REGIONS}},
+            loop,
+        )
+
+    # --- cleanup ---
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for ctrl in ctrls:
+        await ctrl.stop()
+    for checker in checkers:
+        await checker.stop()
+    for stream in list(world.stream_tasks):
+        stream.cancel()
+    await asyncio.gather(*world.stream_tasks, return_exceptions=True)
+    await fake_runner.cleanup()
+    await docker_runner.cleanup()
+    for server in redis_servers.values():
+        server.close()
+        await server.wait_closed()
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return RunResult(
+        config=cfg.label(),
+        scenario=name,
+        seed=seed,
+        warmup_ok=warmup_ok,
+        detection_s=detection,
+        converge_s=converged_since if scenario.failover_expected else None,
+        false_failover=false_failover,
+        split_brain=split_brain_s > 0,
+        split_brain_s=round(split_brain_s, 1),
+        switchovers=len(world.switchovers) - switchovers_before,
+        expects_failover=scenario.failover_expected,
+    )
+
+
+def run_one(args: Tuple[str, int, ThresholdConfig, Optional[str]]) -> RunResult:
+    """Corre un escenario en un loop virtual nuevo (apto para ProcessPool)."""
+    # Configurar el root logger antes de cargar los módulos: su basicConfig
+    # queda sin efecto y los logs de cada región no inundan la salida.
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger().setLevel(logging.CRITICAL)
+    name, seed, cfg, timeline_dir = args
+    loop = VirtualClockLoop()
+    try:
+        return loop.run_until_complete(run_scenario(name, seed, cfg, timeline_dir))
+    finally:
+        loop.close()
+
+
+# =============================================================================
+# REPORTE
+# =============================================================================
+
+def _pct(values: List[float], q: float) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    return f"{values[min(len(values) - 1, int(q * len(values)))]:.1f}"
+
+
+def summarize(results: List[RunResult]) -> List[Dict]:
+    rows = []
+    groups: Dict[Tuple[str, str], List[RunResult]] = {}
+    for r in results:
+        groups.setdefault((r.config, r.scenario), []).append(r)
+    for (config, scenario), runs in groups.items():
+        valid = [r for r in runs if r.warmup_ok]
+        detections = [r.detection_s for r in valid if r.detection_s is not None]
+        converges = [r.converge_s for r in valid if r.converge_s is not None]
+        rows.append({
+            "config": config,
+            "scenario": scenario,
+            "runs": len(runs),
+            "warmup_failed": len(runs) - len(valid),
+            "detection_p50": _pct(detections, 0.5),
+            "detection_p95": _pct(detections, 0.95),
+            "converge_p50": _pct(converges, 0.5),
+            "converge_p95": _pct(converges, 0.95),
+            "converged": f"{len(converges)}/{len(valid)}" if runs[0].expects_failover else "-",
+            "false_failover_rate": (
+                f"{sum(r.false_failover for r in valid) / len(valid):.2f}" if valid else "-"
+            ),
+            "split_brain": sum(r.split_brain for r in valid),
+        })
+    return rows
+
+
+def unconverged(results: List[RunResult]) -> List[RunResult]:
+    """Corridas válidas de escenarios con failover esperado que no convergieron."""
+    return [r for r in results if r.expects_failover and r.warmup_ok and r.converge_s is None]
+
+
+def print_report(rows: List[Dict]):
+    headers = ["config", "scenario", "runs", "detection_p50", "detection_p95",
+               "converge_p50", "converge_p95", "converged", "false_failover_rate", "split_brain"]
+    widths = {h: max(len(h), *(len(str(row[h])) for row in rows)) for h in headers}
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    print("  ".join("─" * widths[h] for h in headers))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(widths[h]) for h in headers))
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def _csv(kind):
+    return lambda raw: [kind(v) for v in raw.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador determinista de failover")
+    parser.add_argument('--scenarios', type=_csv(str), default=list(SCENARIOS))
+    parser.add_argument('--seeds', type=int, default=20, help="corridas por escenario y config")
+    parser.add_argument('--failure-thresholds', type=_csv(int), default=[1, 2, 3])
+    parser.add_argument('--failover-windows', type=_csv(float), default=[0.0, 10.0, 20.0])
+    parser.add_argument('--switchover-windows', type=_csv(float), default=[20.0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--json', help="guardar resultados crudos en este archivo")
+    parser.add_argument('--timeline-dir', help="guardar el /timeline de cada servicio por corrida")
+    args = parser.parse_args()
+
+    configs = [
+        ThresholdConfig(ft, fw, sw)
+        for ft, fw, sw in itertools.product(args.failure_thresholds, args.failover_windows, args.switchover_windows)
+    ]
+    jobs = [(name, seed, cfg, args.timeline_dir) for cfg in configs for name in args.scenarios for seed in range(args.seeds)]
+
+    print(f"Corriendo {len(jobs)} escenarios ({len(configs)} configs × "
+          f"{len(args.scenarios)} escenarios × {args.seeds} seeds) en {args.workers} workers...")
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(run_one, jobs, chunksize=4))
+    else:
+        results = [run_one(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    print()
+    print_report(summarize(results))
+    print()
+    print(f"{len(results)} escenarios en {elapsed:.1f}s reales "
+          f"({len(results) / elapsed * 60:.0f} escenarios/min, "
+          f"{DURATION:.0f}s virtuales c/u)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+        print(f"Resultados crudos → {args.json}")
+
+    failed = unconverged(results)
+    if failed:
+        print()
+        print(f"❌ {len(failed)} corridas con failover esperado no convergieron:")
+        for r in failed:
+            print(f"   {r.scenario} seed={r.seed} [{r.config}]")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
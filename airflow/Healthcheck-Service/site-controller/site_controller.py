@@ -30,7 +30,8 @@
      → ACTIVE: scheduler ON, HAProxy 200
 
    Caso 2: DB primary local + critical check FALLA (ej: Airflow muerto)
-     → FORZAR SWITCHOVER: mover DB primary a la otra región via MaxScale
+     → FORZAR SWITCHOVER: mover DB primary a la otra región via MaxScale,
+       solo si esa región reporta sus checks críticos sanos
      → Esto causa que el site-controller de la otra región se promueva
 
    Caso 3: DB NO es primary local
@@ -50,17 +51,56 @@
    MAXSCALE_URL        → URL de MaxScale para forzar switchover
    SCHEDULER_CONTAINER → Container a pausar/despausar
    FORCE_SWITCHOVER    → true/false: habilitar switchover forzado
+   PEER_HEALTHCHECK_URLS → SERVER=url del healthcheck de cada región destino
+   STANDBY_MODE        → pause/warm: qué queda congelado en la región pasiva
+
+ FAST-PATH:
+ ──────────
+   Eventos de Docker (pause/unpause/die del scheduler y dag-processor) y
+   cambios de estado de la DB local en MaxScale despiertan el control loop
+   sin esperar al próximo tick. La hysteresis se mide en ventanas de tiempo
+   (SWITCHOVER_WINDOW, FAILOVER_WINDOW, RECOVERY_WINDOW), no en ticks.
+
+ ESTADO PERSISTIDO:
+ ──────────────────
+   Con STATE_FILE, site_state y las ventanas de hysteresis se guardan
+   atómicamente (tmp + fsync + rename) en cada ciclo. Al arrancar se
+   recargan si el snapshot es reciente y coincide con lo que muestran
+   MaxScale y Docker: un reinicio no vuelve a pasar por passive ni pausa un
+   scheduler activo sano.
+
+ TIMELINE:
+ ─────────
+   GET /timeline expone un ring buffer acotado (TIMELINE_SIZE) con cada
+   cambio de entrada (db_primary, critical_healthy, needs_failover), ventana
+   de hysteresis cumplida, request/response de switchover, resultado de
+   pause/unpause y cambio de rol, con timestamps monotonic. Mezclando los
+   timelines de todas las regiones (tools/timeline_merge.py) se obtiene
+   el desglose por fase de cada incidente.
+
+ MÉTRICAS:
+ ─────────
+   GET /metrics expone en formato Prometheus: rol actual, transiciones,
+   contadores de hysteresis, duración de switchover, latencia de Docker API
+   y latencia de promoción (PROMOTE → primer heartbeat / primera tarea queued).
 """
 
 import asyncio
+import itertools
+import json
 import logging
 import os
-from datetime import datetime
-from typing import Optional
+import time
+from collections import Counter as VoteCounter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
 import aiohttp
 from aiohttp import web
 import aiohttp.web_runner
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
 
 
 # =============================================================================
@@ -82,10 +122,54 @@ MAXSCALE_USER = os.getenv('MAXSCALE_USER', 'admin')
 MAXSCALE_PASS = os.getenv('MAXSCALE_PASS', 'mariadb')
 LOCAL_DB_SERVER = os.getenv('LOCAL_DB_SERVER', 'HORNOS')
 MAXSCALE_MONITOR = os.getenv('MAXSCALE_MONITOR', 'Replication-Monitor')
+# Todas las MaxScale se consultan en paralelo con este deadline; la vista del
+# primary es la que reporta la mayoría de las que respondieron.
+MAXSCALE_QUERY_TIMEOUT = float(os.getenv('MAXSCALE_QUERY_TIMEOUT', '2'))
+
+# --- Selección del target de switchover por lag de replicación ---
+# El switchover se envía con target explícito: la réplica con menor
+# Seconds_Behind_Master (attributes.replication_lag en MaxScale) y, a igual
+# lag, la de posición GTID más avanzada. Si la mejor réplica supera
+# SWITCHOVER_MAX_LAG se espera hasta SWITCHOVER_LAG_WAIT segundos (0 = no esperar).
+SWITCHOVER_MAX_LAG = float(os.getenv('SWITCHOVER_MAX_LAG', '5'))
+SWITCHOVER_LAG_WAIT = float(os.getenv('SWITCHOVER_LAG_WAIT', '0'))
+
+# --- Healthcheck de las otras regiones (destino del switchover) ---
+# SERVER=url separados por coma, p.ej. SANLORENZO=http://healthcheck-sanlorenzo:8000.
+# Solo se fuerza un switchover hacia una réplica cuya región reporta sus checks
+# críticos sanos (sin contar db_primary). Si la falla está en todas las
+# regiones, mover la DB no arregla nada y cada una la mandaría a la otra.
+# Sin entradas no se fuerza ningún switchover.
+PEER_HEALTHCHECK_URLS = dict(
+    entry.split('=', 1) for entry in os.getenv('PEER_HEALTHCHECK_URLS', '').split(',') if '=' in entry
+)
+PEER_QUERY_TIMEOUT = float(os.getenv('PEER_QUERY_TIMEOUT', '2'))
 
 # --- Containers a controlar ---
 SCHEDULER_CONTAINER = os.getenv('SCHEDULER_CONTAINER', 'airflow-scheduler-hornos')
 DAG_PROCESSOR_CONTAINER = os.getenv('DAG_PROCESSOR_CONTAINER', 'airflow-dag-processor-hornos')
+MANAGED_CONTAINERS = (SCHEDULER_CONTAINER, DAG_PROCESSOR_CONTAINER)
+
+# --- Modo standby de la región pasiva ---
+#   pause → scheduler y dag-processor congelados con docker pause (default)
+#   warm  → solo se pausa el scheduler. El dag-processor sigue parseando y
+#           serializando DAGs contra el primary (vía MaxScale), así al
+#           promover el scheduler no espera a un parse completo.
+# El scheduler no tiene modo read-only en Airflow: dos schedulers despiertos
+# encolarían tareas en ambas regiones, por eso sigue pausado en los dos modos.
+STANDBY_MODE = 'warm' if os.getenv('STANDBY_MODE', 'pause').lower() == 'warm' else 'pause'
+STANDBY_PAUSED_CONTAINERS = (SCHEDULER_CONTAINER,) if STANDBY_MODE == 'warm' else MANAGED_CONTAINERS
+
+# --- API server de Airflow local (medición de latencia de promoción) ---
+# Sin usuario se consulta sin token (simple_auth_manager_all_admins).
+AIRFLOW_URL = os.getenv('AIRFLOW_URL', 'http://localhost:8080')
+AIRFLOW_API_USER = os.getenv('AIRFLOW_API_USER', '')
+AIRFLOW_API_PASS = os.getenv('AIRFLOW_API_PASS', '')
+PROMOTION_PROBE_INTERVAL = float(os.getenv('PROMOTION_PROBE_INTERVAL', '1'))
+PROMOTION_PROBE_TIMEOUT = float(os.getenv('PROMOTION_PROBE_TIMEOUT', '300'))
+
+# --- Docker Engine API ---
+DOCKER_SOCKET = os.getenv('DOCKER_SOCKET', '/var/run/docker.sock')
 
 # --- Switchover forzado ---
 # Si está habilitado, cuando un check crítico falla pero la DB sigue local,
@@ -103,6 +187,35 @@ SWITCHOVER_THRESHOLD = int(os.getenv('SWITCHOVER_THRESHOLD', '3'))  # era 5
 FAILOVER_THRESHOLD = int(os.getenv('FAILOVER_THRESHOLD', '2'))  # era 3
 RECOVERY_THRESHOLD = int(os.getenv('RECOVERY_THRESHOLD', '1'))  # era 2
 
+# --- Hysteresis en ventanas de tiempo (v3.0) ---
+# Las decisiones ya no cuentan ticks: una condición debe sostenerse durante
+# la ventana (en segundos). Por defecto equivalen a los thresholds por ticks
+# de antes: N observaciones consecutivas = (N - 1) * CHECK_INTERVAL segundos.
+SWITCHOVER_WINDOW = float(os.getenv('SWITCHOVER_WINDOW', (SWITCHOVER_THRESHOLD - 1) * CHECK_INTERVAL))
+FAILOVER_WINDOW = float(os.getenv('FAILOVER_WINDOW', (FAILOVER_THRESHOLD - 1) * CHECK_INTERVAL))
+RECOVERY_WINDOW = float(os.getenv('RECOVERY_WINDOW', (RECOVERY_THRESHOLD - 1) * CHECK_INTERVAL))
+
+# --- Estado persistido (crash-safe) ---
+# Archivo local o volumen (emptyDir/PVC) donde se guarda el snapshot. Vacío = sin
+# persistencia. Un snapshot más viejo que STATE_MAX_AGE segundos se descarta.
+STATE_FILE = os.getenv('STATE_FILE', '')
+STATE_MAX_AGE = float(os.getenv('STATE_MAX_AGE', '300'))
+STATE_VERSION = 1
+# Campos de site_state que sobreviven a un reinicio
+PERSISTED_FIELDS = (
+    "role", "consecutive_primary", "consecutive_not_primary", "consecutive_failover_needed",
+    "last_transition", "transition_reason", "last_switchover_forced", "last_switchover",
+    "last_promotion",
+)
+
+# --- Timeline de eventos ---
+TIMELINE_SIZE = int(os.getenv('TIMELINE_SIZE', '500'))
+
+# --- Fast-path por eventos ---
+# Los eventos de Docker y los cambios de estado en MaxScale despiertan el
+# control loop inmediatamente; CHECK_INTERVAL queda como tick de respaldo.
+MAXSCALE_WATCH_INTERVAL = float(os.getenv('MAXSCALE_WATCH_INTERVAL', '1'))
+
 
 # =============================================================================
 # LOGGING
@@ -133,8 +246,201 @@ site_state = {
     "last_transition": None,
     "transition_reason": None,
     "last_switchover_forced": None,
+    # Detalle del último switchover: target, lag, espera y write-unavailability
+    "last_switchover": None,
+    # Última promoción: PROMOTE → primer heartbeat / primera tarea queued
+    "last_promotion": None,
+
+    # Vista por quórum de las MaxScale (ver get_maxscale_view)
+    "maxscale_primary": None,
+    "maxscale_responders": 0,
+    "maxscale_disagreement": False,
 }
 
+# Ring buffer de eventos del failover (ver record_event)
+timeline: deque = deque(maxlen=TIMELINE_SIZE)
+_timeline_seq = itertools.count(1)
+
+
+# =============================================================================
+# MÉTRICAS (Prometheus)
+# =============================================================================
+# Labels de cardinalidad acotada: roles, operaciones y resultados son
+# conjuntos fijos. Nunca se usan nombres de container ni URLs como label.
+
+# Registry propio del módulo: permite cargar varias copias del módulo en un
+# mismo proceso (una por región en el simulador) sin colisiones de métricas.
+METRICS_REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 8.0)
+
+ROLE = Gauge(
+    'site_controller_role',
+    'Rol actual del site (1 en el rol vigente)',
+    ['role'],
+    registry=METRICS_REGISTRY,
+)
+ROLE_TRANSITIONS = Counter(
+    'site_controller_role_transitions_total',
+    'Transiciones de rol ejecutadas',
+    ['transition'],
+    registry=METRICS_REGISTRY,
+)
+HYSTERESIS_COUNTERS = Gauge(
+    'site_controller_consecutive',
+    'Contadores de hysteresis del control loop',
+    ['counter'],
+    registry=METRICS_REGISTRY,
+)
+CONTROL_LOOP_DURATION = Histogram(
+    'site_controller_loop_duration_seconds',
+    'Duración de una iteración del control loop',
+    buckets=LATENCY_BUCKETS,
+    registry=METRICS_REGISTRY,
+)
+SWITCHOVER_DURATION = Histogram(
+    'site_controller_switchover_duration_seconds',
+    'Duración de un switchover forzado de DB',
+    ['result'], buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+    registry=METRICS_REGISTRY,
+)
+DOCKER_API_DURATION = Histogram(
+    'site_controller_docker_api_duration_seconds',
+    'Latencia de llamadas a Docker Engine API',
+    ['operation'], buckets=LATENCY_BUCKETS,
+    registry=METRICS_REGISTRY,
+)
+MAXSCALE_RESPONDERS = Gauge(
+    'site_controller_maxscale_responders',
+    'MaxScale que respondieron dentro del deadline en la última consulta',
+    registry=METRICS_REGISTRY,
+)
+MAXSCALE_DISAGREEMENT = Gauge(
+    'site_controller_maxscale_disagreement',
+    '1 si las MaxScale que respondieron reportan primaries distintos',
+    registry=METRICS_REGISTRY,
+)
+PROMOTION_LATENCY = Histogram(
+    'site_controller_promotion_latency_seconds',
+    'Latencia desde PROMOTE hasta cada hito del scheduler',
+    ['milestone', 'standby_mode'], buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+    registry=METRICS_REGISTRY,
+)
+DOCKER_API_ERRORS = Counter(
+    'site_controller_docker_api_errors_total',
+    'Llamadas a Docker Engine API fallidas',
+    ['operation'],
+    registry=METRICS_REGISTRY,
+)
+
+
+def _loop_time() -> float:
+    """Reloj del event loop: monotonic en producción, virtual en el simulador."""
+    return asyncio.get_running_loop().time()
+
+
+def record_event(kind: str, **fields):
+    """Agrega un evento al timeline con "t" = _loop_time() y "seq" incremental."""
+    timeline.append({"seq": next(_timeline_seq), "t": round(_loop_time(), 3), "kind": kind, **fields})
+
+
+def _set_role_metric(role: str):
+    for r in ("active", "passive"):
+        ROLE.labels(role=r).set(1 if r == role else 0)
+
+
+def _docker_operation(path: str) -> str:
+    """Reduce un path de Docker API a una operación de cardinalidad fija."""
+    last = path.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+    if last in ("pause", "unpause", "events"):
+        return last
+    if last == "json":
+        return "inspect"
+    return "other"
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    """Timestamp ISO del API de Airflow → datetime UTC (None si no hay)."""
+    if not value:
+        return None
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _master_of(servers: List[dict]) -> str:
+    """Id del servidor en estado Master + Running ("" si no hay ninguno)."""
+    for server in servers:
+        state = server.get("attributes", {}).get("state", "")
+        if "Master" in state and "Running" in state:
+            return server.get("id", "")
+    return ""
+
+
+def _gtid_progress(gtid_pos: Optional[str]) -> int:
+    """Suma de los sequence numbers de una posición GTID ("0-1-152,1-2-9" → 161)."""
+    total = 0
+    for gtid in (gtid_pos or "").split(','):
+        parts = gtid.strip().split('-')
+        if len(parts) == 3 and parts[2].isdigit():
+            total += int(parts[2])
+    return total
+
+
+def _replica_candidates(servers: List[dict]) -> List[dict]:
+    """
+    Réplicas (Slave + Running) ordenadas de mejor a peor target de switchover:
+    menor replication_lag primero (lag desconocido al final), desempate por
+    posición GTID más avanzada.
+    """
+    candidates = []
+    for server in servers:
+        attrs = server.get("attributes", {})
+        state = attrs.get("state", "")
+        if "Slave" not in state or "Running" not in state:
+            continue
+        lag = attrs.get("replication_lag")
+        candidates.append({
+            "id": server.get("id", ""),
+            "lag": lag if isinstance(lag, (int, float)) and lag >= 0 else None,
+            "gtid": attrs.get("gtid_current_pos"),
+        })
+    candidates.sort(key=lambda c: (c["lag"] is None, c["lag"] or 0, -_gtid_progress(c["gtid"])))
+    return candidates
+
+
+def _switchover_needed(hc_status: dict) -> bool:
+    """
+    needs_failover del healthcheck, salvo que el único check crítico caído
+    sea db_primary. Ese check consulta solo la MaxScale local: si falla con
+    la DB primary local según la mayoría, lo caído es esa MaxScale, y mover
+    la DB no lo arregla.
+    """
+    if not hc_status.get("needs_failover", False):
+        return False
+    checks = hc_status.get("checks")
+    if not checks:
+        return True
+    return any(
+        name != "db_primary" and result.get("effective_status") in ("unhealthy", "degraded_latency")
+        for name, result in checks.items()
+        if result.get("is_critical")
+    )
+
+
+def _can_take_over(hc_status: dict) -> bool:
+    """
+    ¿La región de este /ready puede recibir la DB? Todos sus checks críticos
+    sanos salvo db_primary, que en una región pasiva siempre falla.
+    """
+    checks = hc_status.get("checks")
+    if not checks:
+        return False
+    return all(
+        result.get("effective_status") == "healthy"
+        for name, result in checks.items()
+        if result.get("is_critical") and name != "db_primary"
+    )
+
 
 # =============================================================================
 # SITE CONTROLLER
@@ -144,12 +450,39 @@ class SiteController:
 
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
-        self._docker_available = os.path.exists('/var/run/docker.sock')
+        # Sesión única contra el socket de Docker, reutilizada en todas las llamadas
+        self.docker: Optional[aiohttp.ClientSession] = None
+        self._docker_available = os.path.exists(DOCKER_SOCKET)
+        # Vista cacheada del estado de los containers, alimentada por /events
+        # {container: {"paused": bool, "running": bool}}
+        self.container_state: Dict[str, Dict[str, bool]] = {}
+        self._events_task: Optional[asyncio.Task] = None
+        self._maxscale_task: Optional[asyncio.Task] = None
+        self._promotion_task: Optional[asyncio.Task] = None
+        # Despierta el control loop ante un cambio de estado (fast-path)
+        self.wakeup = asyncio.Event()
+        # Instante (monotonic) desde el que se sostiene cada condición
+        self._since: Dict[str, Optional[float]] = {
+            "primary": None, "not_primary": None, "failover_needed": None,
+        }
+        # Ventanas ya cumplidas (se registran una vez en el timeline)
+        self._elapsed: set = set()
 
     async def start(self):
         timeout = aiohttp.ClientTimeout(total=8)
         self.session = aiohttp.ClientSession(timeout=timeout)
 
+        if self._docker_available:
+            self.docker = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=DOCKER_SOCKET),
+                timeout=timeout,
+            )
+            await self.refresh_container_state()
+            await self.apply_standby_layout()
+            self._events_task = asyncio.create_task(self.watch_docker_events())
+        await self.restore_state()
+        self._maxscale_task = asyncio.create_task(self.watch_maxscale_state())
+
         logger.info("=" * 70)
         logger.info(f"  SITE CONTROLLER — Región: {REGION_NAME}")
         logger.info("=" * 70)
@@ -157,12 +490,25 @@ class SiteController:
         logger.info(f"  MaxScale URLs:     {', '.join(MAXSCALE_URLS)}")
         logger.info(f"  Local DB Server:   {LOCAL_DB_SERVER}")
         logger.info(f"  Scheduler:         {SCHEDULER_CONTAINER}")
+        logger.info(f"  Standby Mode:      {STANDBY_MODE} (pausa: {', '.join(STANDBY_PAUSED_CONTAINERS)})")
         logger.info(f"  Force Switchover:  {'✅ habilitado' if FORCE_SWITCHOVER else '⛔ deshabilitado'}")
-        logger.info(f"  Switchover After:  {SWITCHOVER_THRESHOLD} checks")
+        logger.info(f"  Peer Healthchecks: {', '.join(f'{k}={v}' for k, v in PEER_HEALTHCHECK_URLS.items()) or '⛔ ninguno (sin switchover)'}")
+        logger.info(f"  Switchover After:  {SWITCHOVER_WINDOW:.0f}s")
+        logger.info(f"  Demote / Promote:  {FAILOVER_WINDOW:.0f}s / {RECOVERY_WINDOW:.0f}s")
         logger.info(f"  Docker Socket:     {'✅' if self._docker_available else '⚠️ dry-run'}")
+        logger.info(f"  State File:        {STATE_FILE or '⛔ sin persistencia'}")
         logger.info("=" * 70)
 
     async def stop(self):
+        for task in (self._events_task, self._maxscale_task, self._promotion_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.docker:
+            await self.docker.close()
         if self.session:
             await self.session.close()
 
@@ -183,26 +529,188 @@ class SiteController:
             logger.warning(f"No se pudo consultar healthcheck: {e}")
             return {"critical_healthy": False, "needs_failover": False, "error": str(e)}
 
-    async def check_db_is_primary(self) -> bool:
-        """Consulta MaxScale directamente para saber si la DB local es primary.
-        Intenta con todas las URLs configuradas hasta encontrar una que responda.
-        """
+    async def _peer_can_take_over(self, server_id: str) -> bool:
+        """GET /ready del healthcheck de la región de server_id (PEER_HEALTHCHECK_URLS)."""
+        url = PEER_HEALTHCHECK_URLS.get(server_id)
+        if not url:
+            return False
+        try:
+            timeout = aiohttp.ClientTimeout(total=PEER_QUERY_TIMEOUT)
+            async with self.session.get(f"{url}/ready", timeout=timeout) as resp:
+                if resp.status != 200:
+                    return False
+                return _can_take_over(await resp.json())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"No se pudo consultar healthcheck de {server_id}: {e}")
+            return False
+
+    async def _query_maxscale_servers(self, maxscale_url: str) -> List[dict]:
+        """GET /v1/servers de una MaxScale. Lanza excepción si no responde a tiempo."""
         auth = aiohttp.BasicAuth(MAXSCALE_USER, MAXSCALE_PASS)
-        
-        for maxscale_url in MAXSCALE_URLS:
+        timeout = aiohttp.ClientTimeout(total=MAXSCALE_QUERY_TIMEOUT)
+        async with self.session.get(f"{maxscale_url}/v1/servers", auth=auth, timeout=timeout) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}")
+            data = await resp.json()
+        return data.get("data", [])
+
+    async def get_maxscale_view(self) -> dict:
+        """
+        Consulta TODAS las MaxScale en paralelo (deadline MAXSCALE_QUERY_TIMEOUT)
+        y calcula la vista por mayoría de las que respondieron.
+
+        Una MaxScale caída ya no cuesta un timeout completo antes de probar la
+        siguiente, y si dos MaxScale discrepan (p.ej. durante una partición)
+        ninguna gana por ser la primera de la lista: sin mayoría no hay primary.
+
+        Retorna:
+          primary      → id del Master según la mayoría (None si no hay mayoría)
+          votes        → {maxscale_url: master_visto} de las que respondieron
+          servers      → {maxscale_url: /v1/servers} de las que respondieron
+          disagreement → True si las que respondieron no coinciden
+        """
+        urls = [u.strip() for u in MAXSCALE_URLS if u.strip()]
+        answers = await asyncio.gather(
+            *(self._query_maxscale_servers(u) for u in urls), return_exceptions=True
+        )
+        votes: Dict[str, str] = {}
+        servers: Dict[str, List[dict]] = {}
+        for url, answer in zip(urls, answers):
+            if isinstance(answer, Exception):
+                logger.debug(f"MaxScale {url} no disponible: {answer!r}")
+            else:
+                votes[url] = _master_of(answer)
+                servers[url] = answer
+
+        tally = VoteCounter(votes.values())
+        primary = None
+        if tally:
+            leader, count = tally.most_common(1)[0]
+            if count * 2 > len(votes) and leader:
+                primary = leader
+
+        view = {
+            "primary": primary,
+            "votes": votes,
+            "servers": servers,
+            "disagreement": len(tally) > 1,
+        }
+        site_state["maxscale_primary"] = primary
+        site_state["maxscale_responders"] = len(votes)
+        site_state["maxscale_disagreement"] = view["disagreement"]
+        MAXSCALE_RESPONDERS.set(len(votes))
+        MAXSCALE_DISAGREEMENT.set(int(view["disagreement"]))
+        return view
+
+    # =========================================================================
+    # ESTADO PERSISTIDO
+    # =========================================================================
+
+    def snapshot(self) -> dict:
+        """
+        Estado a persistir. Las ventanas de hysteresis se guardan en reloj de
+        pared ("sostenida desde"): el reloj monotonic no sobrevive al reinicio.
+        """
+        now, wall = _loop_time(), time.time()
+        return {
+            "version": STATE_VERSION,
+            "region": REGION_NAME,
+            "saved_at": wall,
+            "state": {key: site_state[key] for key in PERSISTED_FIELDS},
+            "since": {
+                name: (wall - (now - since)) if since is not None else None
+                for name, since in self._since.items()
+            },
+        }
+
+    async def save_state(self):
+        """Escritura atómica: tmp + fsync + rename (+ fsync del directorio)."""
+        if not STATE_FILE:
+            return
+        body = json.dumps(self.snapshot()).encode()
+
+        def write():
+            directory = os.path.dirname(os.path.abspath(STATE_FILE))
+            tmp = f"{STATE_FILE}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, STATE_FILE)
+            dir_fd = os.open(directory, os.O_RDONLY)
             try:
-                url = f"{maxscale_url.strip()}/v1/servers/{LOCAL_DB_SERVER}"
-                async with self.session.get(url, auth=auth) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        state = data.get("data", {}).get("attributes", {}).get("state", "")
-                        return "Master" in state and "Running" in state
-            except Exception as e:
-                logger.debug(f"MaxScale {maxscale_url} no disponible: {e}")
-                continue
-        
-        logger.warning("Ningún MaxScale disponible para consultar estado de DB")
-        return False
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            logger.warning(f"No se pudo persistir el estado en {STATE_FILE}: {e}")
+
+    def _load_snapshot(self) -> Optional[dict]:
+        """Lee y valida el formato del snapshot. None si no sirve."""
+        try:
+            with open(STATE_FILE, 'rb') as f:
+                snap = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Snapshot ilegible en {STATE_FILE}: {e} → se ignora")
+            return None
+
+        age = time.time() - snap.get("saved_at", 0)
+        if snap.get("version") != STATE_VERSION or snap.get("region") != REGION_NAME:
+            logger.warning("Snapshot de otra versión o región → se ignora")
+            return None
+        if not 0 <= age <= STATE_MAX_AGE:
+            logger.info(f"Snapshot de hace {age:.0f}s (máx {STATE_MAX_AGE:.0f}s) → se ignora")
+            return None
+        if snap.get("state", {}).get("role") not in ("active", "passive"):
+            return None
+        return snap
+
+    async def restore_state(self):
+        """
+        Recarga el snapshot y lo valida contra el estado real antes de usarlo:
+          - role=active solo se conserva si MaxScale sigue viendo la DB local
+            como primary; si no, se arranca passive (el loop decide de cero).
+          - scheduler_running sale de Docker, no del snapshot.
+        """
+        if not STATE_FILE:
+            return
+        snap = self._load_snapshot()
+        if snap is None:
+            return
+
+        state = snap["state"]
+        db_primary = await self.check_db_is_primary()
+        if state["role"] == "active" and not db_primary:
+            logger.warning("Snapshot dice ACTIVE pero la DB local ya no es primary → arranco PASSIVE")
+            return
+
+        site_state.update({key: state.get(key, site_state[key]) for key in PERSISTED_FIELDS})
+        now, wall = _loop_time(), time.time()
+        for name, since_wall in snap.get("since", {}).items():
+            if name in self._since and since_wall is not None:
+                self._since[name] = now - (wall - since_wall)
+
+        paused = await self.is_container_paused(SCHEDULER_CONTAINER)
+        site_state["scheduler_running"] = paused is False or (paused is None and state["role"] == "active")
+        logger.info(
+            f"♻️  Estado restaurado de {STATE_FILE} (hace {wall - snap['saved_at']:.0f}s): "
+            f"role={site_state['role']}, scheduler={'ON' if site_state['scheduler_running'] else 'OFF'}"
+        )
+
+    async def check_db_is_primary(self) -> bool:
+        """¿La DB local es primary según la mayoría de las MaxScale que responden?"""
+        view = await self.get_maxscale_view()
+        if not view["votes"]:
+            logger.warning("Ningún MaxScale disponible para consultar estado de DB")
+            return False
+        if view["disagreement"]:
+            logger.warning(f"MaxScale en desacuerdo sobre el primary: {view['votes']} → {view['primary']}")
+        return view["primary"] == LOCAL_DB_SERVER
 
     # =========================================================================
     # ACCIONES: SCHEDULER
@@ -212,54 +720,371 @@ class SiteController:
         if not self._docker_available:
             logger.info(f"[DRY-RUN] {method} {path}")
             return 204
+        operation = _docker_operation(path)
+        start = time.perf_counter()
         try:
-            conn = aiohttp.UnixConnector(path='/var/run/docker.sock')
-            async with aiohttp.ClientSession(connector=conn) as docker:
-                async with docker.request(method, f"http://localhost{path}") as resp:
-                    if resp.status not in (204, 304):
-                        body = await resp.text()
-                        logger.warning(f"Docker {method} {path} → {resp.status}: {body}")
-                    else:
-                        logger.info(f"Docker {method} {path} → {resp.status}")
-                    return resp.status
+            async with self.docker.request(method, f"http://localhost{path}") as resp:
+                if resp.status not in (204, 304):
+                    body = await resp.text()
+                    logger.warning(f"Docker {method} {path} → {resp.status}: {body}")
+                    DOCKER_API_ERRORS.labels(operation=operation).inc()
+                else:
+                    logger.info(f"Docker {method} {path} → {resp.status}")
+                return resp.status
         except Exception as e:
             logger.error(f"Docker API error: {e}")
+            DOCKER_API_ERRORS.labels(operation=operation).inc()
             return 500
+        finally:
+            DOCKER_API_DURATION.labels(operation=operation).observe(time.perf_counter() - start)
 
     async def start_scheduler(self):
-        logger.info("▶▶▶ ACTIVANDO scheduler + dag-processor")
-        await self._docker_api("POST", f"/containers/{SCHEDULER_CONTAINER}/unpause")
-        await self._docker_api("POST", f"/containers/{DAG_PROCESSOR_CONTAINER}/unpause")
+        logger.info(f"▶▶▶ ACTIVANDO {' + '.join(STANDBY_PAUSED_CONTAINERS)}")
+        statuses = await asyncio.gather(*(
+            self._docker_api("POST", f"/containers/{c}/unpause") for c in STANDBY_PAUSED_CONTAINERS
+        ))
+        record_event("docker", operation="unpause", results=dict(zip(STANDBY_PAUSED_CONTAINERS, statuses)))
         site_state["scheduler_running"] = True
 
     async def stop_scheduler(self):
-        logger.info("⏸⏸⏸ DESACTIVANDO scheduler + dag-processor")
-        await self._docker_api("POST", f"/containers/{SCHEDULER_CONTAINER}/pause")
-        await self._docker_api("POST", f"/containers/{DAG_PROCESSOR_CONTAINER}/pause")
+        logger.info(f"⏸⏸⏸ DESACTIVANDO {' + '.join(STANDBY_PAUSED_CONTAINERS)}")
+        statuses = await asyncio.gather(*(
+            self._docker_api("POST", f"/containers/{c}/pause") for c in STANDBY_PAUSED_CONTAINERS
+        ))
+        record_event("docker", operation="pause", results=dict(zip(STANDBY_PAUSED_CONTAINERS, statuses)))
         site_state["scheduler_running"] = False
 
+    async def apply_standby_layout(self):
+        """
+        En warm standby los containers fuera de STANDBY_PAUSED_CONTAINERS nunca
+        se pausan: si quedaron pausados (ej: venimos de STANDBY_MODE=pause),
+        se despausan al arrancar.
+        """
+        for c in MANAGED_CONTAINERS:
+            if c not in STANDBY_PAUSED_CONTAINERS and self.container_state.get(c, {}).get("paused"):
+                logger.info(f"Warm standby: {c} no debe quedar pausado → despausando")
+                await self._docker_api("POST", f"/containers/{c}/unpause")
+
+    async def inspect_container(self, container: str) -> Optional[Dict[str, bool]]:
+        """GET /containers/{id}/json → actualiza y retorna la entrada del cache."""
+        start = time.perf_counter()
+        try:
+            async with self.docker.get(f"http://localhost/containers/{container}/json") as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    state = data.get("State", {})
+                    self.container_state[container] = {
+                        "paused": state.get("Paused", False),
+                        "running": state.get("Running", False),
+                    }
+                    return self.container_state[container]
+        except Exception:
+            DOCKER_API_ERRORS.labels(operation="inspect").inc()
+        finally:
+            DOCKER_API_DURATION.labels(operation="inspect").observe(time.perf_counter() - start)
+        return None
+
+    async def refresh_container_state(self):
+        """Re-sincroniza el cache completo (al arrancar y tras perder el stream)."""
+        self.container_state.clear()
+        await asyncio.gather(*(self.inspect_container(c) for c in MANAGED_CONTAINERS))
+
+    def _apply_docker_event(self, event: dict):
+        """Aplica un evento de /events al cache de estado de containers."""
+        name = event.get("Actor", {}).get("Attributes", {}).get("name")
+        if name not in MANAGED_CONTAINERS:
+            return
+        action = event.get("Action") or event.get("status", "")
+        entry = self.container_state.setdefault(name, {"paused": False, "running": False})
+        if action == "pause":
+            entry["paused"] = True
+        elif action == "unpause":
+            entry["paused"] = False
+        elif action in ("start", "restart"):
+            entry.update(running=True, paused=False)
+        elif action in ("die", "stop", "kill", "destroy"):
+            entry.update(running=False, paused=False)
+        else:
+            return
+        logger.debug(f"Docker event: {name} {action} → {entry}")
+        self.wake(f"docker:{name}:{action}")
+
+    async def watch_docker_events(self):
+        """
+        Consume GET /events (streaming, JSON por línea) filtrado a los
+        containers controlados. Si el stream se corta, el cache se invalida
+        y se re-sincroniza con inspect antes de reconectar.
+        """
+        filters = json.dumps({"type": ["container"], "container": list(MANAGED_CONTAINERS)})
+        stream_timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        while True:
+            try:
+                async with self.docker.get(
+                    "http://localhost/events",
+                    params={"filters": filters},
+                    timeout=stream_timeout,
+                ) as resp:
+                    if resp.status != 200:
+                        raise RuntimeError(f"HTTP {resp.status}")
+                    await self.refresh_container_state()
+                    async for line in resp.content:
+                        line = line.strip()
+                        if line:
+                            self._apply_docker_event(json.loads(line))
+                raise RuntimeError("stream cerrado")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Docker events stream interrumpido: {e} → reintentando")
+                DOCKER_API_ERRORS.labels(operation="events").inc()
+                self.container_state.clear()
+                await asyncio.sleep(2)
+
+    # =========================================================================
+    # FAST-PATH: EVENTOS
+    # =========================================================================
+
+    def wake(self, reason: str):
+        """Despierta el control loop sin esperar al próximo tick."""
+        if not self.wakeup.is_set():
+            logger.info(f"⚡ Wakeup: {reason}")
+            self.wakeup.set()
+
+    async def get_local_db_state(self) -> Optional[str]:
+        """Estado de LOCAL_DB_SERVER en la MaxScale local (None si no responde)."""
+        auth = aiohttp.BasicAuth(MAXSCALE_USER, MAXSCALE_PASS)
+        timeout = aiohttp.ClientTimeout(total=MAXSCALE_QUERY_TIMEOUT)
+        try:
+            async with self.session.get(
+                f"{MAXSCALE_URL}/v1/servers/{LOCAL_DB_SERVER}", auth=auth, timeout=timeout
+            ) as resp:
+                if resp.status != 200:
+                    return None
+                data = await resp.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        return data.get("data", {}).get("attributes", {}).get("state", "")
+
+    async def watch_maxscale_state(self):
+        """
+        MaxScale no ofrece un stream de cambios de estado de servidores por
+        REST, así que se sondea /v1/servers/{LOCAL_DB_SERVER} en la MaxScale
+        local (MAXSCALE_URL) a intervalo corto: una consulta por intervalo, no
+        la vista por mayoría. Cuando el estado cambia (Master → Slave, Down,
+        MaxScale sin responder...) se despierta el loop, que consulta a todas
+        las MaxScale y decide con la mayoría.
+        """
+        last = None
+        while True:
+            try:
+                current = await self.get_local_db_state()
+                if last is not None and current != last:
+                    self.wake(f"maxscale:{LOCAL_DB_SERVER}={current or 'unreachable'}")
+                last = current
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"MaxScale watcher: {e}")
+            await asyncio.sleep(MAXSCALE_WATCH_INTERVAL)
+
+    async def wait_for_wakeup(self, timeout: float):
+        """Duerme hasta un evento o hasta el timeout, lo que ocurra primero."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.wakeup.clear()
+
+    @staticmethod
+    def _windows() -> Dict[str, float]:
+        return {
+            "primary": RECOVERY_WINDOW,
+            "not_primary": FAILOVER_WINDOW,
+            "failover_needed": SWITCHOVER_WINDOW,
+        }
+
+    def _track(self, condition: str, held: bool, now: float) -> float:
+        """Actualiza la ventana de una condición. Retorna segundos sostenida (-1 si no)."""
+        if not held:
+            self._since[condition] = None
+            self._elapsed.discard(condition)
+            return -1.0
+        if self._since[condition] is None:
+            self._since[condition] = now
+        held_for = now - self._since[condition]
+        window = self._windows()[condition]
+        if held_for >= window and condition not in self._elapsed:
+            self._elapsed.add(condition)
+            record_event("window_elapsed", condition=condition, window_s=window, held_s=round(held_for, 3))
+        return held_for
+
+    def _next_deadline(self, now: float) -> float:
+        """Segundos hasta que expire la próxima ventana pendiente (máx CHECK_INTERVAL)."""
+        windows = self._windows()
+        pending = [
+            since + windows[name] - now
+            for name, since in self._since.items()
+            if since is not None and since + windows[name] > now
+        ]
+        # Piso de 50ms: con redondeo de punto flotante el remanente puede ser
+        # ~1e-15 y el loop re-evaluaría sin que el reloj avance.
+        return max(0.05, min([CHECK_INTERVAL, *pending]))
+
     async def is_container_paused(self, container: str) -> Optional[bool]:
         if not self._docker_available:
             return None
-        try:
-            conn = aiohttp.UnixConnector(path='/var/run/docker.sock')
-            async with aiohttp.ClientSession(connector=conn) as docker:
-                async with docker.get(f"http://localhost/containers/{container}/json") as resp:
-                    if resp.status == 200:
+        entry = self.container_state.get(container)
+        if entry is None:
+            entry = await self.inspect_container(container)
+        return entry["paused"] if entry is not None else None
+
+    # =========================================================================
+    # LATENCIA DE PROMOCIÓN
+    # =========================================================================
+
+    async def _airflow_headers(self) -> dict:
+        """Token JWT del API server (POST /auth/token) si hay usuario configurado."""
+        if not AIRFLOW_API_USER:
+            return {}
+        async with self.session.post(
+            f"{AIRFLOW_URL}/auth/token",
+            json={"username": AIRFLOW_API_USER, "password": AIRFLOW_API_PASS},
+        ) as resp:
+            if resp.status not in (200, 201):
+                raise RuntimeError(f"auth/token HTTP {resp.status}")
+            data = await resp.json()
+        return {"Authorization": f"Bearer {data['access_token']}"}
+
+    def _record_promotion(self, milestone: str, promoted_at: datetime, reached_at: datetime):
+        seconds = max(0.0, (reached_at - promoted_at).total_seconds())
+        site_state["last_promotion"][f"{milestone}_s"] = round(seconds, 2)
+        PROMOTION_LATENCY.labels(milestone=milestone, standby_mode=STANDBY_MODE).observe(seconds)
+        record_event("promotion", milestone=milestone, latency_s=round(seconds, 2))
+        logger.info(f"⏱  PROMOTE → {milestone}: {seconds:.1f}s (standby={STANDBY_MODE})")
+
+    async def measure_promotion(self, promoted_at: datetime):
+        """
+        Mide PROMOTE → primer heartbeat del scheduler y PROMOTE → primera tarea
+        queued, sondeando el API server local. Los instantes salen de la DB de
+        Airflow (latest_scheduler_heartbeat, queued_when), no del sondeo, así
+        que PROMOTION_PROBE_INTERVAL no suma error a la medición.
+        """
+        pending = {"scheduler_heartbeat", "first_task_queued"}
+        deadline = _loop_time() + PROMOTION_PROBE_TIMEOUT
+        params = {"updated_at_gte": promoted_at.isoformat(), "limit": "100"}
+        headers: Optional[dict] = None
+
+        while pending and _loop_time() < deadline:
+            try:
+                if "scheduler_heartbeat" in pending:
+                    async with self.session.get(f"{AIRFLOW_URL}/api/v2/monitor/health") as resp:
+                        health = await resp.json()
+                    beat = _parse_ts(health.get("scheduler", {}).get("latest_scheduler_heartbeat"))
+                    if beat and beat >= promoted_at:
+                        self._record_promotion("scheduler_heartbeat", promoted_at, beat)
+                        pending.discard("scheduler_heartbeat")
+
+                if "first_task_queued" in pending:
+                    if headers is None:
+                        headers = await self._airflow_headers()
+                    async with self.session.get(
+                        f"{AIRFLOW_URL}/api/v2/dags/~/dagRuns/~/taskInstances",
+                        params=params, headers=headers,
+                    ) as resp:
+                        if resp.status == 401:
+                            headers = None
+                        if resp.status != 200:
+                            raise RuntimeError(f"taskInstances HTTP {resp.status}")
                         data = await resp.json()
-                        return data.get("State", {}).get("Paused", False)
-        except Exception:
-            pass
-        return None
+                    queued = [
+                        ts for ts in (_parse_ts(ti.get("queued_when")) for ti in data.get("task_instances", []))
+                        if ts and ts >= promoted_at
+                    ]
+                    if queued:
+                        self._record_promotion("first_task_queued", promoted_at, min(queued))
+                        pending.discard("first_task_queued")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Medición de promoción: {e}")
+            await asyncio.sleep(PROMOTION_PROBE_INTERVAL)
+
+        if pending:
+            logger.warning(f"Promoción sin {', '.join(sorted(pending))} tras {PROMOTION_PROBE_TIMEOUT:.0f}s")
+
+    def _start_promotion_probe(self):
+        self._cancel_promotion_probe()
+        promoted_at = datetime.now(timezone.utc)
+        site_state["last_promotion"] = {
+            "at": promoted_at.isoformat(),
+            "standby_mode": STANDBY_MODE,
+            "scheduler_heartbeat_s": None,
+            "first_task_queued_s": None,
+        }
+        self._promotion_task = asyncio.create_task(self.measure_promotion(promoted_at))
+
+    def _cancel_promotion_probe(self):
+        if self._promotion_task and not self._promotion_task.done():
+            self._promotion_task.cancel()
+        self._promotion_task = None
 
     # =========================================================================
     # ACCIÓN: FORZAR SWITCHOVER DE DB
     # =========================================================================
 
+    async def select_switchover_target(self) -> tuple:
+        """
+        Elige la réplica con menor lag entre las de regiones sanas (ver
+        PEER_HEALTHCHECK_URLS). Si supera SWITCHOVER_MAX_LAG, re-consulta cada
+        segundo hasta SWITCHOVER_LAG_WAIT segundos esperando que alcance al
+        primary.
+
+        Retorna (view, target, segundos_esperados). target es None si ninguna
+        réplica está en una región que pueda recibir la DB.
+        """
+        started = _loop_time()
+        while True:
+            view = await self.get_maxscale_view()
+            agreeing = [u for u, p in view["votes"].items() if p == view["primary"]]
+            servers = view["servers"][agreeing[0]] if agreeing else []
+            replicas = _replica_candidates(servers)
+            healthy = await asyncio.gather(*(self._peer_can_take_over(c["id"]) for c in replicas))
+            candidates = [c for c, ok in zip(replicas, healthy) if ok]
+            target = candidates[0] if candidates else None
+            waited = _loop_time() - started
+
+            if target is None or (target["lag"] is not None and target["lag"] <= SWITCHOVER_MAX_LAG):
+                return view, target, waited
+            if waited >= SWITCHOVER_LAG_WAIT:
+                if SWITCHOVER_LAG_WAIT > 0:
+                    logger.warning(
+                        f"Réplica {target['id']} sigue con lag={target['lag']}s tras esperar "
+                        f"{waited:.0f}s → switchover igual (se necesita failover)"
+                    )
+                return view, target, waited
+            logger.info(f"  Esperando lag de {target['id']}: {target['lag']}s > {SWITCHOVER_MAX_LAG}s")
+            await asyncio.sleep(1)
+
+    async def _wait_for_primary(self, target: str, limit: float = 30.0) -> Optional[float]:
+        """Segundos hasta que la vista por mayoría muestra a target como primary."""
+        started = _loop_time()
+        while _loop_time() - started < limit:
+            view = await self.get_maxscale_view()
+            if view["primary"] == target:
+                return _loop_time() - started
+            await asyncio.sleep(0.5)
+        return None
+
     async def force_db_switchover(self) -> bool:
         """
         Fuerza un switchover en MaxScale para mover el primary a otra región.
-        Intenta con todas las URLs configuradas hasta encontrar una que responda.
+        Solo intenta contra las MaxScale que respondieron a la consulta por
+        quórum, empezando por las que coinciden con la mayoría: las caídas
+        no consumen un timeout cada una.
+
+        El target se pasa explícito (réplica con menor lag, ver
+        select_switchover_target) para no promover una réplica atrasada
+        que deje a Airflow sin escrituras hasta ponerse al día.
 
         MaxScale API:
           POST /v1/maxscale/modules/mariadbmon/{monitor}/switchover
@@ -270,8 +1095,9 @@ class SiteController:
         IMPORTANTE: Esto es una operación PESADA. Solo se ejecuta cuando:
         1. FORCE_SWITCHOVER está habilitado
         2. La DB es primary local
-        3. Un check crítico falló (needs_failover=true)
-        4. Se superó SWITCHOVER_THRESHOLD checks consecutivos
+        3. Un check crítico distinto de db_primary falló (needs_failover=true)
+        4. La condición se sostuvo durante SWITCHOVER_WINDOW segundos
+        5. Hay una réplica en una región con sus checks críticos sanos
 
         Retorna True si el switchover fue exitoso.
         """
@@ -282,27 +1108,66 @@ class SiteController:
         logger.info("=" * 70)
 
         auth = aiohttp.BasicAuth(MAXSCALE_USER, MAXSCALE_PASS)
-        
-        for maxscale_url in MAXSCALE_URLS:
+        start = time.perf_counter()
+
+        view, target, waited = await self.select_switchover_target()
+        if target is None:
+            logger.warning("  Ninguna réplica en una región sana → no se fuerza switchover")
+            record_event("switchover_skipped", reason="no_healthy_target")
+            return False
+        command = f"{MAXSCALE_MONITOR}&{target['id']}"
+        logger.info(f"  Target: {target['id']} (lag={target['lag']}s, gtid={target['gtid']})")
+        candidates: List[str] = sorted(view["votes"], key=lambda u: view["votes"][u] != view["primary"])
+
+        for maxscale_url in candidates:
             try:
-                url = f"{maxscale_url.strip()}/v1/maxscale/modules/mariadbmon/switchover?{MAXSCALE_MONITOR}"
+                url = f"{maxscale_url}/v1/maxscale/modules/mariadbmon/switchover?{command}"
                 logger.info(f"  Intentando switchover via: {maxscale_url}")
                 
+                posted_at = _loop_time()
+                record_event("switchover_request", via=maxscale_url, target=target["id"],
+                             target_lag_s=target["lag"], waited_for_lag_s=round(waited, 2))
+                # Solo status y body dentro del async with: la conexión vuelve
+                # al pool antes de esperar al nuevo primary (hasta 30s).
                 async with self.session.post(url, auth=auth) as resp:
-                    if resp.status == 204:
-                        logger.info(f"✅ Switchover ejecutado exitosamente via {maxscale_url}")
-                        site_state["last_switchover_forced"] = datetime.now().isoformat()
-                        return True
-                    else:
-                        body = await resp.text()
-                        logger.warning(f"⚠️ Switchover falló en {maxscale_url}: HTTP {resp.status} — {body}")
-                        
+                    status = resp.status
+                    body = "" if status == 204 else await resp.text()
+                record_event("switchover_response", via=maxscale_url, status=status)
+                if status == 204:
+                    break
+                logger.warning(f"⚠️ Switchover falló en {maxscale_url}: HTTP {status} — {body}")
+                    
             except Exception as e:
                 logger.warning(f"⚠️ Error al conectar con {maxscale_url}: {e}")
+                record_event("switchover_response", via=maxscale_url, status=None, error=str(e))
                 continue
-        
-        logger.error("❌ Switchover falló: ningún MaxScale disponible")
-        return False
+        else:
+            logger.error("❌ Switchover falló: ningún MaxScale disponible")
+            SWITCHOVER_DURATION.labels(result="failure").observe(time.perf_counter() - start)
+            return False
+
+        logger.info(f"✅ Switchover ejecutado exitosamente via {maxscale_url}")
+        site_state["last_switchover_forced"] = datetime.now().isoformat()
+        SWITCHOVER_DURATION.labels(result="success").observe(time.perf_counter() - start)
+        # Write-unavailability: desde que MaxScale pone read_only al
+        # primary (inicio del POST) hasta que la mayoría ve al nuevo.
+        visible_after = await self._wait_for_primary(target["id"])
+        unavailable = None
+        if visible_after is not None:
+            unavailable = round(_loop_time() - posted_at, 2)
+        site_state["last_switchover"] = {
+            "at": site_state["last_switchover_forced"],
+            "via": maxscale_url,
+            "target": target["id"],
+            "target_lag_s": target["lag"],
+            "target_gtid": target["gtid"],
+            "waited_for_lag_s": round(waited, 2),
+            "write_unavailable_s": unavailable,
+        }
+        record_event("switchover_visible", target=target["id"],
+                     write_unavailable_s=unavailable)
+        logger.info(f"  Write-unavailability medida: {unavailable}s")
+        return True
 
     # =========================================================================
     # LOOP PRINCIPAL
@@ -320,9 +1185,11 @@ class SiteController:
            c) DB no primary → PASSIVE (scheduler OFF)
         4. Safety checks
         """
-        logger.info(f"Iniciando control loop (intervalo={CHECK_INTERVAL}s)")
+        logger.info(f"Iniciando control loop (tick de respaldo={CHECK_INTERVAL}s, fast-path por eventos)")
+        _set_role_metric(site_state["role"])
 
         while True:
+            loop_start = time.perf_counter()
             try:
                 # ─── 1. CONSULTAR ───
                 hc_status, db_primary = await asyncio.gather(
@@ -332,13 +1199,19 @@ class SiteController:
 
                 critical_healthy = hc_status.get("critical_healthy", False)
                 needs_failover = hc_status.get("needs_failover", False)
-
-                site_state["db_is_primary"] = db_primary
-                site_state["critical_healthy"] = critical_healthy
-                site_state["needs_failover"] = needs_failover
+                switchover_needed = db_primary and _switchover_needed(hc_status)
+
+                for field, value in (("db_is_primary", db_primary),
+                                     ("critical_healthy", critical_healthy),
+                                     ("needs_failover", needs_failover)):
+                    if site_state[field] != value:
+                        record_event("input_change", field=field, value=value)
+                    site_state[field] = value
                 site_state["last_check"] = datetime.now().isoformat()
 
-                # ─── 2. CONTADORES ───
+                # ─── 2. CONTADORES Y VENTANAS ───
+                # Los contadores quedan como observabilidad; las decisiones
+                # usan el tiempo que cada condición lleva sostenida.
                 if db_primary:
                     site_state["consecutive_primary"] += 1
                     site_state["consecutive_not_primary"] = 0
@@ -346,42 +1219,53 @@ class SiteController:
                     site_state["consecutive_not_primary"] += 1
                     site_state["consecutive_primary"] = 0
 
-                if needs_failover and db_primary:
+                if switchover_needed:
                     site_state["consecutive_failover_needed"] += 1
                 else:
                     site_state["consecutive_failover_needed"] = 0
 
+                now = _loop_time()
+                primary_for = self._track("primary", db_primary, now)
+                not_primary_for = self._track("not_primary", not db_primary, now)
+                failover_needed_for = self._track("failover_needed", switchover_needed, now)
+
                 current_role = site_state["role"]
 
                 # ─── 3. DECIDIR ───
 
                 # Caso A: DB primary + todo OK → PROMOTE a active
                 if current_role == "passive" and db_primary and critical_healthy:
-                    if site_state["consecutive_primary"] >= RECOVERY_THRESHOLD:
+                    if primary_for >= RECOVERY_WINDOW:
                         logger.info("=" * 70)
                         logger.info(f"  ✅ PROMOTE: {REGION_NAME} → ACTIVE")
                         logger.info("=" * 70)
                         await self.start_scheduler()
+                        self._start_promotion_probe()
                         site_state["role"] = "active"
                         site_state["last_transition"] = datetime.now().isoformat()
                         site_state["transition_reason"] = "db_primary_local_and_healthy"
+                        record_event("role_change", role="active", previous="passive",
+                                     reason="db_primary_local_and_healthy")
+                        ROLE_TRANSITIONS.labels(transition="promote").inc()
 
-                # Caso B: No tenemos DB local pero la necesitamos → FORZAR SWITCHOVER
-                elif not db_primary and needs_failover:
-                    if site_state["consecutive_failover_needed"] >= SWITCHOVER_THRESHOLD:
+                # Caso B: DB primary local pero un check crítico falla → FORZAR SWITCHOVER
+                elif switchover_needed:
+                    if failover_needed_for >= SWITCHOVER_WINDOW:
                         if FORCE_SWITCHOVER:
                             logger.info("=" * 70)
                             logger.info(f"  ⚠️  FORCED SWITCHOVER: {REGION_NAME}")
-                            logger.info(f"  DB no es local pero necesitamos acceso")
-                            logger.info(f"  Forzando switchover para traer DB a esta región")
+                            logger.info(f"  DB es local pero un check crítico falla")
+                            logger.info(f"  Forzando switchover para mover la DB a otra región")
                             logger.info("=" * 70)
 
                             # Forzar switchover de DB
                             success = await self.force_db_switchover()
                             
                             if success:
-                                # Reset counter para no re-ejecutar inmediatamente
+                                # Reiniciar ventana para no re-ejecutar inmediatamente
                                 site_state["consecutive_failover_needed"] = 0
+                                self._since["failover_needed"] = _loop_time()
+                                self._elapsed.discard("failover_needed")
                         else:
                             logger.warning(
                                 f"Switchover necesario pero FORCE_SWITCHOVER=false. "
@@ -390,14 +1274,18 @@ class SiteController:
 
                 # Caso C: DB no es primary → DEMOTE a passive
                 elif current_role == "active" and not db_primary:
-                    if site_state["consecutive_not_primary"] >= FAILOVER_THRESHOLD:
+                    if not_primary_for >= FAILOVER_WINDOW:
                         logger.info("=" * 70)
                         logger.info(f"  ⛔ DEMOTE: {REGION_NAME} → PASSIVE")
                         logger.info("=" * 70)
                         await self.stop_scheduler()
+                        self._cancel_promotion_probe()
                         site_state["role"] = "passive"
                         site_state["last_transition"] = datetime.now().isoformat()
                         site_state["transition_reason"] = "db_primary_moved"
+                        record_event("role_change", role="passive", previous="active",
+                                     reason="db_primary_moved")
+                        ROLE_TRANSITIONS.labels(transition="demote").inc()
 
                 # ─── 4. SAFETY CHECKS ───
                 if site_state["role"] == "active" and not site_state["scheduler_running"]:
@@ -410,6 +1298,14 @@ class SiteController:
                     logger.warning("[SAFETY] Passive pero scheduler corriendo → corrigiendo")
                     await self.stop_scheduler()
 
+                # ─── MÉTRICAS ───
+                _set_role_metric(site_state["role"])
+                for counter in ("consecutive_primary", "consecutive_not_primary",
+                                "consecutive_failover_needed"):
+                    HYSTERESIS_COUNTERS.labels(counter=counter).set(site_state[counter])
+
+                await self.save_state()
+
                 # ─── LOG ───
                 logger.info(
                     f"[{REGION_NAME}] "
@@ -424,7 +1320,8 @@ class SiteController:
             except Exception as e:
                 logger.error(f"Error en control loop: {e}", exc_info=True)
 
-            await asyncio.sleep(CHECK_INTERVAL)
+            CONTROL_LOOP_DURATION.observe(time.perf_counter() - loop_start)
+            await self.wait_for_wakeup(self._next_deadline(_loop_time()))
 
 
 # =============================================================================
@@ -439,37 +1336,57 @@ async def handle_health(request):
         "state": site_state,
         "config": {
             "force_switchover": FORCE_SWITCHOVER,
-            "switchover_threshold": SWITCHOVER_THRESHOLD,
-            "failover_threshold": FAILOVER_THRESHOLD,
-            "recovery_threshold": RECOVERY_THRESHOLD,
+            "standby_mode": STANDBY_MODE,
+            "switchover_window_s": SWITCHOVER_WINDOW,
+            "failover_window_s": FAILOVER_WINDOW,
+            "recovery_window_s": RECOVERY_WINDOW,
         }
     })
 
 
+# Respuestas pre-serializadas de /region-health. site_state se modifica desde
+# el control loop, los eventos de Docker y la restauración del snapshot: en vez
+# de invalidar en cada lugar, la clave son los campos que definen la respuesta.
+_region_health_cache: Dict[str, object] = {"key": None}
+
+
+def region_health_response(fmt: str) -> tuple:
+    """(status HTTP, body) de /region-health; solo re-serializa si cambió el estado."""
+    key = (
+        site_state["role"], site_state["critical_healthy"],
+        site_state["scheduler_running"], site_state["transition_reason"],
+    )
+    if key != _region_health_cache["key"]:
+        role, critical_healthy, scheduler_running, reason = key
+        if role == "active" and critical_healthy and scheduler_running:
+            status = 200
+            doc = {"region": REGION_NAME, "role": "active", "status": "healthy"}
+            text = f"UP {REGION_NAME} active\n"
+        else:
+            status = 503
+            doc = {"region": REGION_NAME, "role": role, "status": "not_ready", "reason": reason}
+            text = f"DOWN {REGION_NAME} {role} {reason or '-'}\n"
+        _region_health_cache.update({
+            "key": key,
+            "json": (status, json.dumps(doc).encode()),
+            "plain": (status, text.encode()),
+        })
+    return _region_health_cache[fmt]
+
+
 async def handle_region_health(request):
     """
     GET /region-health — Para HAProxy.
     200 solo si ACTIVE + critical healthy + scheduler running.
     """
-    is_ready = (
-        site_state["role"] == "active"
-        and site_state["critical_healthy"]
-        and site_state["scheduler_running"]
-    )
+    status, body = region_health_response("json")
+    return web.Response(body=body, status=status, content_type='application/json', charset='utf-8')
 
-    if is_ready:
-        return web.json_response({
-            "region": REGION_NAME,
-            "role": "active",
-            "status": "healthy",
-        })
-    else:
-        return web.json_response({
-            "region": REGION_NAME,
-            "role": site_state["role"],
-            "status": "not_ready",
-            "reason": site_state.get("transition_reason", "unknown"),
-        }, status=503)
+
+async def handle_region_health_plain(request):
+    """GET /region-health/plain — Mismo criterio en texto plano, para HAProxy."""
+    status, body = region_health_response("plain")
+    return web.Response(body=body, status=status, content_type='text/plain')
 
 
 async def handle_role(request):
@@ -477,6 +1394,31 @@ async def handle_role(request):
     return web.json_response({"region": REGION_NAME, "role": site_state["role"]})
 
 
+async def handle_timeline(request):
+    """
+    GET /timeline — Eventos del ring buffer (?since=<seq>&limit=<n>).
+    "clock" ancla el reloj monotonic de los eventos al reloj de pared.
+    """
+    try:
+        since = int(request.query.get('since', '0'))
+        limit = int(request.query.get('limit', str(TIMELINE_SIZE)))
+    except ValueError:
+        return web.json_response({"error": "since/limit deben ser enteros"}, status=400)
+    events = [e for e in timeline if e["seq"] > since]
+    return web.json_response({
+        "region": REGION_NAME,
+        "service": "site-controller",
+        "clock": {"monotonic": _loop_time(), "wall": time.time()},
+        "capacity": TIMELINE_SIZE,
+        "events": events[-limit:] if limit > 0 else [],
+    })
+
+
+async def handle_metrics(request):
+    """GET /metrics — Exposición Prometheus (solo serializa, no consulta nada)."""
+    return web.Response(body=generate_latest(METRICS_REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -490,7 +1432,10 @@ async def main():
     app = web.Application()
     app.router.add_get('/health', handle_health)
     app.router.add_get('/region-health', handle_region_health)
+    app.router.add_get('/region-health/plain', handle_region_health_plain)
     app.router.add_get('/role', handle_role)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/timeline', handle_timeline)
 
     runner = aiohttp.web_runner.AppRunner(app)
     await runner.setup()
@@ -499,8 +1444,10 @@ async def main():
 
     logger.info(f"Site controller escuchando en :{LISTEN_PORT}")
     logger.info("  GET /health        → Estado detallado")
-    logger.info("  GET /region-health → Para HAProxy (200/503)")
+    logger.info("  GET /region-health → Para HAProxy (200/503, /plain en texto)")
     logger.info("  GET /role          → Solo el rol")
+    logger.info("  GET /metrics       → Métricas Prometheus")
+    logger.info("  GET /timeline      → Eventos del failover (ring buffer)")
 
     try:
         await loop_task
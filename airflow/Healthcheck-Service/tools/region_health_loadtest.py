@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+ REGION-HEALTH LOAD TEST — rps por core de /region-health, antes y después
+==============================================================================
+
+ Levanta el handler REAL de healthcheck.py o site_controller.py en este
+ proceso (sin check loop ni control loop: el estado se fija a mano) y lo
+ bombardea desde procesos cliente separados, como varios frontends de HAProxy.
+
+ MODOS:
+ ──────
+   legacy  → el handler anterior (dict + datetime.now() + json por request),
+             copiado tal cual como línea base
+   json    → GET /region-health con el cuerpo pre-serializado
+   plain   → GET /region-health/plain
+
+ MÉTRICA:
+ ────────
+   rps/core = requests atendidos / segundos de CPU del proceso servidor.
+   Se mide con time.process_time() del servidor, así que no depende de
+   cuántos cores tenga la máquina ni de cuánto CPU se lleven los clientes.
+
+ USO:
+ ────
+   python tools/region_health_loadtest.py
+   python tools/region_health_loadtest.py --service site-controller --state unhealthy
+   python tools/region_health_loadtest.py --keepalive --duration 10 --clients 4
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SERVICES = {
+    "healthcheck": BASE_DIR / 'healthcheck' / 'healthcheck.py',
+    "site-controller": BASE_DIR / 'site-controller' / 'site_controller.py',
+}
+MODES = ("legacy", "json", "plain")
+
+
+# =============================================================================
+# SERVIDOR
+# =============================================================================
+
+def load_service(name: str, healthy: bool):
+    """Carga el módulo del servicio y fija un estado como lo dejaría su loop."""
+    logging.basicConfig(level=logging.CRITICAL)
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), SERVICES[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.REGION_NAME = "hornos"
+    if name == "healthcheck":
+        module.check_results.update({
+            "airflow": {"effective_status": "healthy" if healthy else "unhealthy"},
+            "redis": {"effective_status": "healthy"},
+            "db_primary": {"effective_status": "healthy"},
+        })
+        module.region_status.update({
+            "healthy": healthy, "critical_healthy": healthy,
+            "needs_failover": not healthy, "last_check": datetime.now().isoformat(),
+        })
+        module.refresh_region_health_cache()
+    else:
+        module.site_state.update({
+            "role": "active" if healthy else "passive", "critical_healthy": healthy,
+            "scheduler_running": healthy, "transition_reason": None if healthy else "db_primary_moved",
+        })
+    return module
+
+
+def legacy_handler(name: str, module):
+    """Handlers de /region-health previos al cache, copiados como línea base."""
+    if name == "healthcheck":
+        async def handle_region_health(request):
+            if module.region_status.get("critical_healthy"):
+                return web.json_response({
+                    "region": module.REGION_NAME,
+                    "status": "healthy",
+                    "timestamp": datetime.now().isoformat(),
+                })
+            else:
+                failed = [
+                    n for n, r in module.check_results.items()
+                    if n in module.CRITICAL_CHECKS and r.get("effective_status") != "healthy"
+                ]
+                return web.json_response({
+                    "region": module.REGION_NAME,
+                    "status": "unhealthy",
+                    "failed_critical_checks": failed,
+                    "timestamp": datetime.now().isoformat(),
+                }, status=503)
+        return handle_region_health
+
+    site_state = module.site_state
+
+    async def handle_region_health(request):
+        is_ready = (
+            site_state["role"] == "active"
+            and site_state["critical_healthy"]
+            and site_state["scheduler_running"]
+        )
+        if is_ready:
+            return web.json_response({
+                "region": module.REGION_NAME,
+                "role": "active",
+                "status": "healthy",
+            })
+        else:
+            return web.json_response({
+                "region": module.REGION_NAME,
+                "role": site_state["role"],
+                "status": "not_ready",
+                "reason": site_state.get("transition_reason", "unknown"),
+            }, status=503)
+    return handle_region_health
+
+
+async def run_mode(args, module, mode: str) -> dict:
+    handler = {
+        "legacy": legacy_handler(args.service, module),
+        "json": module.handle_region_health,
+        "plain": module.handle_region_health_plain,
+    }[mode]
+    app = web.Application()
+    app.router.add_get('/probe', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/probe"
+
+    cmd = [sys.executable, __file__, '--client-url', url, '--duration', str(args.duration),
+           '--concurrency', str(args.concurrency)] + (['--keepalive'] if args.keepalive else [])
+    cpu_start = time.process_time()
+    procs = [await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE) for _ in range(args.clients)]
+    outputs = await asyncio.gather(*(p.communicate() for p in procs))
+    cpu = time.process_time() - cpu_start
+    await runner.cleanup()
+
+    counts = [json.loads(out) for out, _ in outputs]
+    total = sum(c["requests"] for c in counts)
+    return {
+        "mode": mode,
+        "requests": total,
+        "errors": sum(c["errors"] for c in counts),
+        "rps": round(total / args.duration),
+        "server_cpu_s": round(cpu, 2),
+        "rps_per_core": round(total / cpu) if cpu else None,
+        "body_bytes": counts[0]["body_bytes"] if counts else None,
+    }
+
+
+# =============================================================================
+# CLIENTE
+# =============================================================================
+
+async def client(url: str, duration: float, concurrency: int, keepalive: bool):
+    """Un frontend de HAProxy: N probes en paralelo hasta el deadline."""
+    stats = {"requests": 0, "errors": 0, "body_bytes": None}
+    # HAProxy con "option http-server-close" abre una conexión por probe
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=not keepalive)
+    deadline = time.monotonic() + duration
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            while time.monotonic() < deadline:
+                try:
+                    async with session.get(url) as resp:
+                        body = await resp.read()
+                        stats["body_bytes"] = len(body)
+                        stats["requests" if resp.status in (200, 503) else "errors"] += 1
+                except aiohttp.ClientError:
+                    stats["errors"] += 1
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    print(json.dumps(stats))
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test de /region-health (rps por core)")
+    parser.add_argument('--service', choices=list(SERVICES), default="healthcheck")
+    parser.add_argument('--state', choices=("healthy", "unhealthy"), default="healthy")
+    parser.add_argument('--modes', default=",".join(MODES))
+    parser.add_argument('--duration', type=float, default=5.0, help="segundos por modo")
+    parser.add_argument('--clients', type=int, default=2, help="procesos cliente (frontends)")
+    parser.add_argument('--concurrency', type=int, default=16, help="probes en paralelo por cliente")
+    parser.add_argument('--keepalive', action='store_true', help="reusar conexiones (default: una por probe)")
+    parser.add_argument('--client-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.client_url:
+        asyncio.run(client(args.client_url, args.duration, args.concurrency, args.keepalive))
+        return
+
+    module = load_service(args.service, args.state == "healthy")
+    print(f"{args.service} /region-health ({args.state}), {args.clients}×{args.concurrency} clientes, "
+          f"{args.duration:g}s por modo, {'keep-alive' if args.keepalive else 'conexión por request'}")
+    results = [asyncio.run(run_mode(args, module, mode)) for mode in args.modes.split(',')]
+
+    headers = ["mode", "requests", "errors", "rps", "server_cpu_s", "rps_per_core", "body_bytes"]
+    widths = {h: max(len(h), *(len(str(r[h])) for r in results)) for h in headers}
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    for r in results:
+        print("  ".join(str(r[h]).ljust(widths[h]) for h in headers))
+    base = next((r for r in results if r["mode"] == "legacy"), None)
+    if base and base["rps_per_core"]:
+        for r in results:
+            if r is not base and r["rps_per_core"]:
+                print(f"{r['mode']}: {r['rps_per_core'] / base['rps_per_core']:.2f}× rps/core vs legacy")
+
+
+if __name__ == '__main__':
+    main()
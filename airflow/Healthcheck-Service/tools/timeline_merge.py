@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+ TIMELINE MERGE — Desglose por fase de cada incidente de failover
+==============================================================================
+
+ Lee GET /timeline de los healthchecks y site-controllers de todas las
+ regiones (o los mismos documentos guardados como JSON), alinea los relojes
+ y separa los eventos en incidentes.
+
+ ALINEACIÓN:
+ ───────────
+   Cada evento trae "t" en el reloj monotonic de su proceso. El documento
+   incluye "clock": {monotonic, wall} tomados en el mismo instante, así que
+   wall(evento) = t + (clock.wall - clock.monotonic). El error entre regiones
+   es el desvío de NTP entre hosts, no el del reloj monotonic.
+
+ INCIDENTE:
+ ──────────
+   Empieza con una falla en la región ACTIVE: un check crítico que deja de
+   estar healthy, needs_failover=true o la DB local que deja de ser primary.
+   Termina SETTLE segundos después de la promoción de la nueva región (para
+   capturar el primer heartbeat del scheduler) o, sin promoción, tras GAP
+   segundos sin eventos.
+
+ FASES (cada hito es el primer evento que lo cumple desde la falla):
+ ──────────────────────────────────────────────────────────────────
+   detection     falla → healthcheck confirma (hysteresis) o MaxScale mueve la DB
+   hysteresis    → SWITCHOVER_WINDOW cumplida en la región que falla
+   switchover    → la DB es primary en la nueva región
+   promote_wait  → ventana de recovery cumplida y healthcheck healthy en la nueva región
+   unpause       → docker unpause del scheduler terminado
+   role_change   → nueva región ACTIVE (fin del RTO)
+   warmup        → primer heartbeat del scheduler promovido
+
+   Un hito ausente (ej. hysteresis cuando MaxScale ya movió la DB solo) se
+   muestra "-"; la duración de cada fase se mide desde el hito anterior
+   presente, así que las duraciones suman el RTO. El demote de la región que
+   falla no está en el camino crítico y se reporta aparte.
+
+ USO:
+ ────
+   python tools/timeline_merge.py \\
+       http://localhost:8001 http://localhost:8002 \\
+       http://localhost:8011 http://localhost:8012
+   python tools/timeline_merge.py dump/*.json --json incidents.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+
+SETTLE = 60.0   # segundos tras la promoción que siguen siendo del incidente
+GAP = 300.0     # sin promoción: silencio que cierra el incidente
+
+
+# =============================================================================
+# CARGA Y ALINEACIÓN
+# =============================================================================
+
+async def fetch_timeline(session: aiohttp.ClientSession, base_url: str) -> dict:
+    url = f"{base_url.rstrip('/')}/timeline"
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+async def load_sources(specs: List[str], timeout: float) -> List[dict]:
+    """URLs http(s) en paralelo; cualquier otra cosa se lee como archivo JSON."""
+    urls = [s for s in specs if s.startswith(('http://', 'https://'))]
+    docs = []
+    for path in (s for s in specs if s not in urls):
+        with open(path) as f:
+            docs.append(json.load(f))
+    if urls:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            results = await asyncio.gather(*(fetch_timeline(session, u) for u in urls), return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  {url}: {result}", file=sys.stderr)
+            else:
+                docs.append(result)
+    return docs
+
+
+def merge(docs: List[dict]) -> List[dict]:
+    """Une los eventos de todos los documentos en un único orden por reloj de pared."""
+    merged = []
+    for doc in docs:
+        offset = doc["clock"]["wall"] - doc["clock"]["monotonic"]
+        for event in doc["events"]:
+            merged.append({
+                **event,
+                "wall": event["t"] + offset,
+                "region": doc["region"],
+                "service": doc["service"],
+            })
+    merged.sort(key=lambda e: (e["wall"], e["service"] != "healthcheck", e["seq"]))
+    return merged
+
+
+# =============================================================================
+# INCIDENTES
+# =============================================================================
+
+def _is_fault(event: dict) -> bool:
+    kind = event["kind"]
+    if event["service"] == "healthcheck":
+        return (kind == "check_flip" and event.get("critical") and event.get("previous") is not None
+                and event["status"] != "healthy")
+    return kind == "input_change" and (
+        (event["field"] == "db_is_primary" and event["value"] is False)
+        or (event["field"] == "needs_failover" and event["value"] is True)
+    )
+
+
+def _is_promotion(event: dict) -> bool:
+    return event["kind"] == "role_change" and event["role"] == "active"
+
+
+def split_incidents(events: List[dict], settle: float = SETTLE, gap: float = GAP) -> List[List[dict]]:
+    """
+    Corta el timeline mezclado en incidentes. Solo una falla en la región que
+    está ACTIVE (según el último role_change visto) abre un incidente: la
+    región pasiva reporta db_primary unhealthy todo el tiempo.
+    """
+    roles: Dict[str, str] = {}
+    incidents: List[List[dict]] = []
+    current: Optional[List[dict]] = None
+    closes_at = None
+
+    for event in events:
+        if current is not None and event["wall"] > closes_at:
+            incidents.append(current)
+            current = None
+        if current is None:
+            if _is_fault(event) and roles.get(event["region"]) == "active":
+                current = [event]
+                closes_at = event["wall"] + gap
+        else:
+            current.append(event)
+            if _is_promotion(event):
+                closes_at = min(closes_at, event["wall"] + settle)
+            elif not any(_is_promotion(e) for e in current):
+                closes_at = event["wall"] + gap
+        if event["kind"] == "role_change":
+            roles[event["region"]] = event["role"]
+
+    if current is not None:
+        incidents.append(current)
+    return incidents
+
+
+def _first(events: List[dict], match: Callable[[dict], bool]) -> Optional[dict]:
+    return next((e for e in events if match(e)), None)
+
+
+def _last_gate(events: List[dict], until: Optional[dict], gates: List[Callable[[dict], bool]]) -> Optional[dict]:
+    """El último en cumplirse de varios requisitos previos a "until" (el que habilitó la acción)."""
+    if until is None:
+        return None
+    found = [_first(reversed([e for e in events if e["wall"] <= until["wall"]]), g) for g in gates]
+    found = [e for e in found if e is not None]
+    return max(found, key=lambda e: e["wall"]) if found else None
+
+
+def breakdown(incident: List[dict]) -> dict:
+    """Hitos y duración de cada fase de un incidente."""
+    fault = incident[0]
+    faulty = fault["region"]
+    promoted = _first(incident, lambda e: _is_promotion(e) and e["service"] == "site-controller")
+    target = promoted["region"] if promoted else None
+
+    def at(region, service, kind, **fields):
+        return lambda e: (
+            e["region"] == region and e["service"] == service and e["kind"] == kind
+            and all(e.get(k) in v if isinstance(v, tuple) else e.get(k) == v for k, v in fields.items())
+        )
+
+    milestones: List[Tuple[str, Optional[dict]]] = [
+        ("detection", _first(incident, lambda e: (
+            at(faulty, "healthcheck", "effective_change", critical=True,
+               status=("unhealthy", "degraded_latency"))(e)
+            or at(faulty, "site-controller", "input_change", field="db_is_primary", value=False)(e)
+        ))),
+        ("hysteresis", _first(incident, at(faulty, "site-controller", "window_elapsed",
+                                           condition="failover_needed"))),
+        ("switchover", _first(incident, at(target, "site-controller", "input_change",
+                                           field="db_is_primary", value=True))),
+        ("promote_wait", _last_gate(incident, promoted, [
+            at(target, "site-controller", "window_elapsed", condition="primary"),
+            at(target, "site-controller", "input_change", field="critical_healthy", value=True),
+        ])),
+        ("unpause", _first(incident, at(target, "site-controller", "docker", operation="unpause"))),
+        ("role_change", promoted),
+        ("warmup", _first(incident, at(target, "site-controller", "promotion", milestone="scheduler_heartbeat"))),
+    ]
+
+    phases = []
+    previous = fault["wall"]
+    for name, event in milestones:
+        if event is None:
+            phases.append({"phase": name, "at_s": None, "duration_s": None})
+            continue
+        phases.append({
+            "phase": name,
+            "at_s": round(event["wall"] - fault["wall"], 2),
+            "duration_s": round(max(0.0, event["wall"] - previous), 2),
+            "region": event["region"],
+            "event": event["kind"],
+        })
+        previous = max(previous, event["wall"])
+
+    switchover = _first(incident, lambda e: e["kind"] == "switchover_visible")
+    demoted = _first(incident, lambda e: e["kind"] == "role_change" and e["role"] == "passive")
+    return {
+        "started": datetime.fromtimestamp(fault["wall"]).isoformat(timespec='milliseconds'),
+        "faulty_region": faulty,
+        "fault": {k: fault.get(k) for k in ("service", "kind", "check", "field", "status", "value", "detail")
+                  if fault.get(k) is not None},
+        "promoted_region": target,
+        "rto_s": round(promoted["wall"] - fault["wall"], 2) if promoted else None,
+        "demote_at_s": round(demoted["wall"] - fault["wall"], 2) if demoted else None,
+        "write_unavailable_s": switchover.get("write_unavailable_s") if switchover else None,
+        "phases": phases,
+        "events": len(incident),
+    }
+
+
+# =============================================================================
+# REPORTE
+# =============================================================================
+
+def print_report(reports: List[dict]):
+    if not reports:
+        print("Sin incidentes en los timelines recibidos.")
+        return
+    for i, r in enumerate(reports, 1):
+        fault = ", ".join(f"{k}={v}" for k, v in r["fault"].items())
+        print(f"Incidente {i} — {r['started']} — región {r['faulty_region']} ({fault})")
+        print(f"  RTO: {r['rto_s'] if r['rto_s'] is not None else 'sin promoción'}"
+              f"{'s' if r['rto_s'] is not None else ''} → {r['promoted_region'] or '-'}"
+              f" | demote en {r['demote_at_s'] if r['demote_at_s'] is not None else '-'}s"
+              f" | write-unavailable {r['write_unavailable_s'] if r['write_unavailable_s'] is not None else '-'}s")
+        print(f"  {'fase':<14}{'duración':>10}{'t+':>10}  evento")
+        for p in r["phases"]:
+            if p["at_s"] is None:
+                print(f"  {p['phase']:<14}{'-':>10}{'-':>10}")
+            else:
+                print(f"  {p['phase']:<14}{p['duration_s']:>9.2f}s{p['at_s']:>9.2f}s  "
+                      f"{p['region']}/{p['event']}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mezcla timelines de todas las regiones y desglosa cada incidente")
+    parser.add_argument('sources', nargs='+', help="URL base del servicio (se consulta /timeline) o archivo JSON")
+    parser.add_argument('--settle', type=float, default=SETTLE, help="segundos tras la promoción dentro del incidente")
+    parser.add_argument('--gap', type=float, default=GAP, help="silencio que cierra un incidente sin promoción")
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--json', help="guardar el desglose en este archivo")
+    args = parser.parse_args()
+
+    docs = asyncio.run(load_sources(args.sources, args.timeout))
+    events = merge(docs)
+    reports = [breakdown(incident) for incident in split_incidents(events, args.settle, args.gap)]
+    print(f"{len(events)} eventos de {len(docs)} timelines, {len(reports)} incidentes\n")
+    print_report(reports)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Desglose → {args.json}")
+
+
+if __name__ == '__main__':
+    main()
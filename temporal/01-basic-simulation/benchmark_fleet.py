@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark de FleetDeploymentWorkflow con 1.000 routers simulados.
+
+Corre en el test server de Temporal con time-skipping
+(WorkflowEnvironment.start_time_skipping, no necesita un servidor en
+localhost:7233). Cada router es un child workflow SimulatedRouterDeployment que
+"tarda" entre 30s y 3min de tiempo de workflow y falla con probabilidad
+--failure-rate. Gracias al time-skipping, horas de rollout simulado corren en
+segundos.
+
+Reporta, por configuración:
+  - status, exitosos/fallidos/no lanzados
+  - tiempo simulado del rollout y tiempo real del benchmark
+  - ejecuciones (continue-as-new) y eventos de historia por ejecución: sin
+    continue-as-new la historia crece con la flota (límite de Temporal:
+    50.000 eventos); con continue-as-new queda acotada
+
+Uso:
+    python benchmark_fleet.py
+    python benchmark_fleet.py --routers 1000 --concurrency 50 --every 200 --failure-rate 0.02
+    python benchmark_fleet.py --failure-rate 0.5     # el circuit breaker corta el rollout
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+from temporalio import workflow
+from temporalio.client import Client
+from temporalio.exceptions import ApplicationError
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from fleet_workflow import FleetDeploymentWorkflow
+from models import FleetDeploymentRequest, NetworkDeploymentRequest
+
+TASK_QUEUE_NAME = "fleet-benchmark-queue"
+
+
+@workflow.defn
+class SimulatedRouterDeployment:
+    """Despliegue simulado de un router: solo timers, sin activities."""
+
+    @workflow.run
+    async def run(self, request: NetworkDeploymentRequest) -> str:
+        failure_rate = float(request.software_version.split("@")[1])
+        await workflow.sleep(timedelta(seconds=30 + 150 * workflow.random().random()))
+        if workflow.random().random() < failure_rate:
+            raise ApplicationError(f"Simulated failure on {request.router_id}", non_retryable=True)
+        return f"Router {request.router_id} deployed"
+
+
+async def history_per_run(client: Client, workflow_id: str, run_id: str) -> list:
+    """Eventos de cada ejecución de la cadena de continue-as-new."""
+    counts = []
+    while run_id:
+        history = await client.get_workflow_handle(workflow_id, run_id=run_id).fetch_history()
+        counts.append(len(history.events))
+        last = history.events[-1]
+        run_id = (last.workflow_execution_continued_as_new_event_attributes.new_execution_run_id
+                  if last.HasField("workflow_execution_continued_as_new_event_attributes") else None)
+    return counts
+
+
+async def run_fleet(env: WorkflowEnvironment, args, every: int) -> dict:
+    # La tasa de fallos viaja en software_version para no tocar el modelo
+    routers = [
+        NetworkDeploymentRequest(
+            router_id=f"router-{i:05d}",
+            router_ip=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            software_version=f"sim@{args.failure_rate}",
+        )
+        for i in range(args.routers)
+    ]
+    request = FleetDeploymentRequest(
+        routers=routers,
+        child_workflow="SimulatedRouterDeployment",
+        max_concurrent=args.concurrency,
+        canary_size=args.canary,
+        max_failure_ratio=args.max_failure_ratio,
+        continue_as_new_every=every,
+    )
+    workflow_id = f"fleet-bench-{uuid.uuid4().hex[:8]}"
+
+    sim_start = await env.get_current_time()
+    wall_start = time.perf_counter()
+    handle = await env.client.start_workflow(
+        FleetDeploymentWorkflow.run, request, id=workflow_id, task_queue=TASK_QUEUE_NAME,
+    )
+    result = await handle.result()
+    wall = time.perf_counter() - wall_start
+    sim = (await env.get_current_time() - sim_start).total_seconds()
+
+    events = await history_per_run(env.client, workflow_id, handle.first_execution_run_id)
+    return {
+        "every": every,
+        "status": result.status,
+        "succeeded": result.succeeded,
+        "failed": len(result.failed),
+        "not_started": result.not_started,
+        "runs": len(events),
+        "max_events": max(events),
+        "total_events": sum(events),
+        "sim_min": sim / 60,
+        "wall_s": wall,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de FleetDeploymentWorkflow (time-skipping)")
+    parser.add_argument("--routers", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--canary", type=int, default=5)
+    parser.add_argument("--every", type=int, default=200, help="routers por ejecución (continue-as-new)")
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--max-failure-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"FLEET BENCHMARK: {args.routers} routers, ventana {args.concurrency}, canary {args.canary}, "
+          f"fallos {args.failure_rate:.0%}")
+    print("=" * 80)
+
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        async with Worker(env.client, task_queue=TASK_QUEUE_NAME,
+                          workflows=[FleetDeploymentWorkflow, SimulatedRouterDeployment]):
+            # Sin continue-as-new (toda la flota en una ejecución) vs cada --every
+            results = [await run_fleet(env, args, every) for every in (args.routers, args.every)]
+
+    print(f"{'can every':>10}{'status':>14}{'ok':>6}{'fail':>6}{'skip':>6}{'runs':>6}"
+          f"{'max ev/run':>12}{'total ev':>10}{'sim min':>9}{'wall s':>8}")
+    for r in results:
+        print(f"{r['every']:>10}{r['status']:>14}{r['succeeded']:>6}{r['failed']:>6}{r['not_started']:>6}"
+              f"{r['runs']:>6}{r['max_events']:>12}{r['total_events']:>10}{r['sim_min']:>9.1f}{r['wall_s']:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,34 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional, List
 
 @dataclass
 class NetworkDeploymentRequest:
     router_id: str
     router_ip: str
-    software_version: str
\ No newline at end of file
+    software_version: str
+
+@dataclass
+class FleetDeploymentRequest:
+    routers: List[NetworkDeploymentRequest]
+    child_workflow: str                 # workflow que despliega un router
+    task_queue: Optional[str] = None    # None = la task queue del fleet
+    child_signal: Optional[str] = None  # signal enviado a cada child al iniciarlo
+    max_concurrent: int = 10            # ventana de routers en paralelo
+    canary_size: int = 1                # primer lote; si falla alguno, se aborta
+    max_failure_ratio: float = 0.2      # circuit breaker: fallidos / terminados
+    min_failure_sample: int = 10        # terminados antes de evaluar el ratio
+    continue_as_new_every: int = 200    # routers por ejecución (historia acotada)
+    # Estado que se arrastra entre continue-as-new
+    succeeded: int = 0
+    failed: List[str] = field(default_factory=list)
+    canary_done: bool = False
+    runs: int = 1
+
+@dataclass
+class FleetDeploymentResult:
+    status: str  # "completed", "canary_failed", "circuit_open"
+    total: int
+    succeeded: int
+    failed: List[str]
+    not_started: int
+    runs: int
\ No newline at end of file
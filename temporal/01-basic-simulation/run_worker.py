@@ -1,7 +1,9 @@
 import asyncio
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 from workflows import NetworkDeploymentWorkflow
+from fleet_workflow import FleetDeploymentWorkflow
 from activities import (
     provision_router_infrastructure,
     deploy_router_software,
@@ -13,13 +15,13 @@ TASK_QUEUE_NAME = "network-deployment-queue"
 
 async def main():
     # Conectar al servidor Temporal local
-    client = await Client.connect("localhost:7233", namespace="default")
+    client = await Client.connect("localhost:7233", namespace="default", data_converter=data_converter())
     
     # Crear worker
     worker = Worker(
         client,
         task_queue=TASK_QUEUE_NAME,
-        workflows=[NetworkDeploymentWorkflow],
+        workflows=[NetworkDeploymentWorkflow, FleetDeploymentWorkflow],
         activities=[
             provision_router_infrastructure,
             deploy_router_software,
@@ -1,5 +1,6 @@
 import asyncio
 from temporalio.client import Client
+from payload_codec import data_converter
 from workflows import NetworkDeploymentWorkflow
 from models import NetworkDeploymentRequest
 
@@ -7,7 +8,7 @@ TASK_QUEUE_NAME = "network-deployment-queue"
 
 async def main():
     # Conectar al servidor Temporal
-    client = await Client.connect("localhost:7233", namespace="default")
+    client = await Client.connect("localhost:7233", namespace="default", data_converter=data_converter())
     
     # Crear request de despliegue
     deployment_request = NetworkDeploymentRequest(
@@ -1,10 +1,36 @@
 import asyncio
 import httpx
-import subprocess
+import os
 from datetime import datetime
+from pathlib import Path
+from typing import List
 from temporalio import activity
+from ansible_batch import AnsibleBatcher, AnsibleBatchRunner
+from ansible_jobs import AnsibleJobClient
+from ansible_progress import AnsibleProgress
+from command_runner import run_command
+from docker_api import docker_api
 from models import NetworkDeploymentRequest
 
+# Job server del contenedor ansible-runner (ansible-sidecar/job_server.py):
+# Ansible precargado y un fork por playbook, en lugar de un `docker exec
+# ansible-playbook` por despliegue. ANSIBLE_JOB_API="" vuelve a docker exec
+ANSIBLE_JOB_API = os.environ.get("ANSIBLE_JOB_API", "http://localhost:8700")
+ansible_jobs = AnsibleJobClient(ANSIBLE_JOB_API) if ANSIBLE_JOB_API else None
+
+# Provisioning en batch: una corrida de ansible-playbook para varios routers.
+# ANSIBLE_BATCH_WINDOW > 0 hace que provision_router_via_ansible_runner junte
+# los pedidos que llegan dentro de esa ventana (ej. un FleetDeploymentWorkflow)
+ANSIBLE_BATCH_WINDOW = float(os.environ.get("ANSIBLE_BATCH_WINDOW", "0"))
+ansible_batch_runner = AnsibleBatchRunner(
+    docker_cmd=["docker"],
+    project_dir=Path(__file__).resolve().parent / "ansible-playbooks",
+    forks=int(os.environ.get("ANSIBLE_FORKS", "20")),
+    job_client=ansible_jobs,
+)
+ansible_batcher = AnsibleBatcher(ansible_batch_runner, window_s=ANSIBLE_BATCH_WINDOW)
+
+
 class NetworkActivitiesWithSemaphore:
     
     @activity.defn
@@ -17,18 +43,37 @@ class NetworkActivitiesWithSemaphore:
         activity.logger.info(f"[ANSIBLE RUNNER] Deploying router {request.router_id}")
         
         # SOLO usar Ansible Runner, sin fallback
-        deployment_result = await self._deploy_via_ansible_runner(request)
+        if ANSIBLE_BATCH_WINDOW > 0:
+            deployment_result = await ansible_batcher.provision(request, heartbeat=activity.heartbeat)
+        else:
+            deployment_result = await self._deploy_via_ansible_runner(request)
         
         if deployment_result["success"]:
             print("✅ ROUTER DESPLEGADO VIA ANSIBLE RUNNER!")
             print(f"📋 Container: {request.router_id}")
             print("="*80)
+            summary = deployment_result.get("summary")
+            if summary:
+                return (f"[ANSIBLE RUNNER SUCCESS] Router {request.router_id} deployed at {request.router_ip} "
+                        f"({summary['tasks']} tasks, {summary['totals'].get('changed', 0)} changed)")
             return f"[ANSIBLE RUNNER SUCCESS] Router {request.router_id} deployed at {request.router_ip}"
         else:
             print("❌ ANSIBLE RUNNER FALLÓ")
             print("="*80)
             raise Exception(f"Ansible Runner deployment failed: {deployment_result['error']}")
     
+    @activity.defn
+    async def provision_routers_batch(self, requests: List[NetworkDeploymentRequest]) -> List[dict]:
+        """Despliega N routers con una sola corrida de Ansible; un resultado por router, en orden"""
+        
+        print("\n" + "="*80)
+        print(f"🔧 ANSIBLE RUNNER: Desplegando {len(requests)} routers en batch")
+        print("="*80)
+        activity.logger.info(f"[ANSIBLE RUNNER] Batch deploy of {len(requests)} routers")
+        
+        outcomes = await ansible_batch_runner.run(requests, heartbeat=activity.heartbeat)
+        return [outcomes[request.router_id] for request in requests]
+    
     async def _deploy_via_ansible_runner(self, request: NetworkDeploymentRequest) -> dict:
         """Despliega via Ansible Runner (SIN fallback)"""
         
@@ -36,14 +81,14 @@ class NetworkActivitiesWithSemaphore:
             print(f"🔍 Ejecutando Ansible Runner...")
             
             # Verificar que el contenedor ansible-runner esté corriendo
-            check_cmd = ["docker", "ps", "--filter", "name=ansible-runner", "--format", "{{.Names}}"]
-            check_result = subprocess.run(check_cmd, capture_output=True, text=True)
-            
-            if "ansible-runner" not in check_result.stdout:
+            if "ansible-runner" not in await docker_api.container_names("ansible-runner"):
                 return {"success": False, "error": "ansible-runner container not running"}
             
             print("✅ Contenedor ansible-runner encontrado")
             
+            if ansible_jobs is not None:
+                return await self._deploy_via_job_api(request)
+            
             # Ejecutar ansible-playbook dentro del contenedor
             ansible_cmd = [
                 "docker", "exec", "ansible-runner",
@@ -56,29 +101,54 @@ class NetworkActivitiesWithSemaphore:
             
             print(f"🚀 Ejecutando: {' '.join(ansible_cmd)}")
             
-            result = subprocess.run(
+            # La salida va línea por línea al log rotativo y a los contadores
+            # de progreso (heartbeat details); en memoria quedan solo las
+            # últimas líneas de stderr
+            progress = AnsibleProgress(request.router_id, heartbeat=activity.heartbeat)
+            result = await run_command(
                 ansible_cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minutos máximo
+                timeout=300,  # 5 minutos máximo
+                on_line=progress.on_line,
+                heartbeat=progress.heartbeat,
+                keep_lines=20
             )
             
-            # Debug: Mostrar más información
-            print(f"🔍 Debug - stdout: {result.stdout}")
-            print(f"🔍 Debug - stderr: {result.stderr}")
-            print(f"🔍 Debug - returncode: {result.returncode}")
-            
-            if result.returncode == 0:
-                print("✅ Ansible playbook ejecutado exitosamente")
-                print(f"Output: {result.stdout}")
-                return {"success": True, "output": result.stdout}
-            else:
-                print(f"❌ Ansible playbook falló: {result.stderr}")
-                return {"success": False, "error": f"Ansible failed: {result.stderr}"}
+            print(f"🔍 Debug - returncode: {result.returncode} ({result.duration_s:.1f}s)")
+            return self._ansible_outcome(
+                progress.summary(result.returncode, result.duration_s, stderr_tail=result.stderr)
+            )
                 
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _deploy_via_job_api(self, request: NetworkDeploymentRequest) -> dict:
+        """Despliega con el job server de ansible-runner: eventos en vivo, sin docker exec"""
+        
+        print(f"🚀 Enviando job a {ANSIBLE_JOB_API}: deploy_router.yml")
+        progress = AnsibleProgress(request.router_id, heartbeat=activity.heartbeat)
+        job = await ansible_jobs.run(
+            "deploy_router.yml",
+            extravars={"router_id": request.router_id, "router_ip": request.router_ip},
+            timeout=300,  # 5 minutos máximo
+            on_event=progress.on_event,
+            heartbeat=progress.heartbeat,
+            keep_events=False
+        )
+        
+        print(f"🔍 Debug - job {job.id} rc: {job.rc} ({job.duration_s:.1f}s)")
+        summary = progress.summary(job.rc, job.duration_s)
+        summary["job_id"] = job.id
+        return self._ansible_outcome(summary)
+    
+    @staticmethod
+    def _ansible_outcome(summary: dict) -> dict:
+        """Resultado compacto: el log completo queda en summary['log']"""
+        if summary["rc"] == 0:
+            print(f"✅ Ansible playbook ejecutado exitosamente (log: {summary['log']})")
+            return {"success": True, "summary": summary}
+        print(f"❌ Ansible playbook falló: {AnsibleProgress.describe(summary)}")
+        return {"success": False, "summary": summary, "error": f"Ansible failed: {AnsibleProgress.describe(summary)}"}
+    
 
     async def _verify_router_container(self, router_id: str) -> dict:
         """Verifica que el container router existe y está corriendo"""
@@ -86,11 +156,9 @@ class NetworkActivitiesWithSemaphore:
         try:
             print(f"🔍 Verificando container: {router_id}")
             
-            result = subprocess.run([
-                "docker", "ps", "--filter", f"name={router_id}", "--format", "{{.Names}}"
-            ], capture_output=True, text=True)
+            names = await docker_api.container_names(router_id)
             
-            container_exists = router_id in result.stdout
+            container_exists = router_id in names
             
             if container_exists:
                 print(f"✅ Container {router_id} está corriendo")
@@ -180,9 +248,9 @@ class NetworkActivitiesWithSemaphore:
         
         # Intentar ping desde el router
         try:
-            ping_result = subprocess.run([
-                "docker", "exec", request.router_id, "ping", "-c", "2", "8.8.8.8"
-            ], capture_output=True, text=True, timeout=10)
+            ping_result = await docker_api.exec(request.router_id, [
+                "ping", "-c", "2", "8.8.8.8"
+            ], timeout=10)
             
             if ping_result.returncode == 0:
                 print("✅ Router tiene conectividad de red")
@@ -207,9 +275,7 @@ class NetworkActivitiesWithSemaphore:
         
         try:
             # Remover container si existe
-            subprocess.run([
-                "docker", "rm", "-f", request.router_id
-            ], capture_output=True)
+            await docker_api.remove_container(request.router_id)
             
             print(f"✅ Cleanup completado para {request.router_id}")
             return f"Cleanup completed for {request.router_id}"
@@ -220,6 +286,7 @@ class NetworkActivitiesWithSemaphore:
 # Instanciar activities
 activities = NetworkActivitiesWithSemaphore()
 provision_router_via_ansible_runner = activities.provision_router_via_ansible_runner
+provision_routers_batch = activities.provision_routers_batch
 deploy_router_software = activities.deploy_router_software
 validate_router_deployment = activities.validate_router_deployment
 cleanup_failed_deployment = activities.cleanup_failed_deployment
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Callback stdout de Ansible para job_server.py: un evento JSON por línea.
+
+Escribe en el archivo JOB_EVENTS_FILE (o stdout si no está definido) eventos
+chicos, pensados para transmitirse mientras corre el playbook:
+
+    {"event": "task_start", "task": "...", "t": ...}
+    {"event": "ok"|"failed"|"skipped"|"unreachable", "host": "...",
+     "task": "...", "changed": bool, "msg": "..." (solo fallas), "t": ...}
+    {"event": "stats", "hosts": {host: {ok, changed, failures, ...}}, "t": ...}
+"""
+import json
+import os
+import sys
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+DOCUMENTATION = """
+    name: job_events
+    type: stdout
+    short_description: eventos JSON por línea para el job server
+    description:
+      - Un evento por línea (task_start, ok, failed, skipped, unreachable, stats).
+"""
+
+MAX_MSG_CHARS = 500
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "stdout"
+    CALLBACK_NAME = "job_events"
+
+    def __init__(self):
+        super().__init__()
+        path = os.environ.get("JOB_EVENTS_FILE")
+        self._out = open(path, "a", buffering=1) if path else sys.stdout
+
+    def _emit(self, event: str, **fields):
+        fields.update(event=event, t=round(time.time(), 3))
+        self._out.write(json.dumps(fields, default=str) + "\n")
+        self._out.flush()
+
+    @staticmethod
+    def _host_result(result, error: bool = False) -> dict:
+        data = result._result
+        fields = {
+            "host": result._host.get_name(),
+            "task": result._task.get_name(),
+            "changed": bool(data.get("changed")),
+        }
+        if error:
+            fields["msg"] = str(data.get("msg") or data.get("stderr") or data.get("stdout") or "")[:MAX_MSG_CHARS]
+        return fields
+
+    def v2_playbook_on_play_start(self, play):
+        self._emit("play_start", play=play.get_name())
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._emit("task_start", task=task.get_name())
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._emit("task_start", task=task.get_name(), handler=True)
+
+    def v2_runner_on_ok(self, result):
+        self._emit("ok", **self._host_result(result))
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._emit("failed", ignore_errors=ignore_errors, **self._host_result(result, error=True))
+
+    def v2_runner_on_skipped(self, result):
+        self._emit("skipped", **self._host_result(result))
+
+    def v2_runner_on_unreachable(self, result):
+        self._emit("unreachable", **self._host_result(result, error=True))
+
+    def v2_playbook_on_stats(self, stats):
+        hosts = sorted(stats.processed.keys())
+        self._emit("stats", hosts={host: stats.summarize(host) for host in hosts})
@@ -0,0 +1,253 @@
+"""
+Provisioning de muchos routers con una sola corrida de ansible-playbook.
+
+`docker exec ansible-runner ansible-playbook deploy_router.yml -e router_id=...`
+por router paga cada vez el arranque de Ansible, el parseo del playbook y el
+`docker pull` de la imagen. AnsibleBatchRunner despliega N routers en una
+corrida:
+
+  - renderiza un inventario temporal con un host por router (grupo
+    [routers], connection local, router_id/router_ip y opcionalmente
+    router_labels como host vars) en el directorio del proyecto montado en
+    el contenedor
+  - corre el playbook con -e target_group=routers, `forks` hosts en paralelo
+    y pipelining
+  - parsea el resultado por host del callback json (stats + la tarea que
+    lo hizo fallar) y lo devuelve por router_id
+
+Con job_client (ansible_jobs.AnsibleJobClient) el batch va al job server
+del contenedor en lugar de `docker exec`: el inventario viaja en el pedido y
+el resultado por host sale de los eventos del job.
+
+AnsibleBatcher junta los pedidos individuales que llegan dentro de una
+ventana (por ejemplo los children de FleetDeploymentWorkflow provisionando
+a la vez) en un solo batch, y le devuelve a cada llamador su resultado.
+
+El mismo archivo está en los casos 03 y 04.
+"""
+import asyncio
+import json
+import shlex
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ansible_jobs import AnsibleJobClient
+from command_runner import run_command
+
+DEFAULT_FORKS = 20
+MAX_ERROR_CHARS = 500
+
+
+def render_inventory(routers: Sequence, labels: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+    """
+    Inventario INI: un host por router, ejecutado localmente en el runner.
+
+    labels (router_id → labels del contenedor) va como host var
+    router_labels. Cada router lleva los suyos, así que no puede ir en
+    extravars, que valen para todos los hosts. Ansible evalúa el valor como
+    literal de Python, y el JSON de un dict de strings lo es.
+    """
+    lines = ["[routers]"]
+    for router in routers:
+        host = (
+            f"{router.router_id} router_id={router.router_id} router_ip={router.router_ip} "
+            "ansible_connection=local ansible_python_interpreter=python3"
+        )
+        if labels and router.router_id in labels:
+            host += f" router_labels={shlex.quote(json.dumps(labels[router.router_id], sort_keys=True))}"
+        lines.append(host)
+    return "\n".join(lines) + "\n"
+
+
+def _task_error(result: dict) -> str:
+    for key in ("msg", "stderr", "stdout"):
+        if result.get(key):
+            return str(result[key])
+    return "failed"
+
+
+def parse_json_results(output: str, router_ids: Sequence[str]) -> Dict[str, dict]:
+    """
+    Resultado por router del callback json de Ansible.
+
+    Un host falló si stats marca failures/unreachable; el error es la última
+    tarea fallida de ese host (la que lo sacó del play; las anteriores con
+    ignore_errors no cuentan).
+    """
+    data = json.loads(output[output.index("{"):])
+    stats = data.get("stats", {})
+    fatal: Dict[str, str] = {}
+    for play in data.get("plays", []):
+        for task in play.get("tasks", []):
+            name = task.get("task", {}).get("name", "")
+            for host, result in task.get("hosts", {}).items():
+                if result.get("failed") or result.get("unreachable"):
+                    fatal[host] = f"{name}: {_task_error(result)}"[:MAX_ERROR_CHARS]
+    return _outcomes(stats, fatal, router_ids)
+
+
+def parse_job_events(stats: Dict[str, dict], events: Sequence[dict], router_ids: Sequence[str]) -> Dict[str, dict]:
+    """Resultado por router de un job del job server (stats + eventos failed/unreachable)."""
+    fatal: Dict[str, str] = {}
+    for event in events:
+        if event.get("event") == "unreachable" or (event.get("event") == "failed"
+                                                   and not event.get("ignore_errors")):
+            fatal[event["host"]] = f"{event.get('task', '')}: {event.get('msg') or 'failed'}"[:MAX_ERROR_CHARS]
+    return _outcomes(stats, fatal, router_ids)
+
+
+def _outcomes(stats: Dict[str, dict], fatal: Dict[str, str], router_ids: Sequence[str]) -> Dict[str, dict]:
+    outcomes = {}
+    for router_id in router_ids:
+        host_stats = stats.get(router_id)
+        if host_stats is None:
+            outcomes[router_id] = {"router_id": router_id, "success": False, "changed": 0,
+                                   "error": "host missing from ansible results"}
+            continue
+        failed = host_stats.get("failures", 0) > 0 or host_stats.get("unreachable", 0) > 0
+        outcomes[router_id] = {
+            "router_id": router_id,
+            "success": not failed,
+            "changed": host_stats.get("changed", 0),
+            "error": fatal.get(router_id, "failed") if failed else None,
+        }
+    return outcomes
+
+
+class AnsibleBatchRunner:
+    """Una corrida de ansible-playbook para una lista de routers."""
+
+    def __init__(self, docker_cmd: Sequence[str], project_dir: Path,
+                 container: str = "ansible-runner", container_project: str = "/runner/project",
+                 playbook: str = "deploy_router.yml", forks: int = DEFAULT_FORKS, timeout: float = 900,
+                 job_client: Optional[AnsibleJobClient] = None):
+        self.job_client = job_client
+        self.docker_cmd = list(docker_cmd)
+        self.project_dir = Path(project_dir)
+        self.container = container
+        self.container_project = container_project
+        self.playbook = playbook
+        self.forks = forks
+        self.timeout = timeout
+
+    async def run(self, routers: Sequence, heartbeat: Optional[Callable[[], None]] = None,
+                  labels: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, dict]:
+        """labels: router_id → labels del contenedor (host var router_labels)."""
+        # Un router pedido dos veces en el mismo batch se despliega una vez
+        unique = list({router.router_id: router for router in routers}.values())
+        router_ids = [router.router_id for router in unique]
+        forks = min(self.forks, len(unique))
+        if self.job_client is not None:
+            return await self._run_job(unique, router_ids, forks, heartbeat, labels)
+
+        batch_dir = self.project_dir / ".batches"
+        batch_dir.mkdir(exist_ok=True)
+        inventory = batch_dir / f"{uuid.uuid4().hex}.ini"
+        inventory.write_text(render_inventory(unique, labels))
+
+        cmd = self.docker_cmd + [
+            "exec",
+            "-e", "ANSIBLE_STDOUT_CALLBACK=json",
+            "-e", "ANSIBLE_PIPELINING=True",
+            "-e", "ANSIBLE_HOST_KEY_CHECKING=False",
+            self.container,
+            "ansible-playbook", f"{self.container_project}/{self.playbook}",
+            "-i", f"{self.container_project}/.batches/{inventory.name}",
+            "-e", "target_group=routers",
+            "-f", str(forks),
+        ]
+        print(f"[ANSIBLE BATCH] {len(unique)} routers, forks={forks}")
+        try:
+            result = await run_command(cmd, timeout=self.timeout, heartbeat=heartbeat)
+        finally:
+            inventory.unlink(missing_ok=True)
+
+        try:
+            outcomes = parse_json_results(result.stdout, router_ids)
+        except ValueError:
+            # Sin JSON: Ansible no llegó a correr (error de inventario, sintaxis...)
+            error = f"RC:{result.returncode} {(result.stderr or result.stdout).strip()}"[:MAX_ERROR_CHARS]
+            outcomes = {rid: {"router_id": rid, "success": False, "changed": 0, "error": error}
+                        for rid in router_ids}
+        ok = sum(1 for o in outcomes.values() if o["success"])
+        print(f"[ANSIBLE BATCH] {ok}/{len(unique)} OK en {result.duration_s:.1f}s")
+        return outcomes
+
+    async def _run_job(self, routers: Sequence, router_ids: List[str], forks: int,
+                       heartbeat: Optional[Callable[[], None]],
+                       labels: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, dict]:
+        print(f"[ANSIBLE BATCH] {len(routers)} routers, forks={forks} (job server)")
+        job = await self.job_client.run(
+            self.playbook,
+            extravars={"target_group": "routers"},
+            # router_labels viaja por host en el inventario del pedido
+            inventory_content=render_inventory(routers, labels),
+            forks=forks,
+            timeout=self.timeout,
+            heartbeat=heartbeat,
+        )
+        if not job.stats:
+            # Sin stats: Ansible no llegó a correr (error de inventario, sintaxis...)
+            error = f"RC:{job.rc} ansible job {job.id} produced no results"
+            outcomes = {rid: {"router_id": rid, "success": False, "changed": 0, "error": error}
+                        for rid in router_ids}
+        else:
+            outcomes = parse_job_events(job.stats, job.events, router_ids)
+        ok = sum(1 for o in outcomes.values() if o["success"])
+        print(f"[ANSIBLE BATCH] {ok}/{len(routers)} OK en {job.duration_s:.1f}s")
+        return outcomes
+
+
+class AnsibleBatcher:
+    """Junta pedidos individuales en batches por ventana de tiempo o tamaño."""
+
+    def __init__(self, runner: AnsibleBatchRunner, window_s: float = 2.0, max_batch: int = 50):
+        self.runner = runner
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._queue: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: List[asyncio.Task] = []
+
+    async def provision(self, router, heartbeat: Optional[Callable[[], None]] = None,
+                        heartbeat_interval: float = 5.0,
+                        labels: Optional[Dict[str, str]] = None) -> dict:
+        """Encola el router (con sus labels, si los hay) y espera el resultado de su batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((router, labels, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        # asyncio.wait no cancela el future: si se cancela este llamador,
+        # el batch sigue para los demás
+        while not future.done():
+            await asyncio.wait({future}, timeout=heartbeat_interval)
+            if heartbeat and not future.done():
+                heartbeat()
+        return future.result()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if batch:
+            self._batches = [t for t in self._batches if not t.done()]
+            self._batches.append(asyncio.ensure_future(self._run(batch)))
+
+    async def _run(self, batch: List[tuple]):
+        labels = {router.router_id: router_labels for router, router_labels, _ in batch if router_labels}
+        try:
+            outcomes = await self.runner.run([router for router, _, _ in batch], labels=labels)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for router, _, future in batch:
+            if not future.done():
+                future.set_result(outcomes[router.router_id])
@@ -0,0 +1,223 @@
+"""
+Cliente del job server de Ansible (ansible-sidecar/job_server.py).
+
+El contenedor ansible-runner corre un servidor con Ansible ya importado que
+hace fork por job, en lugar de un `docker exec ... ansible-playbook` que
+arranca un intérprete nuevo por playbook. Las activities:
+
+  1. envían el job (POST /jobs): playbook, extravars, inventario opcional
+  2. consumen el stream de eventos (GET /jobs/<id>/events, NDJSON):
+     on_event recibe cada evento (task_start, ok, failed, stats...) apenas
+     el callback lo escribe
+  3. piden el resultado (GET /jobs/<id>): status, rc, stats por host
+
+Como run_command: heartbeat() se llama cada `heartbeat_interval` segundos
+mientras el job corre, y si la activity se cancela o se pasa el timeout el
+job se cancela en el servidor (DELETE /jobs/<id>).
+
+Uso:
+    from ansible_jobs import AnsibleJobClient
+
+    jobs = AnsibleJobClient("http://localhost:8700")
+    job = await jobs.run("deploy_router.yml", extravars={"router_id": "vrouter-001"},
+                         on_event=print, heartbeat=activity.heartbeat, timeout=300)
+    if job.rc == 0:
+        ...
+
+El mismo archivo está en los casos 03 y 04.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+
+class AnsibleJobError(Exception):
+    """El job server rechazó el pedido o no responde."""
+
+
+class AnsibleJobTimeout(AnsibleJobError):
+    """El job superó su timeout y fue cancelado en el servidor."""
+
+    def __init__(self, job_id: str, timeout: float):
+        super().__init__(f"Ansible job {job_id} timed out after {timeout:g}s")
+        self.job_id = job_id
+        self.timeout = timeout
+
+
+@dataclass
+class AnsibleJob:
+    """Resultado de un job: estado final, stats por host y los eventos recibidos."""
+    id: str
+    status: str
+    rc: Optional[int]
+    duration_s: float
+    stats: Dict[str, dict] = field(default_factory=dict)
+    events: List[dict] = field(default_factory=list)
+
+
+def format_event(event: dict) -> str:
+    """Una línea legible por evento, para los logs del worker."""
+    kind = event.get("event")
+    if kind == "task_start":
+        return f"TASK [{event.get('task')}]"
+    if kind in ("ok", "failed", "skipped", "unreachable"):
+        status = "changed" if kind == "ok" and event.get("changed") else kind
+        line = f"{status}: [{event.get('host')}]"
+        if event.get("msg"):
+            line += f" {event['msg']}"
+        if event.get("ignore_errors"):
+            line += " (ignored)"
+        return line
+    if kind == "stats":
+        return "RECAP " + ", ".join(
+            f"{host}: ok={s.get('ok', 0)} changed={s.get('changed', 0)} failed={s.get('failures', 0)}"
+            for host, s in event.get("hosts", {}).items()
+        )
+    return json.dumps(event)
+
+
+class AnsibleJobClient:
+    """Un AsyncClient httpx por worker, conexiones reusadas entre jobs."""
+
+    def __init__(self, base_url: str, connect_timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self._connect_timeout = connect_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                # Sin límite de lectura: el stream de eventos dura lo que el playbook
+                timeout=httpx.Timeout(self._connect_timeout, read=None, pool=None),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        try:
+            response = await self._http().request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise AnsibleJobError(f"Ansible job server {self.base_url} unreachable: {e}") from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise AnsibleJobError(f"Ansible job server {response.status_code}: {message}")
+        return response.json()
+
+    # =========================================================================
+    # API
+    # =========================================================================
+
+    async def health(self) -> dict:
+        return await self._request("GET", "/health")
+
+    async def submit(self, playbook: str, extravars: Optional[dict] = None,
+                     inventory_content: Optional[str] = None, forks: Optional[int] = None,
+                     limit: Optional[str] = None) -> str:
+        """Encola el job y retorna su id (el playbook es relativo al proyecto)."""
+        body = {"playbook": playbook}
+        if extravars:
+            body["extravars"] = extravars
+        if inventory_content:
+            body["inventory_content"] = inventory_content
+        if forks:
+            body["forks"] = forks
+        if limit:
+            body["limit"] = limit
+        return (await self._request("POST", "/jobs", json=body))["id"]
+
+    async def events(self, job_id: str, since: int = 0) -> AsyncIterator[dict]:
+        """Eventos del job a medida que ocurren; termina con el evento job_end."""
+        try:
+            async with self._http().stream("GET", f"/jobs/{job_id}/events", params={"since": since}) as stream:
+                if stream.status_code >= 400:
+                    await stream.aread()
+                    raise AnsibleJobError(f"Ansible job server {stream.status_code}: {stream.text}")
+                async for line in stream.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+        except httpx.HTTPError as e:
+            raise AnsibleJobError(f"Ansible job {job_id} event stream failed: {e}") from e
+
+    async def status(self, job_id: str) -> dict:
+        return await self._request("GET", f"/jobs/{job_id}")
+
+    async def cancel(self, job_id: str) -> bool:
+        return (await self._request("DELETE", f"/jobs/{job_id}"))["cancelled"]
+
+    async def run(self, playbook: str, extravars: Optional[dict] = None,
+                  inventory_content: Optional[str] = None, forks: Optional[int] = None,
+                  limit: Optional[str] = None, timeout: Optional[float] = None,
+                  on_event: Optional[Callable[[dict], None]] = None,
+                  heartbeat: Optional[Callable[[], None]] = None,
+                  heartbeat_interval: float = 5.0, keep_events: bool = True) -> AnsibleJob:
+        """
+        Envía el job, consume sus eventos y retorna el resultado final.
+
+        Con keep_events=False los eventos solo pasan por on_event y
+        AnsibleJob.events queda vacío (inventarios grandes).
+        """
+        start = time.monotonic()
+        job_id = await self.submit(playbook, extravars, inventory_content, forks, limit)
+        events: List[dict] = []
+
+        async def consume():
+            async for event in self.events(job_id):
+                if event.get("event") == "job_end":
+                    return
+                if keep_events:
+                    events.append(event)
+                if on_event:
+                    on_event(event)
+
+        waiter = asyncio.ensure_future(consume())
+        deadline = None if timeout is None else start + timeout
+        try:
+            while not waiter.done():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                step = heartbeat_interval if heartbeat else None
+                if remaining is not None:
+                    step = remaining if step is None else min(step, remaining)
+                await asyncio.wait({waiter}, timeout=step)
+                if heartbeat and not waiter.done():
+                    heartbeat()
+        except BaseException:
+            # Activity cancelada: el job no sigue corriendo en el sidecar
+            waiter.cancel()
+            await asyncio.shield(self._cancel_quietly(job_id))
+            raise
+
+        if not waiter.done():
+            waiter.cancel()
+            await self._cancel_quietly(job_id)
+            raise AnsibleJobTimeout(job_id, timeout)
+        waiter.result()  # re-lanza errores del stream
+
+        status = await self.status(job_id)
+        return AnsibleJob(
+            id=job_id,
+            status=status["status"],
+            rc=status["rc"],
+            duration_s=time.monotonic() - start,
+            stats=status.get("stats", {}),
+            events=events,
+        )
+
+    async def _cancel_quietly(self, job_id: str):
+        try:
+            await self.cancel(job_id)
+        except AnsibleJobError:
+            pass
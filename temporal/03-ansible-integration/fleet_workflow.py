@@ -0,0 +1,158 @@
+"""
+Despliegue de una flota de routers: un child workflow por router.
+
+FleetDeploymentWorkflow recibe la lista de routers y el nombre del workflow
+que despliega uno (NetworkDeploymentWorkflow, NetworkDeploymentWithAnsibleRunner...)
+y los lanza como child workflows:
+
+  1. Canary: el primer lote (canary_size) se despliega solo; si falla
+     alguno, no se lanza nada más.
+  2. Ventana deslizante: hasta max_concurrent children en paralelo; cuando
+     termina uno se lanza el siguiente.
+  3. Circuit breaker: con al menos min_failure_sample routers terminados, si
+     fallidos / terminados supera max_failure_ratio se dejan de lanzar
+     routers, se espera a los que están en curso y se termina con
+     status "circuit_open".
+  4. Continue-as-new cada continue_as_new_every routers: la ejecución espera a
+     que terminen sus children y continúa con el resto de la lista y los
+     contadores acumulados, así la historia de cada ejecución queda acotada
+     (unos pocos eventos por router) aunque la flota tenga miles.
+
+El mismo archivo está en los casos 01–04.
+"""
+import asyncio
+from dataclasses import replace
+from typing import List
+
+from temporalio import workflow
+from temporalio.exceptions import ApplicationError
+from temporalio.workflow import ParentClosePolicy
+
+from models import FleetDeploymentRequest, FleetDeploymentResult, NetworkDeploymentRequest
+
+
+@workflow.defn
+class FleetDeploymentWorkflow:
+
+    def __init__(self) -> None:
+        self._in_flight = 0
+        self._finished = 0
+        self._succeeded = 0
+        self._failed: List[str] = []
+        self._circuit_open = False
+        self._total = 0
+        self._tasks: List[asyncio.Task] = []
+
+    @workflow.query
+    def progress(self) -> dict:
+        """Estado de la flota (acumulado entre continue-as-new)"""
+        return {
+            "total": self._total,
+            "succeeded": self._succeeded,
+            "failed": len(self._failed),
+            "in_flight": self._in_flight,
+            "circuit_open": self._circuit_open,
+        }
+
+    @workflow.run
+    async def run(self, request: FleetDeploymentRequest) -> FleetDeploymentResult:
+        # Con 0 o negativos el wave queda vacío: continue-as-new sin fin
+        # (continue_as_new_every) o routers descartados como "completed"
+        # (max_concurrent). Reintentar no lo arregla
+        for field in ("max_concurrent", "continue_as_new_every"):
+            if getattr(request, field) <= 0:
+                raise ApplicationError(
+                    f"{field} must be > 0, got {getattr(request, field)}",
+                    type="InvalidFleetRequest",
+                    non_retryable=True,
+                )
+
+        self._succeeded = request.succeeded
+        self._failed = list(request.failed)
+        self._total = request.succeeded + len(request.failed) + len(request.routers)
+        pending = list(request.routers)
+
+        if not request.canary_done and request.canary_size > 0:
+            canary, pending = pending[:request.canary_size], pending[request.canary_size:]
+            workflow.logger.info(f"Fleet canary: {[r.router_id for r in canary]}")
+            await self._deploy_wave(request, canary, len(canary))
+            if self._failed:
+                workflow.logger.error(f"Fleet canary failed: {self._failed}")
+                return self._result(request, "canary_failed", len(pending))
+            request = replace(request, canary_done=True)
+
+        wave, rest = pending[:request.continue_as_new_every], pending[request.continue_as_new_every:]
+        launched = await self._deploy_wave(request, wave, request.max_concurrent)
+
+        if self._circuit_open:
+            workflow.logger.error(
+                f"Fleet circuit open: {len(self._failed)} failed of "
+                f"{self._succeeded + len(self._failed)} finished"
+            )
+            return self._result(request, "circuit_open", len(wave) - launched + len(rest))
+
+        if rest:
+            workflow.logger.info(f"Fleet continue-as-new: {len(rest)} routers pending")
+            workflow.continue_as_new(replace(
+                request,
+                routers=rest,
+                succeeded=self._succeeded,
+                failed=self._failed,
+                runs=request.runs + 1,
+            ))
+
+        return self._result(request, "completed", 0)
+
+    async def _deploy_wave(self, request: FleetDeploymentRequest,
+                           routers: List[NetworkDeploymentRequest], max_concurrent: int) -> int:
+        """Despliega `routers` con hasta `max_concurrent` en paralelo. Retorna cuántos se lanzaron."""
+        launched = 0
+        while launched < len(routers) or self._in_flight:
+            while launched < len(routers) and self._in_flight < max_concurrent and not self._circuit_open:
+                self._in_flight += 1
+                # El event loop del workflow es determinístico: create_task es seguro
+                self._tasks.append(asyncio.create_task(self._deploy_router(request, routers[launched])))
+                launched += 1
+            if not self._in_flight:
+                break
+            # Esperar a que termine cualquier child (sin asyncio.wait: el orden
+            # de un set de tasks no es determinístico)
+            finished = self._finished
+            await workflow.wait_condition(lambda: self._finished > finished)
+        self._tasks = [t for t in self._tasks if not t.done()]
+        return launched
+
+    async def _deploy_router(self, request: FleetDeploymentRequest, router: NetworkDeploymentRequest):
+        try:
+            handle = await workflow.start_child_workflow(
+                request.child_workflow,
+                router,
+                id=f"{workflow.info().workflow_id}-{router.router_id}",
+                task_queue=request.task_queue or workflow.info().task_queue,
+                # Si se cancela el fleet, se cancelan sus despliegues en curso
+                parent_close_policy=ParentClosePolicy.REQUEST_CANCEL,
+            )
+            if request.child_signal:
+                await handle.signal(request.child_signal)
+            await handle
+            self._succeeded += 1
+        except Exception as e:
+            workflow.logger.warning(f"Router {router.router_id} failed: {e}")
+            self._failed.append(router.router_id)
+            finished = self._succeeded + len(self._failed)
+            if (finished >= request.min_failure_sample
+                    and len(self._failed) / finished > request.max_failure_ratio):
+                self._circuit_open = True
+        finally:
+            self._in_flight -= 1
+            self._finished += 1
+
+    def _result(self, request: FleetDeploymentRequest, status: str, not_started: int) -> FleetDeploymentResult:
+        return FleetDeploymentResult(
+            status=status,
+            total=self._total,
+            succeeded=self._succeeded,
+            failed=self._failed,
+            not_started=not_started,
+            runs=request.runs,
+        )
@@ -1,5 +1,6 @@
 import asyncio
 from temporalio.client import Client
+from payload_codec import data_converter
 from models import NetworkDeploymentRequest
 from workflows import NetworkDeploymentWithAnsibleRunner
 
@@ -27,7 +28,7 @@ async def main():
     print()
     
     # Conectar a Temporal
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect("localhost:7233", data_converter=data_converter())
     
     print("⚡ Iniciando workflow Temporal...")
     print("🔧 Step 1: Ansible Runner desplegará router container")
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+from datetime import datetime
+from temporalio.client import Client
+from payload_codec import data_converter
+from fleet_workflow import FleetDeploymentWorkflow
+from models import FleetDeploymentRequest, NetworkDeploymentRequest
+
+TASK_QUEUE_NAME = "network-deployment-queue"
+CHILD_WORKFLOW = "NetworkDeploymentWithAnsibleRunner"
+CHILD_SIGNAL = None
+
+
+def build_routers(count: int) -> list:
+    """Flota de ejemplo: virtual-router-NNN"""
+    return [
+        NetworkDeploymentRequest(
+            router_id=f"virtual-router-{i:03d}",
+            router_ip=f"172.20.0.{10 + i % 240}",
+            software_version="FRR-8.5.1"
+        )
+        for i in range(count)
+    ]
+
+
+async def main():
+    """Despliega una flota de routers con FleetDeploymentWorkflow (un child workflow por router)"""
+    parser = argparse.ArgumentParser(description="Despliegue de una flota de routers")
+    parser.add_argument("--routers", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--canary", type=int, default=1)
+    parser.add_argument("--every", type=int, default=200, help="routers por ejecución (continue-as-new)")
+    parser.add_argument("--max-failure-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    client = await Client.connect("localhost:7233", namespace="default", data_converter=data_converter())
+
+    request = FleetDeploymentRequest(
+        routers=build_routers(args.routers),
+        child_workflow=CHILD_WORKFLOW,
+        child_signal=CHILD_SIGNAL,
+        max_concurrent=args.concurrency,
+        canary_size=args.canary,
+        max_failure_ratio=args.max_failure_ratio,
+        continue_as_new_every=args.every
+    )
+
+    fleet_id = f"fleet-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    print(f"Starting fleet deployment {fleet_id}: {args.routers} routers, "
+          f"{args.concurrency} en paralelo, canary {args.canary}")
+
+    handle = await client.start_workflow(
+        FleetDeploymentWorkflow.run,
+        request,
+        id=fleet_id,
+        task_queue=TASK_QUEUE_NAME
+    )
+
+    # Progreso vía query mientras corre
+    result_task = asyncio.ensure_future(handle.result())
+    while not result_task.done():
+        await asyncio.wait([result_task], timeout=5)
+        if not result_task.done():
+            try:
+                print(f"   progreso: {await handle.query(FleetDeploymentWorkflow.progress)}")
+            except Exception as e:
+                print(f"   progreso no disponible: {e}")
+
+    try:
+        result = result_task.result()
+        print(f"Fleet {result.status}: {result.succeeded}/{result.total} OK, "
+              f"{len(result.failed)} fallidos, {result.not_started} sin lanzar, {result.runs} ejecuciones")
+        if result.failed:
+            print(f"   Fallidos: {result.failed}")
+    except Exception as e:
+        print(f"Fleet deployment failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
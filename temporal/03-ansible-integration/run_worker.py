@@ -1,9 +1,12 @@
 import asyncio
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 from workflows import NetworkDeploymentWithAnsibleRunner
+from fleet_workflow import FleetDeploymentWorkflow
 from activities import (
     provision_router_via_ansible_runner,
+    provision_routers_batch,
     deploy_router_software,
     validate_router_deployment,
     cleanup_failed_deployment
@@ -21,16 +24,17 @@ async def main():
     
     # Conectar a Temporal
     print("🔌 Conectando a Temporal server...")
-    client = await Client.connect("localhost:7233", namespace="default")
+    client = await Client.connect("localhost:7233", namespace="default", data_converter=data_converter())
     print("✅ Conectado a Temporal server")
     
     # Crear worker con activities como strings para evitar imports en workflow
     worker = Worker(
         client,
         task_queue="network-deployment-queue",
-        workflows=[NetworkDeploymentWithAnsibleRunner],
+        workflows=[NetworkDeploymentWithAnsibleRunner, FleetDeploymentWorkflow],
         activities=[
             provision_router_via_ansible_runner,
+            provision_routers_batch,
             deploy_router_software,
             validate_router_deployment,
             cleanup_failed_deployment
@@ -38,7 +42,7 @@ async def main():
     )
     
     print("✅ Worker configurado con:")
-    print("   • Workflow: NetworkDeploymentWithAnsibleRunner")
+    print("   • Workflows: NetworkDeploymentWithAnsibleRunner, FleetDeploymentWorkflow")
     print("   • Activities: Ansible Runner + Airflow + Validation")
     print("   • Task Queue: network-deployment-awx")
     print()
@@ -1,34 +1,103 @@
 import asyncio
 import httpx
-import subprocess
+import json
+import os
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
 from temporalio import activity
-from models import NetworkDeploymentRequest, ConnectivityTest, DeploymentResult
+from ansible_batch import AnsibleBatcher, AnsibleBatchRunner
+from ansible_jobs import AnsibleJobClient
+from ansible_progress import AnsibleProgress
+from command_runner import run_command
+from docker_api import docker_api
+from models import (
+    NetworkDeploymentRequest, ConnectivityTest, DeploymentResult,
+    ConnectivityMatrix, ConnectivitySource, ProvisionResult
+)
+from router_state import COMPLETE_MARKER, FINGERPRINT_LABEL, RouterPlan, desired_labels, plan_router
+
+# Matriz por defecto: el escenario del caso (cliente aislado → servidor aislado)
+DEFAULT_CONNECTIVITY_MATRIX = ConnectivityMatrix(
+    sources=[ConnectivitySource(container="test-client", ip="192.168.100.10")],
+    destinations=["192.168.200.10"],
+)
+DEFAULT_TEST_TIMEOUT = 10.0
+
+# Job server del contenedor ansible-runner (ansible-sidecar/job_server.py):
+# Ansible precargado y un fork por playbook, en lugar de un `docker exec
+# ansible-playbook` por despliegue. ANSIBLE_JOB_API="" vuelve a docker exec
+ANSIBLE_JOB_API = os.environ.get("ANSIBLE_JOB_API", "http://localhost:8700")
+ansible_jobs = AnsibleJobClient(ANSIBLE_JOB_API) if ANSIBLE_JOB_API else None
+
+# Provisioning en batch: una corrida de ansible-playbook para varios routers.
+# ANSIBLE_BATCH_WINDOW > 0 hace que provision_router_via_ansible_runner junte
+# los pedidos que llegan dentro de esa ventana (ej. un FleetDeploymentWorkflow)
+ANSIBLE_BATCH_WINDOW = float(os.environ.get("ANSIBLE_BATCH_WINDOW", "0"))
+ansible_batch_runner = AnsibleBatchRunner(
+    docker_cmd=["docker", "--context", "desktop-linux"],
+    project_dir=Path(__file__).resolve().parent / "ansible-playbooks",
+    forks=int(os.environ.get("ANSIBLE_FORKS", "20")),
+    job_client=ansible_jobs,
+)
+ansible_batcher = AnsibleBatcher(ansible_batch_runner, window_s=ANSIBLE_BATCH_WINDOW)
+
+
+def _heartbeat(*details):
+    """Heartbeat solo dentro de una activity (test_ansible_direct.py corre sin Temporal)"""
+    if activity.in_activity():
+        activity.heartbeat(*details)
+
 
 class NetworkActivitiesWithConnectivity:
     
     @activity.defn
-    async def test_client_server_connectivity(self, test_phase: str) -> dict:
-        """Prueba conectividad entre cliente y servidor"""
+    async def test_client_server_connectivity(self, test_phase: str, matrix: Optional[ConnectivityMatrix] = None) -> dict:
+        """Prueba conectividad de la matriz origen × destino × tipo de test, en paralelo"""
+        
+        matrix = matrix or DEFAULT_CONNECTIVITY_MATRIX
+        unknown = [t for t in matrix.test_types if t not in self._TEST_RUNNERS]
+        if unknown:
+            raise ValueError(f"Unknown connectivity test types: {unknown}")
+        
+        cases = [
+            (test_type, source, destination)
+            for source in matrix.sources
+            for destination in matrix.destinations
+            for test_type in matrix.test_types
+        ]
         
         print(f"\n{'='*80}")
-        print(f"CONNECTIVITY TEST: {test_phase.upper()}")
+        print(f"CONNECTIVITY TEST: {test_phase.upper()} ({len(cases)} tests, hasta {matrix.max_concurrency} en paralelo)")
         print(f"{'='*80}")
-
-
-        tests = []
         
-        # Test 1: Ping desde cliente a servidor
-        ping_test = await self._test_ping("192.168.100.10", "192.168.200.10")
-        tests.append(ping_test)
-        
-        # Test 2: HTTP desde cliente a servidor
-        http_test = await self._test_http("192.168.100.10", "192.168.200.10")
-        tests.append(http_test)
+        # Todos los tests a la vez, acotados por el semáforo: el tiempo total
+        # es el del test más lento, no la suma
+        semaphore = asyncio.Semaphore(matrix.max_concurrency)
+        progress = {"completed": 0, "successful": 0}
+        started = time.monotonic()
+        
+        async def run_test(test_type: str, source: ConnectivitySource, destination: str) -> dict:
+            timeout = matrix.timeouts.get(test_type, DEFAULT_TEST_TIMEOUT)
+            async with semaphore:
+                result = await getattr(self, self._TEST_RUNNERS[test_type])(source, destination, timeout, matrix)
+            progress["completed"] += 1
+            progress["successful"] += result["success"]
+            # Progreso visible en la UI mientras corre el resto: contadores y
+            # el último resultado (la tabla completa va en el resultado; con la
+            # lista entera cada heartbeat crecería con la matriz)
+            _heartbeat({**progress, "total": len(cases), "latest": result})
+            return result
+        
+        tests = await asyncio.gather(*(run_test(*case) for case in cases))
+        elapsed_ms = round((time.monotonic() - started) * 1000)
         
         successful_tests = sum(1 for test in tests if test["success"])
         
-        print(f"Resultados: {successful_tests}/{len(tests)} tests exitosos")
+        self._print_results_table(tests)
+        print(f"Resultados: {successful_tests}/{len(tests)} tests exitosos en {elapsed_ms}ms "
+              f"(test más lento: {max((t['duration_ms'] for t in tests), default=0)}ms)")
         
         if test_phase == "initial_test":
             if successful_tests == 0:
@@ -52,165 +121,266 @@ class NetworkActivitiesWithConnectivity:
             "status": status,
             "tests": tests,
             "successful_tests": successful_tests,
-            "total_tests": len(tests)
+            "total_tests": len(tests),
+            "elapsed_ms": elapsed_ms
         }
     
-    async def _test_ping(self, source_ip: str, dest_ip: str) -> dict:
-        """Test de ping desde cliente a servidor"""
-        
-        print(f"Testing ping: {source_ip} -> {dest_ip}")
+    # Tipo de test → método que lo ejecuta
+    _TEST_RUNNERS = {"ping": "_test_ping", "http": "_test_http"}
+    
+    @staticmethod
+    def _test_row(test_type: str, source: ConnectivitySource, destination: str,
+                  started: float, error: Optional[str] = None) -> dict:
+        """Fila compacta del resultado: sin el stdout crudo de ping/wget"""
+        row = {
+            "test_type": test_type,
+            "source": source.ip,
+            "destination": destination,
+            "success": error is None,
+            "duration_ms": round((time.monotonic() - started) * 1000)
+        }
+        if error is not None:
+            row["error"] = error.strip()[:200] or "No response"
+        return row
+    
+    @staticmethod
+    def _print_results_table(tests: list):
+        print(f"{'TIPO':<6}{'ORIGEN':<18}{'DESTINO':<30}{'OK':<6}{'ms':>6}")
+        for t in tests:
+            print(f"{t['test_type']:<6}{t['source']:<18}{t['destination']:<30}"
+                  f"{'OK' if t['success'] else 'FAIL':<6}{t['duration_ms']:>6}")
+    
+    async def _test_ping(self, source: ConnectivitySource, dest_ip: str, timeout: float,
+                         matrix: ConnectivityMatrix) -> dict:
+        """Test de ping desde el contenedor origen al destino"""
         
+        started = time.monotonic()
         try:
-            result = subprocess.run([
-                "docker", "exec", "test-client", 
+            result = await docker_api.exec(source.container, [
                 "ping", "-c", "2", "-W", "2", dest_ip
-            ], capture_output=True, text=True, timeout=10)
+            ], timeout=timeout)
             
             if result.returncode == 0:
-                print(f"   Ping exitoso")
-                return {
-                    "test_type": "ping",
-                    "source": source_ip,
-                    "destination": dest_ip,
-                    "success": True,
-                    "output": result.stdout
-                }
-            else:
-                print(f"   Ping fallo: {result.stderr}")
-                return {
-                    "test_type": "ping",
-                    "source": source_ip,
-                    "destination": dest_ip,
-                    "success": False,
-                    "error": result.stderr
-                }
+                return self._test_row("ping", source, dest_ip, started)
+            return self._test_row("ping", source, dest_ip, started, result.stderr or result.stdout)
                 
         except Exception as e:
-            print(f"   Error en ping: {str(e)}")
-            return {
-                "test_type": "ping",
-                "source": source_ip,
-                "destination": dest_ip,
-                "success": False,
-                "error": str(e)
-            }
+            return self._test_row("ping", source, dest_ip, started, str(e) or type(e).__name__)
     
-    async def _test_http(self, source_ip: str, dest_ip: str) -> dict:
-        """Test HTTP desde cliente a servidor"""
-        
-        print(f"Testing HTTP: {source_ip} -> http://{dest_ip}")
+    async def _test_http(self, source: ConnectivitySource, dest_ip: str, timeout: float,
+                         matrix: ConnectivityMatrix) -> dict:
+        """Test HTTP desde el contenedor origen al destino"""
         
+        started = time.monotonic()
+        url = f"http://{dest_ip}"
         try:
-            result = subprocess.run([
-                "docker", "exec", "test-client",
-                "wget", "-q", "-O", "-", f"http://{dest_ip}", "--timeout=5"
-            ], capture_output=True, text=True, timeout=10)
+            result = await docker_api.exec(source.container, [
+                "wget", "-q", "-O", "-", url, "--timeout=5"
+            ], timeout=timeout)
             
-            if result.returncode == 0 and "Servidor Test" in result.stdout:
-                print(f"   HTTP exitoso")
-                return {
-                    "test_type": "http",
-                    "source": source_ip,
-                    "destination": f"http://{dest_ip}",
-                    "success": True,
-                    "response": result.stdout[:100] + "..." if len(result.stdout) > 100 else result.stdout
-                }
-            else:
-                print(f"   HTTP fallo")
-                return {
-                    "test_type": "http",
-                    "source": source_ip,
-                    "destination": f"http://{dest_ip}",
-                    "success": False,
-                    "error": result.stderr or "No response"
-                }
+            if result.returncode == 0 and (not matrix.http_expect or matrix.http_expect in result.stdout):
+                return self._test_row("http", source, url, started)
+            return self._test_row("http", source, url, started, result.stderr)
                 
         except Exception as e:
-            print(f"   Error en HTTP: {str(e)}")
-            return {
-                "test_type": "http",
-                "source": source_ip,
-                "destination": f"http://{dest_ip}",
-                "success": False,
-                "error": str(e)
-            }
+            return self._test_row("http", source, url, started, str(e) or type(e).__name__)
     
     @activity.defn
-    async def provision_router_via_ansible_runner(self, request: NetworkDeploymentRequest) -> str:
-        """Despliega router usando Ansible Runner (basado en Caso 3)"""
+    async def provision_router_via_ansible_runner(self, request: NetworkDeploymentRequest) -> ProvisionResult:
+        """
+        Lleva el router al estado deseado usando Ansible Runner (basado en Caso 3).
+        
+        Si el contenedor ya existe con el mismo fingerprint (router_ip,
+        software_version, network_config, playbook), el playbook terminó y el
+        firewall no cambió, no se corre Ansible: solo se arranca o se
+        reconecta a las redes si hace falta.
+        """
         
         print("\n" + "="*80)
         print("ANSIBLE RUNNER: Desplegando Router Virtual")
         print("="*80)
         
-        deployment_result = await self._deploy_via_ansible_runner(request)
+        start = time.monotonic()
+        labels = desired_labels(request)
+        fingerprint = labels[FINGERPRINT_LABEL]
+        
+        def result(action: str, reasons: list, ansible: Optional[dict] = None) -> ProvisionResult:
+            return ProvisionResult(
+                router_id=request.router_id,
+                router_ip=request.router_ip,
+                action=action,
+                skipped=ansible is None,
+                reasons=reasons,
+                fingerprint=fingerprint,
+                duration_s=round(time.monotonic() - start, 2),
+                ansible=ansible
+            )
+        
+        plan = await self._plan_router(request, labels)
+        print(f"Estado deseado {fingerprint}: {plan.action} {plan.reasons}")
+        
+        if plan.action == "none":
+            print(f"ROUTER {request.router_id} YA ESTA EN EL ESTADO DESEADO - Ansible omitido")
+            print("="*80)
+            return result("none", plan.reasons)
+        
+        if plan.action == "repair" and await self._repair_router(request, plan, labels):
+            print(f"ROUTER {request.router_id} REPARADO SIN ANSIBLE")
+            print("="*80)
+            return result("repaired", plan.reasons)
+        
+        if ANSIBLE_BATCH_WINDOW > 0:
+            deployment_result = await ansible_batcher.provision(request, heartbeat=_heartbeat, labels=labels)
+        else:
+            deployment_result = await self._deploy_via_ansible_runner(request, labels)
         
         if deployment_result["success"]:
             print("ROUTER DESPLEGADO VIA ANSIBLE RUNNER!")
             print(f"Container: {request.router_id}")
             print("="*80)
-            return f"Router {request.router_id} deployed at {request.router_ip}"
+            return result("deployed", plan.reasons, deployment_result.get("summary") or {})
         else:
             print("ANSIBLE RUNNER FALLO")
             print("="*80)
             raise Exception(f"Ansible Runner deployment failed: {deployment_result['error']}")
     
-    async def _deploy_via_ansible_runner(self, request: NetworkDeploymentRequest) -> dict:
-        """Despliega via Ansible Runner (copiado del Caso 3)"""
+    async def _plan_router(self, request: NetworkDeploymentRequest, labels: dict) -> RouterPlan:
+        """Compara el contenedor actual con el pedido; sin Docker API se despliega igual"""
+        try:
+            container = await docker_api.inspect_container(request.router_id)
+            marker = firewall = None
+            if container and container.get("State", {}).get("Running"):
+                # Marca de despliegue completo y firewall actual (el DAG de Airflow lo modifica)
+                done, rules = await asyncio.gather(
+                    docker_api.exec(request.router_id, ["cat", COMPLETE_MARKER], timeout=10),
+                    docker_api.exec(request.router_id, ["iptables", "-S", "FORWARD"], timeout=10),
+                )
+                marker = done.stdout.strip() if done.returncode == 0 else None
+                firewall = rules.stdout.splitlines() if rules.returncode == 0 else []
+        except Exception as e:
+            return RouterPlan("create", [f"docker inspect/exec failed: {e}"])
+        return plan_router(container, labels, marker=marker, firewall=firewall)
+    
+    async def _repair_router(self, request: NetworkDeploymentRequest, plan: RouterPlan, labels: dict) -> bool:
+        """Aplica solo la diferencia (start / network connect). False si hay que redesplegar"""
+        try:
+            if plan.start:
+                print(f"Arrancando {request.router_id}")
+                await docker_api.start_container(request.router_id)
+            for network in plan.connect:
+                print(f"Conectando {request.router_id} a {network}")
+                await docker_api.connect_network(network, request.router_id)
+        except Exception as e:
+            print(f"Reparacion fallo ({e}), se redespliega")
+            return False
+        after = await self._plan_router(request, labels)
+        # Al arrancar, el contenedor vuelve a aplicar el firewall en su comando:
+        # se le dan unos segundos (como "Wait for router to be ready" del playbook)
+        for _ in range(10 if plan.start else 0):
+            if after.action == "none":
+                break
+            await asyncio.sleep(1)
+            after = await self._plan_router(request, labels)
+        if after.action != "none":
+            print(f"Reparacion incompleta ({after.reasons}), se redespliega")
+            return False
+        return True
+    
+    @activity.defn
+    async def provision_routers_batch(self, requests: List[NetworkDeploymentRequest]) -> List[dict]:
+        """Despliega N routers con una sola corrida de Ansible; un resultado por router, en orden"""
+        
+        print("\n" + "="*80)
+        print(f"ANSIBLE RUNNER: Desplegando {len(requests)} routers en batch")
+        print("="*80)
+        
+        labels = {request.router_id: desired_labels(request) for request in requests}
+        outcomes = await ansible_batch_runner.run(requests, heartbeat=_heartbeat, labels=labels)
+        return [outcomes[request.router_id] for request in requests]
+    
+    async def _deploy_via_ansible_runner(self, request: NetworkDeploymentRequest,
+                                         labels: Optional[dict] = None) -> dict:
+        """Despliega via Ansible Runner (copiado del Caso 3); labels: los de router_state"""
         
         try:
             print("Ejecutando Ansible Runner...")
             
-            # Forzar el uso del contexto desktop-linux para evitar problemas de conexión
-            check_cmd = ["docker", "--context", "desktop-linux", "ps", "--filter", "name=ansible-runner", "--format", "{{.Names}}"]
-            check_result = subprocess.run(check_cmd, capture_output=True, text=True)
-            
-            print(f"DEBUG: Container check - RC: {check_result.returncode}, STDOUT: '{check_result.stdout.strip()}', STDERR: '{check_result.stderr.strip()}'")
+            # docker_api usa el socket del contexto desktop-linux si existe
+            try:
+                running = await docker_api.container_names("ansible-runner")
+            except Exception as e:
+                return {"success": False, "error": f"Docker API failed: {e}"}
             
-            if check_result.returncode != 0:
-                return {"success": False, "error": f"Docker command failed: {check_result.stderr}"}
+            print(f"DEBUG: Container check - {running}")
             
-            if "ansible-runner" not in check_result.stdout:
-                return {"success": False, "error": f"ansible-runner container not found. Available containers: {check_result.stdout.strip()}"}
+            if "ansible-runner" not in running:
+                return {"success": False, "error": f"ansible-runner container not found. Available containers: {running}"}
             
             print("Contenedor ansible-runner encontrado")
             
             # Verificar si el router ya existe y eliminarlo
-            cleanup_cmd = ["docker", "--context", "desktop-linux", "rm", "-f", request.router_id]
-            subprocess.run(cleanup_cmd, capture_output=True)
+            await docker_api.remove_container(request.router_id)
             print(f"Limpieza previa del router {request.router_id}")
             
+            if ansible_jobs is not None:
+                return await self._deploy_via_job_api(request, labels)
+            
+            # El playbook sigue por CLI. La salida va línea por línea al log
+            # rotativo y a los contadores de progreso (heartbeat details);
+            # en memoria quedan solo las últimas líneas de stderr
             ansible_cmd = [
                 "docker", "--context", "desktop-linux", "exec", "ansible-runner",
                 "ansible-playbook", "/runner/project/deploy_router.yml",
                 "-i", "/runner/project/inventory.ini",
                 "-e", f"router_id={request.router_id}",
                 "-e", f"router_ip={request.router_ip}",
+                "-e", json.dumps({"router_labels": labels or {}}),
                 "-v"
             ]
             
             print(f"Ejecutando: {' '.join(ansible_cmd)}")
             
-            result = subprocess.run(
+            progress = AnsibleProgress(request.router_id, heartbeat=_heartbeat)
+            result = await run_command(
                 ansible_cmd,
-                capture_output=True,
-                text=True,
-                timeout=300
+                timeout=300,
+                on_line=progress.on_line,
+                heartbeat=progress.heartbeat,
+                keep_lines=20
             )
-            
-            if result.returncode == 0:
-                print("Ansible playbook ejecutado exitosamente")
-                print(f"STDOUT: {result.stdout}")
-                return {"success": True, "output": result.stdout}
-            else:
-                print(f"Ansible playbook fallo con codigo: {result.returncode}")
-                print(f"STDOUT: {result.stdout}")
-                print(f"STDERR: {result.stderr}")
-                return {"success": False, "error": f"RC:{result.returncode} STDOUT:{result.stdout} STDERR:{result.stderr}"}
+            summary = progress.summary(result.returncode, result.duration_s, stderr_tail=result.stderr)
+            return self._ansible_outcome(summary)
                 
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def _deploy_via_job_api(self, request: NetworkDeploymentRequest, labels: Optional[dict] = None) -> dict:
+        """Despliega con el job server de ansible-runner: eventos en vivo, sin docker exec"""
+        
+        print(f"Enviando job a {ANSIBLE_JOB_API}: deploy_router.yml")
+        progress = AnsibleProgress(request.router_id, heartbeat=_heartbeat)
+        job = await ansible_jobs.run(
+            "deploy_router.yml",
+            extravars={"router_id": request.router_id, "router_ip": request.router_ip,
+                       "router_labels": labels or {}},
+            timeout=300,
+            on_event=progress.on_event,
+            heartbeat=progress.heartbeat,
+            keep_events=False
+        )
+        summary = progress.summary(job.rc, job.duration_s)
+        summary["job_id"] = job.id
+        return self._ansible_outcome(summary)
+    
+    @staticmethod
+    def _ansible_outcome(summary: dict) -> dict:
+        """Resultado compacto: el log completo queda en summary['log']"""
+        if summary["rc"] == 0:
+            print(f"Ansible playbook ejecutado exitosamente ({summary['duration_s']}s, log: {summary['log']})")
+            return {"success": True, "summary": summary}
+        print(f"Ansible playbook fallo: {AnsibleProgress.describe(summary)}")
+        return {"success": False, "summary": summary, "error": AnsibleProgress.describe(summary)}
+    
     @activity.defn
     async def configure_client_server_routes(self, request: NetworkDeploymentRequest) -> str:
         """Configura rutas estaticas en cliente y servidor"""
@@ -223,18 +393,16 @@ class NetworkActivitiesWithConnectivity:
             # Configurar ruta en cliente
             print("Configurando ruta en cliente...")
             client_route_cmd = [
-                "docker", "exec", "test-client", 
                 "ip", "route", "add", "192.168.200.0/24", "via", "192.168.100.2"
             ]
-            client_result = subprocess.run(client_route_cmd, capture_output=True, text=True)
+            client_result = await docker_api.exec("test-client", client_route_cmd, timeout=30)
             
             # Configurar ruta en servidor
             print("Configurando ruta en servidor...")
             server_route_cmd = [
-                "docker", "exec", "test-server", 
                 "ip", "route", "add", "192.168.100.0/24", "via", "192.168.200.2"
             ]
-            server_result = subprocess.run(server_route_cmd, capture_output=True, text=True)
+            server_result = await docker_api.exec("test-server", server_route_cmd, timeout=30)
             
             # Returncode 2 significa que la ruta ya existe, lo cual es OK
             client_ok = client_result.returncode == 0 or client_result.returncode == 2
@@ -437,9 +605,7 @@ class NetworkActivitiesWithConnectivity:
         print(f"\nCLEANUP: Limpiando recursos para {request.router_id}")
         
         try:
-            subprocess.run([
-                "docker", "rm", "-f", request.router_id
-            ], capture_output=True)
+            await docker_api.remove_container(request.router_id)
             
             print(f"Cleanup completado para {request.router_id}")
             return f"Cleanup completed for {request.router_id}"
@@ -451,6 +617,7 @@ class NetworkActivitiesWithConnectivity:
 activities = NetworkActivitiesWithConnectivity()
 test_client_server_connectivity = activities.test_client_server_connectivity
 provision_router_via_ansible_runner = activities.provision_router_via_ansible_runner
+provision_routers_batch = activities.provision_routers_batch
 configure_client_server_routes = activities.configure_client_server_routes
 wait_for_manual_verification = activities.wait_for_manual_verification
 deploy_router_software = activities.deploy_router_software
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Job server de Ansible: corre dentro del contenedor ansible-runner.
+
+`docker exec ansible-runner ansible-playbook ...` arranca cada vez un
+intérprete nuevo, importa Ansible entero (~1-2s), carga plugins y
+colecciones y recién ahí parsea el playbook. Este servidor se queda vivo:
+
+  - un proceso "zygote" importa Ansible y sus plugins una sola vez, antes de
+    aceptar jobs, y hace fork() por job: el hijo arranca con todo cargado
+    (copy-on-write) y corre el playbook con PlaybookCLI
+  - las conexiones SSH usan ControlMaster/ControlPersist con un
+    ControlPath fijo, así los jobs siguientes reusan la conexión abierta
+    por el anterior (los playbooks del caso usan connection local; aplica
+    a inventarios con hosts SSH)
+  - los eventos del job (task_start, ok, failed, stats...) se escriben
+    como JSON por línea con el callback job_events
+
+API (HTTP local, JSON):
+    POST   /jobs               {playbook, inventory?|inventory_content?, extravars?, forks?, limit?}
+                               → 202 {"id", "status"}
+    GET    /jobs/<id>          estado, rc, duración y stats por host
+    GET    /jobs/<id>/events   stream NDJSON de eventos (?since=N salta los
+                               primeros N); termina con {"event": "job_end"}
+    DELETE /jobs/<id>          cancela un job en curso: SIGTERM a su grupo de
+                               procesos (PlaybookCLI, los workers de Ansible
+                               y los comandos que lanzaron)
+    GET    /health
+
+Solo stdlib: el contenedor es docker:latest + `apk add ansible`.
+
+Uso (docker-compose.yml):
+    python3 /runner/sidecar/job_server.py
+"""
+import json
+import os
+import select
+import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PORT = int(os.environ.get("JOB_SERVER_PORT", "8700"))
+PROJECT_DIR = os.path.realpath(os.environ.get("PROJECT_DIR", "/runner/project"))
+JOBS_DIR = os.environ.get("JOBS_DIR", "/runner/jobs")
+SIDECAR_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_JOBS_KEPT = 200
+DEFAULT_FORKS = 20
+POLL_S = 0.02  # poll del archivo de eventos y del pipe mientras hay jobs
+SPAWN_TIMEOUT_S = 5.0  # espera del pid del job antes de responder al POST
+
+# Config global de Ansible: tiene que estar en el entorno ANTES de importar
+# ansible en el zygote (ansible.constants se resuelve al importar)
+ANSIBLE_ENV = {
+    "ANSIBLE_STDOUT_CALLBACK": "job_events",
+    "ANSIBLE_CALLBACK_PLUGINS": os.path.join(SIDECAR_DIR, "callback_plugins"),
+    "ANSIBLE_PIPELINING": "True",
+    "ANSIBLE_HOST_KEY_CHECKING": "False",
+    "ANSIBLE_RETRY_FILES_ENABLED": "False",
+    "ANSIBLE_SSH_ARGS": "-o ControlMaster=auto -o ControlPersist=600s",
+    "ANSIBLE_SSH_CONTROL_PATH_DIR": "/runner/cp",
+}
+
+# Módulos que PlaybookCLI importa en cada corrida; el plugin loader reusa los
+# que ya están en sys.modules
+PRELOAD = [
+    "ansible.cli.playbook",
+    "ansible.executor.playbook_executor",
+    "ansible.executor.task_queue_manager",
+    "ansible.executor.task_executor",
+    "ansible.inventory.manager",
+    "ansible.vars.manager",
+    "ansible.parsing.dataloader",
+    "ansible.playbook",
+    "ansible.template",
+    "ansible.plugins.action.normal",
+    "ansible.plugins.action.command",
+    "ansible.plugins.action.shell",
+    "ansible.plugins.action.debug",
+    "ansible.plugins.connection.local",
+    "ansible.plugins.connection.ssh",
+    "ansible.plugins.strategy.linear",
+    "ansible.plugins.callback.default",
+    "ansible.plugins.inventory.ini",
+    "ansible.plugins.inventory.yaml",
+]
+
+
+# =============================================================================
+# ZYGOTE: Ansible precargado, un fork por job
+# =============================================================================
+
+def _job_path(job_id: str, name: str) -> str:
+    return os.path.join(JOBS_DIR, job_id, name)
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _preload() -> float:
+    start = time.monotonic()
+    os.environ.update(ANSIBLE_ENV)
+    os.makedirs(ANSIBLE_ENV["ANSIBLE_SSH_CONTROL_PATH_DIR"], exist_ok=True)
+    for module in PRELOAD:
+        try:
+            __import__(module)
+        except Exception as e:  # un plugin faltante en esta versión no es fatal
+            print(f"[zygote] preload {module}: {e}", flush=True)
+    return time.monotonic() - start
+
+
+def _run_job(spec: dict):
+    """Hijo del zygote: corre el playbook y sale con su rc (nunca retorna)."""
+    rc = 250
+    try:
+        # Grupo de procesos propio: los workers que forkea Ansible y los
+        # comandos que lanzan (docker run, network connect...) lo heredan y
+        # cancel() los termina a todos con killpg
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.chdir(PROJECT_DIR)
+        os.environ["JOB_EVENTS_FILE"] = _job_path(spec["id"], "events.jsonl")
+        log = os.open(_job_path(spec["id"], "output.log"), os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        os.dup2(log, 1)
+        os.dup2(log, 2)
+        from ansible.cli.playbook import PlaybookCLI
+        if hasattr(PlaybookCLI, "cli_executor"):
+            PlaybookCLI.cli_executor(spec["args"])  # sys.exit(rc)
+        else:
+            rc = PlaybookCLI(spec["args"]).run()
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(rc)
+
+
+def zygote_main(read_fd: int):
+    """Lee specs de jobs (JSON por línea) del pipe y hace fork por cada uno."""
+    preload_s = _preload()
+    print(f"[zygote] Ansible precargado en {preload_s:.2f}s", flush=True)
+    children = {}  # pid → job id
+    buffer = b""
+    while True:
+        # Con jobs en curso, el reap es lo que marca el fin del job: poll corto
+        ready, _, _ = select.select([read_fd], [], [], POLL_S if children else 1.0)
+        if ready:
+            data = os.read(read_fd, 65536)
+            if not data:  # el servidor murió
+                break
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                spec = json.loads(line)
+                pid = os.fork()
+                if pid == 0:
+                    os.close(read_fd)
+                    _run_job(spec)
+                # También desde el padre: el grupo existe antes de publicar el pid,
+                # aunque el hijo todavía no haya llegado a su setpgid
+                try:
+                    os.setpgid(pid, pid)
+                except OSError:
+                    pass  # el hijo ya lo hizo (o ya terminó)
+                children[pid] = spec["id"]
+                pid_path = _job_path(spec["id"], "pid")
+                with open(pid_path + ".tmp", "w") as f:
+                    f.write(str(pid))
+                os.replace(pid_path + ".tmp", pid_path)
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            job_id = children.pop(pid)
+            _write_json(_job_path(job_id, "result.json"),
+                        {"rc": os.waitstatus_to_exitcode(status), "finished": time.time()})
+    os._exit(0)
+
+
+# =============================================================================
+# JOBS
+# =============================================================================
+
+class JobStore:
+    """Registro de jobs del servidor; el estado final lo escribe el zygote en disco."""
+
+    def __init__(self, zygote_fd: int):
+        self._zygote_fd = zygote_fd
+        self._lock = threading.Lock()
+        self._jobs = {}  # id → dict, en orden de llegada
+
+    def submit(self, body: dict) -> dict:
+        playbook = os.path.realpath(os.path.join(PROJECT_DIR, body["playbook"]))
+        if not playbook.startswith(PROJECT_DIR + os.sep) or not os.path.isfile(playbook):
+            raise ValueError(f"playbook not found in project: {body['playbook']}")
+
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.join(JOBS_DIR, job_id))
+        if body.get("inventory_content"):
+            inventory = _job_path(job_id, "inventory.ini")
+            with open(inventory, "w") as f:
+                f.write(body["inventory_content"])
+        else:
+            inventory = os.path.join(PROJECT_DIR, body.get("inventory", "inventory.ini"))
+
+        args = ["ansible-playbook", playbook, "-i", inventory,
+                "-f", str(int(body.get("forks") or DEFAULT_FORKS))]
+        if body.get("extravars"):
+            args += ["-e", json.dumps(body["extravars"])]
+        if body.get("limit"):
+            args += ["--limit", body["limit"]]
+
+        job = {"id": job_id, "playbook": body["playbook"], "submitted": time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+            os.write(self._zygote_fd, (json.dumps({"id": job_id, "args": args}) + "\n").encode())
+            self._gc()
+        # El 202 sale con el pid ya escrito: un DELETE inmediato siempre
+        # encuentra a quién cancelar
+        deadline = time.monotonic() + SPAWN_TIMEOUT_S
+        while not os.path.exists(_job_path(job_id, "pid")):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"zygote did not start job {job_id} in {SPAWN_TIMEOUT_S}s")
+            time.sleep(POLL_S)
+        return job
+
+    def _gc(self):
+        while len(self._jobs) > MAX_JOBS_KEPT:
+            old_id = next(iter(self._jobs))
+            if self.result(old_id) is None:
+                break  # el más viejo sigue corriendo
+            del self._jobs[old_id]
+            shutil.rmtree(os.path.join(JOBS_DIR, old_id), ignore_errors=True)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def result(self, job_id: str):
+        try:
+            with open(_job_path(job_id, "result.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def status(self, job_id: str) -> dict:
+        job = self._jobs[job_id]
+        result = self.result(job_id)
+        if result is None:
+            return {**job, "status": "running", "rc": None}
+        if "stats" not in job:
+            job["stats"] = self._last_stats(job_id)
+        return {
+            **job,
+            "status": "successful" if result["rc"] == 0 else "failed",
+            "rc": result["rc"],
+            "duration_s": round(result["finished"] - job["submitted"], 3),
+        }
+
+    def _last_stats(self, job_id: str) -> dict:
+        stats = {}
+        try:
+            with open(_job_path(job_id, "events.jsonl")) as f:
+                for line in f:
+                    if '"stats"' in line:
+                        event = json.loads(line)
+                        if event.get("event") == "stats":
+                            stats = event.get("hosts", {})
+        except FileNotFoundError:
+            pass
+        return stats
+
+    def cancel(self, job_id: str) -> bool:
+        if self.result(job_id) is not None:
+            return False
+        try:
+            with open(_job_path(job_id, "pid")) as f:
+                os.killpg(int(f.read()), signal.SIGTERM)
+            return True
+        except (FileNotFoundError, ValueError, ProcessLookupError):
+            return False
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+
+class JobHandler(BaseHTTPRequestHandler):
+    store: JobStore = None
+    started = time.time()
+
+    def log_message(self, fmt, *args):
+        pass  # una línea por request ensucia el log del contenedor
+
+    def _send_json(self, code: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        """(job_id, sub) de /jobs[/<id>[/<sub>]], o None si ya respondió 404."""
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+        if parts[:1] != ["jobs"] or len(parts) > 3:
+            self._send_json(404, {"error": "not found"})
+            return None
+        job_id = parts[1] if len(parts) > 1 else None
+        if job_id and self.store.get(job_id) is None:
+            self._send_json(404, {"error": f"job {job_id} not found"})
+            return None
+        return job_id, parts[2] if len(parts) > 2 else None
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            return self._send_json(200, {"status": "ok", "uptime_s": round(time.time() - self.started)})
+        route = self._route()
+        if route is None:
+            return
+        job_id, sub = route
+        if job_id and sub is None:
+            return self._send_json(200, self.store.status(job_id))
+        if job_id and sub == "events":
+            since = int(parse_qs(urlparse(self.path).query).get("since", ["0"])[0])
+            return self._stream_events(job_id, since)
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        route = self._route()
+        if route is None:
+            return
+        if route != (None, None):
+            return self._send_json(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            job = self.store.submit(body)
+        except (KeyError, ValueError) as e:
+            return self._send_json(400, {"error": str(e)})
+        except RuntimeError as e:
+            return self._send_json(503, {"error": str(e)})
+        self._send_json(202, {"id": job["id"], "status": "running"})
+
+    def do_DELETE(self):
+        route = self._route()
+        if route is None:
+            return
+        job_id, sub = route
+        if not job_id or sub is not None:
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {"id": job_id, "cancelled": self.store.cancel(job_id)})
+
+    def _stream_events(self, job_id: str, since: int):
+        """NDJSON hasta que termina el job (HTTP/1.0: el cierre marca el fin)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        path = _job_path(job_id, "events.jsonl")
+        offset, seen, partial = 0, 0, b""
+        try:
+            while True:
+                finished = self.store.result(job_id) is not None
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        f.seek(offset)
+                        chunk = f.read()
+                    offset += len(chunk)
+                    lines = (partial + chunk).split(b"\n")
+                    partial = lines.pop()
+                    out = []
+                    for line in lines:
+                        seen += 1
+                        if seen > since:
+                            out.append(line + b"\n")
+                    if out:
+                        self.wfile.write(b"".join(out))
+                        self.wfile.flush()
+                if finished:
+                    status = self.store.status(job_id)
+                    self.wfile.write(json.dumps({"event": "job_end", "status": status["status"],
+                                                 "rc": status["rc"]}).encode() + b"\n")
+                    return
+                time.sleep(POLL_S)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # el cliente dejó de escuchar; el job sigue
+
+
+def main():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    read_fd, write_fd = os.pipe()
+    # El fork del zygote va antes de crear threads: forkear un proceso
+    # multithread puede dejar locks tomados en el hijo
+    if os.fork() == 0:
+        os.close(write_fd)
+        zygote_main(read_fd)
+    os.close(read_fd)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    JobHandler.store = JobStore(write_fd)
+    server = ThreadingHTTPServer(("0.0.0.0", PORT), JobHandler)
+    server.daemon_threads = True
+    print(f"[job-server] escuchando en :{PORT}, proyecto {PROJECT_DIR}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Progreso de una corrida de Ansible sin juntar su salida en memoria.
+
+Con `-v` un playbook imprime un JSON por tarea y por host: en inventarios
+grandes son megas que no deberían vivir en el worker ni terminar en el error
+de la activity (y de ahí en la historia del workflow). AnsibleProgress recibe
+la salida a medida que llega:
+
+  - on_line(stream, line): líneas del callback default (run_command)
+  - on_event(event): eventos del job server (ansible_jobs.py)
+
+y con cada una:
+
+  - la escribe en un log rotativo (ANSIBLE_LOG_DIR/ansible-output.log,
+    10 MB x 5), con el run_id como prefijo para separar corridas
+  - actualiza contadores (tarea actual, ok/changed/failed por host, las
+    primeras fallas) y los manda como heartbeat details: la UI de Temporal
+    muestra el progreso de la activity mientras corre
+  - imprime solo los eventos relevantes (tareas, changed, fallas)
+
+Al terminar, summary() es lo único que vuelve en el resultado de la
+activity: totales, hosts fallidos, las primeras fallas y la ruta del log.
+
+El mismo archivo está en los casos 03 y 04.
+"""
+import json
+import logging
+import os
+import re
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+LOG_DIR = Path(os.environ.get("ANSIBLE_LOG_DIR", Path(__file__).resolve().parent / "ansible-logs"))
+LOG_FILE = "ansible-output.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+MAX_FAILURES = 5
+MAX_FAILED_HOSTS = 20
+MAX_MSG_CHARS = 300
+
+_TASK_RE = re.compile(r"^(?:TASK|RUNNING HANDLER) \[(?P<task>.*)\]")
+_HOST_RE = re.compile(r"^(?P<status>ok|changed|skipping|fatal|failed|unreachable): \[(?P<host>[^\]]+)\]")
+_RECAP_RE = re.compile(r"^(?P<host>\S+)\s+:\s+(?P<counts>(?:\w+=\d+\s*)+)$")
+# Estados del callback default → contador
+_STATUS = {"ok": "ok", "changed": "changed", "skipping": "skipped", "skipped": "skipped",
+           "fatal": "failed", "failed": "failed", "unreachable": "unreachable"}
+
+_output_logger: Optional[logging.Logger] = None
+
+
+def _logger() -> logging.Logger:
+    global _output_logger
+    if _output_logger is None:
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(LOG_DIR / LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _output_logger = logging.getLogger("ansible.output")
+        _output_logger.setLevel(logging.INFO)
+        _output_logger.propagate = False  # no duplicar en el log del worker
+        _output_logger.addHandler(handler)
+    return _output_logger
+
+
+def _failure_msg(line: str) -> str:
+    """msg/stderr del JSON de `fatal: [host]: FAILED! => {...}`."""
+    _, _, payload = line.partition("=>")
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return payload.strip()[:MAX_MSG_CHARS]
+    msg = data.get("msg") or ""
+    if data.get("stderr"):
+        msg = f"{msg}: {data['stderr']}" if msg else data["stderr"]
+    return str(msg or "failed")[:MAX_MSG_CHARS]
+
+
+class AnsibleProgress:
+    """Contadores, heartbeat y log de una corrida (un router o un batch)."""
+
+    def __init__(self, run_id: str, heartbeat: Optional[Callable[..., None]] = None, echo: bool = True):
+        self.run_id = run_id
+        self._heartbeat = heartbeat
+        self._echo = echo
+        self._log = _logger()
+        self.task: Optional[str] = None
+        self.tasks = 0
+        self.lines = 0
+        self.hosts: Dict[str, Dict[str, int]] = {}
+        self.failures: List[str] = []
+        self.recap: Dict[str, Dict[str, int]] = {}
+        self._last_failed: Optional[tuple] = None
+
+    @property
+    def log_path(self) -> str:
+        return str(LOG_DIR / LOG_FILE)
+
+    # =========================================================================
+    # ENTRADA
+    # =========================================================================
+
+    def on_line(self, stream: str, line: str):
+        """Línea del callback default (stdout/stderr de ansible-playbook)."""
+        self.lines += 1
+        self._log.info("[%s %s] %s", self.run_id, stream, line)
+        if stream != "stdout":
+            return
+        match = _TASK_RE.match(line)
+        if match:
+            return self._task_started(match.group("task"))
+        match = _HOST_RE.match(line)
+        if match:
+            status = _STATUS[match.group("status")]
+            msg = _failure_msg(line) if status in ("failed", "unreachable") else None
+            return self._host_result(match.group("host"), status, msg)
+        if line.strip() == "...ignoring" and self._last_failed:
+            return self._ignored()
+        match = _RECAP_RE.match(line.strip())
+        if match:
+            counts = dict(kv.split("=") for kv in match.group("counts").split())
+            self.recap[match.group("host")] = {k: int(v) for k, v in counts.items()}
+
+    def on_event(self, event: dict):
+        """Evento del callback job_events (job server)."""
+        self.lines += 1
+        self._log.info("[%s event] %s", self.run_id, json.dumps(event))
+        kind = event.get("event")
+        if kind == "task_start":
+            self._task_started(event.get("task", ""))
+        elif kind == "failed" and event.get("ignore_errors"):
+            self._host_result(event.get("host", "?"), "ignored", None)
+        elif kind in _STATUS:
+            status = "changed" if kind == "ok" and event.get("changed") else _STATUS[kind]
+            self._host_result(event.get("host", "?"), status, event.get("msg"))
+        elif kind == "stats":
+            self.recap = event.get("hosts", {})
+
+    def heartbeat(self):
+        """Para pasar como heartbeat a run_command / AnsibleJobClient.run."""
+        if self._heartbeat:
+            self._heartbeat(self.snapshot())
+
+    # =========================================================================
+    # ESTADO
+    # =========================================================================
+
+    def _task_started(self, task: str):
+        self.task = task
+        self.tasks += 1
+        if self._echo:
+            print(f"   [ansible {self.run_id}] TASK [{task}]")
+        self.heartbeat()
+
+    def _host_result(self, host: str, status: str, msg: Optional[str]):
+        counts = self.hosts.setdefault(host, {})
+        counts[status] = counts.get(status, 0) + 1
+        self._last_failed = None
+        if status in ("failed", "unreachable"):
+            self._last_failed = (host, len(self.failures))
+            if len(self.failures) < MAX_FAILURES:
+                self.failures.append(f"{self.task}: {host}: {msg or status}")
+        if self._echo and status in ("changed", "failed", "unreachable"):
+            print(f"   [ansible {self.run_id}] {status}: [{host}]" + (f" {msg}" if msg else ""))
+        if status in ("failed", "unreachable"):
+            self.heartbeat()
+
+    def _ignored(self):
+        # La falla anterior tenía ignore_errors: no cuenta
+        host, index = self._last_failed
+        self.hosts[host]["failed"] -= 1
+        self.hosts[host]["ignored"] = self.hosts[host].get("ignored", 0) + 1
+        if index < len(self.failures):
+            self.failures.pop(index)
+        self._last_failed = None
+
+    def _totals(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for counts in self.hosts.values():
+            for status, n in counts.items():
+                totals[status] = totals.get(status, 0) + n
+        return totals
+
+    def snapshot(self) -> dict:
+        """Heartbeat details: chico y de tamaño fijo sin importar el inventario."""
+        return {
+            "run": self.run_id,
+            "task": self.task,
+            "tasks": self.tasks,
+            "hosts": len(self.hosts),
+            **self._totals(),
+            "last_failure": self.failures[-1] if self.failures else None,
+        }
+
+    def summary(self, rc: Optional[int], duration_s: float, stderr_tail: str = "") -> dict:
+        """Resultado compacto de la corrida (lo que va al resultado/error de la activity)."""
+        if self.recap:
+            failed_hosts = [h for h, s in self.recap.items()
+                            if s.get("failures", s.get("failed", 0)) or s.get("unreachable", 0)]
+        else:
+            failed_hosts = [h for h, s in self.hosts.items() if s.get("failed", 0) or s.get("unreachable", 0)]
+        summary = {
+            "run": self.run_id,
+            "rc": rc,
+            "duration_s": round(duration_s, 1),
+            "tasks": self.tasks,
+            "hosts": len(self.recap or self.hosts),
+            "totals": self._totals(),
+            "failed_hosts": failed_hosts[:MAX_FAILED_HOSTS],
+            "failures": self.failures,
+            "log": self.log_path,
+        }
+        if rc and not self.tasks and stderr_tail:
+            # Ansible no llegó a correr tareas (sintaxis, inventario...): el
+            # motivo está en las últimas líneas de stderr
+            summary["stderr_tail"] = stderr_tail.strip()[-MAX_MSG_CHARS:]
+        return summary
+
+    @staticmethod
+    def describe(summary: dict) -> str:
+        """Una línea para mensajes de error y logs."""
+        totals = summary["totals"]
+        text = (f"rc={summary['rc']} tasks={summary['tasks']} hosts={summary['hosts']} "
+                f"changed={totals.get('changed', 0)} failed={len(summary['failed_hosts'])}")
+        if summary["failures"]:
+            text += " | " + " | ".join(summary["failures"])
+        if summary.get("stderr_tail"):
+            text += f" | {summary['stderr_tail']}"
+        return f"{text} (run {summary['run']}, log: {summary['log']})"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia por playbook de `docker exec ansible-playbook` vs el job
+server del contenedor ansible-runner (ansible_jobs.py).
+
+Por default corre ansible-playbooks/noop.yml (una tarea debug en
+localhost): lo que se mide es el overhead de lanzar el playbook (proceso
+docker, intérprete, imports de Ansible, parseo), no el trabajo del playbook.
+
+Reporta mean/p50/p95 de extremo a extremo (desde que se pide hasta que se
+tiene el resultado) en secuencial y, con --concurrency, con N jobs en
+paralelo.
+
+Necesita el stack del caso levantado (docker-compose up -d) con el job
+server escuchando en --api.
+
+Uso:
+    python benchmark_ansible_jobs.py
+    python benchmark_ansible_jobs.py --runs 30 --concurrency 5
+    python benchmark_ansible_jobs.py --playbook deploy_router.yml --runs 5 --extravars router_id=vrouter-bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from ansible_jobs import AnsibleJobClient
+from command_runner import run_command
+
+
+def _summary(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.mean(ordered) * 1000,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+    }
+
+
+async def measure(runs: int, concurrency: int, op) -> dict:
+    await op()  # warm-up: caché del binario de docker / conexión al job server
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await op()
+            samples.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(runs)))
+    summary = _summary(samples)
+    summary["per_s"] = runs / (time.perf_counter() - wall_start)
+    return summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="docker exec ansible-playbook vs job server")
+    parser.add_argument("--api", default="http://localhost:8700")
+    parser.add_argument("--playbook", default="noop.yml", help="relativo a ansible-playbooks/")
+    parser.add_argument("--extravars", nargs="*", default=[], help="key=value")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--context", default="desktop-linux", help="contexto para el CLI ('' = default)")
+    args = parser.parse_args()
+
+    extravars = dict(kv.split("=", 1) for kv in args.extravars)
+    cli = ["docker"] + (["--context", args.context] if args.context else [])
+    jobs = AnsibleJobClient(args.api)
+
+    async def via_exec():
+        cmd = cli + ["exec", "ansible-runner", "ansible-playbook", f"/runner/project/{args.playbook}",
+                     "-i", "/runner/project/inventory.ini"]
+        for key, value in extravars.items():
+            cmd += ["-e", f"{key}={value}"]
+        result = await run_command(cmd, timeout=300)
+        assert result.returncode == 0, result.stdout[-2000:]
+
+    async def via_job():
+        job = await jobs.run(args.playbook, extravars=extravars, timeout=300)
+        assert job.rc == 0, job.events[-5:]
+
+    print("=" * 80)
+    print(f"BENCHMARK: {args.runs} corridas de {args.playbook}, concurrencia {args.concurrency}")
+    print("=" * 80)
+    try:
+        print(f"job server: {await jobs.health()}")
+        print(f"{'vía':<14}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'jobs/s':>10}")
+        results = {
+            "docker exec": await measure(args.runs, args.concurrency, via_exec),
+            "job server": await measure(args.runs, args.concurrency, via_job),
+        }
+        for via, r in results.items():
+            print(f"{via:<14}{r['mean']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['per_s']:>10.2f}")
+        print(f"→ job server {results['docker exec']['p50'] / results['job server']['p50']:.1f}× "
+              f"más rápido (p50)")
+    finally:
+        await jobs.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
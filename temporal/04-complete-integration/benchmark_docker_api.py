@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia por llamada del CLI de docker vs Docker Engine API (docker_api.py).
+
+Mide las mismas operaciones que hacen las activities:
+  exec → docker exec <container> <cmd>   (ping/wget/ip route de los tests)
+  ps   → docker ps --filter name=...     (verificación de contenedores)
+
+Necesita el stack del caso levantado (docker-compose up -d): por default
+usa el contenedor test-client.
+
+Uso:
+    python benchmark_docker_api.py
+    python benchmark_docker_api.py --container test-client --calls 100 --cmd "ping -c 1 -W 1 192.168.100.10"
+    python benchmark_docker_api.py --context desktop-linux     # CLI con el contexto de Docker Desktop
+"""
+
+import argparse
+import asyncio
+import shlex
+import statistics
+import time
+
+from command_runner import run_command
+from docker_api import docker_api
+
+
+def _summary(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.mean(ordered) * 1000,
+        "p50": ordered[len(ordered) // 2] * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+    }
+
+
+async def measure(calls: int, op) -> dict:
+    await op()  # warm-up: primera conexión del pool / caché del binario
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await op()
+        samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="CLI de docker vs Docker Engine API")
+    parser.add_argument("--container", default="test-client")
+    parser.add_argument("--cmd", default="true", help="comando a ejecutar con exec")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--context", default="", help="contexto para el CLI (ej. desktop-linux)")
+    args = parser.parse_args()
+
+    cli = ["docker"] + (["--context", args.context] if args.context else [])
+    cmd = shlex.split(args.cmd)
+
+    async def cli_exec():
+        result = await run_command(cli + ["exec", args.container, *cmd], timeout=30)
+        assert result.returncode == 0, result.stderr
+
+    async def api_exec():
+        result = await docker_api.exec(args.container, cmd, timeout=30)
+        assert result.returncode == 0, result.stderr
+
+    async def cli_ps():
+        result = await run_command(cli + ["ps", "--filter", f"name={args.container}", "--format", "{{.Names}}"],
+                                   timeout=30)
+        assert args.container in result.stdout
+
+    async def api_ps():
+        assert args.container in await docker_api.container_names(args.container)
+
+    print("=" * 80)
+    print(f"BENCHMARK: {args.calls} llamadas secuenciales por operación, contenedor {args.container}")
+    print("=" * 80)
+    print(f"{'operación':<12}{'vía':<6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    try:
+        for name, via_cli, via_api in (("exec", cli_exec, api_exec), ("ps", cli_ps, api_ps)):
+            results = {"cli": await measure(args.calls, via_cli), "api": await measure(args.calls, via_api)}
+            for via, r in results.items():
+                print(f"{name:<12}{via:<6}{r['mean']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}")
+            print(f"{'':<12}→ API {results['cli']['p50'] / results['api']['p50']:.1f}× más rápido (p50)")
+    finally:
+        await docker_api.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
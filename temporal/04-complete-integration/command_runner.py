@@ -0,0 +1,159 @@
+"""
+Ejecución asíncrona de comandos externos para las activities (docker, ansible-playbook, ip route).
+
+Las activities son `async def` y corren en el event loop del worker: un
+subprocess.run() de un playbook de 5 minutos congela ese loop, y con él
+todas las demás activities y workflow tasks del worker. run_command usa
+asyncio.create_subprocess_exec:
+
+  - stdout/stderr se leen línea por línea mientras el proceso corre;
+    on_line recibe cada línea apenas sale. Con keep_lines=N el resultado
+    guarda solo las últimas N líneas de cada stream (la salida completa
+    queda en on_line, por ejemplo en un log rotativo).
+  - timeout: se termina el proceso (SIGTERM y, si no sale, SIGKILL) y se
+    lanza CommandTimeout.
+  - cancelación: si la activity se cancela se termina el proceso y se
+    re-lanza CancelledError. Temporal entrega la cancelación de una activity
+    en la respuesta a un heartbeat, por eso run_command llama a `heartbeat`
+    periódicamente mientras espera.
+
+Matar el cliente `docker exec` no mata el proceso dentro del contenedor:
+para comandos largos dentro de un contenedor conviene que el propio comando
+tenga su timeout.
+
+Uso:
+    from command_runner import run_command
+
+    result = await run_command(["docker", "exec", "test-client", "ping", "-c", "2", ip], timeout=10)
+    if result.returncode == 0:
+        ...
+"""
+import asyncio
+import collections
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+# Segundos entre SIGTERM y SIGKILL
+TERMINATE_GRACE_S = 5.0
+# Máximo largo de línea (ansible -v imprime JSON de una sola línea por tarea)
+STREAM_LIMIT = 1024 * 1024
+
+
+class CommandTimeout(Exception):
+    """El comando superó su timeout y fue terminado."""
+
+    def __init__(self, cmd: Sequence[str], timeout: float, stdout: str, stderr: str):
+        super().__init__(f"Command timed out after {timeout:g}s: {' '.join(cmd)}")
+        self.cmd = list(cmd)
+        self.timeout = timeout
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+@dataclass
+class CommandResult:
+    """Mismos campos que subprocess.CompletedProcess (text=True), más la duración."""
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration_s: float
+
+
+async def _pump(stream: asyncio.StreamReader, name: str, sink,
+                on_line: Optional[Callable[[str, str], None]]):
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        text = line.decode(errors="replace")
+        sink.append(text)
+        if on_line:
+            on_line(name, text.rstrip("\r\n"))
+
+
+async def _terminate(proc: asyncio.subprocess.Process):
+    if proc.returncode is not None:
+        return
+    try:
+        proc.terminate()
+        await asyncio.wait_for(proc.wait(), TERMINATE_GRACE_S)
+    except ProcessLookupError:
+        return
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+
+
+async def run_command(
+    cmd: Sequence[str],
+    timeout: Optional[float] = None,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    heartbeat: Optional[Callable[[], None]] = None,
+    heartbeat_interval: float = 5.0,
+    keep_lines: Optional[int] = None,
+) -> CommandResult:
+    """
+    Ejecuta `cmd` sin bloquear el event loop y espera a que termine.
+
+    on_line(stream, line) se llama por cada línea de "stdout"/"stderr".
+    heartbeat() se llama cada `heartbeat_interval` segundos mientras el
+    proceso corre (pasar activity.heartbeat dentro de una activity). Un
+    returncode distinto de cero no es una excepción, igual que subprocess.run.
+    keep_lines limita cuánto de stdout/stderr se guarda en el resultado
+    (None: todo).
+    """
+    start = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LIMIT,
+    )
+    stdout = collections.deque(maxlen=keep_lines)
+    stderr = collections.deque(maxlen=keep_lines)
+
+    async def finish() -> int:
+        await asyncio.gather(
+            _pump(proc.stdout, "stdout", stdout, on_line),
+            _pump(proc.stderr, "stderr", stderr, on_line),
+        )
+        return await proc.wait()
+
+    waiter = asyncio.ensure_future(finish())
+    deadline = None if timeout is None else start + timeout
+    try:
+        while not waiter.done():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            step = heartbeat_interval if heartbeat else None
+            if remaining is not None:
+                step = remaining if step is None else min(step, remaining)
+            await asyncio.wait({waiter}, timeout=step)
+            if heartbeat and not waiter.done():
+                heartbeat()
+    except BaseException:
+        # Activity cancelada (o heartbeat falló): no dejar el proceso huérfano
+        waiter.cancel()
+        await _terminate(proc)
+        raise
+
+    if not waiter.done():
+        await _terminate(proc)
+        # Con el proceso muerto los pipes se cierran: se junta lo que quedó
+        try:
+            await asyncio.wait_for(waiter, TERMINATE_GRACE_S)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        raise CommandTimeout(cmd, timeout, "".join(stdout), "".join(stderr))
+
+    return CommandResult(
+        args=list(cmd),
+        returncode=waiter.result(),
+        stdout="".join(stdout),
+        stderr="".join(stderr),
+        duration_s=time.monotonic() - start,
+    )
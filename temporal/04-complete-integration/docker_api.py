@@ -0,0 +1,220 @@
+"""
+Cliente asíncrono del Docker Engine API para las activities.
+
+Cada `docker exec` / `docker ps` / `docker rm` por CLI crea un proceso, carga
+el binario de docker, lee la config y el contexto y abre una conexión nueva
+al daemon: cientos de ms por llamada, más que el ping que se quiere medir.
+DockerClient habla directo con el daemon por su socket unix, reusando las
+conexiones de un pool httpx compartido por todas las activities del worker.
+
+Endpoint (en orden):
+  - DOCKER_HOST=unix:///ruta/docker.sock o tcp://host:2375
+  - ~/.docker/desktop/docker.sock (contexto desktop-linux de Docker Desktop)
+  - /var/run/docker.sock
+
+Las llamadas a exec devuelven el mismo CommandResult que command_runner,
+así el código que antes miraba returncode/stdout/stderr del CLI no cambia.
+
+Uso:
+    from docker_api import docker_api
+
+    result = await docker_api.exec("test-client", ["ping", "-c", "2", ip], timeout=10)
+    names = await docker_api.container_names("ansible-runner")
+    info = await docker_api.inspect_container(router_id)  # None si no existe
+    await docker_api.remove_container(router_id)
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+
+from command_runner import CommandResult, CommandTimeout
+
+API_VERSION = "v1.41"  # Docker Engine 20.10+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+DESKTOP_SOCKET = os.path.expanduser("~/.docker/desktop/docker.sock")
+
+
+class DockerAPIError(Exception):
+    """Respuesta de error del daemon (contenedor inexistente, detenido, etc.)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+def _resolve_endpoint() -> Tuple[Optional[str], str]:
+    """(socket unix o None, base URL)"""
+    host = os.environ.get("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):], "http://docker"
+    if host.startswith("tcp://"):
+        return None, "http://" + host[len("tcp://"):]
+    if os.path.exists(DESKTOP_SOCKET):
+        return DESKTOP_SOCKET, "http://docker"
+    return DEFAULT_SOCKET, "http://docker"
+
+
+def _demux(raw: bytes) -> Tuple[str, str]:
+    """
+    Separa el stream multiplexado de exec (Tty=False): cada frame es un
+    header de 8 bytes [stream, 0, 0, 0, size big-endian] y size bytes.
+    """
+    stdout, stderr = bytearray(), bytearray()
+    i = 0
+    while i + 8 <= len(raw):
+        stream = raw[i]
+        size = struct.unpack(">I", raw[i + 4:i + 8])[0]
+        (stderr if stream == 2 else stdout).extend(raw[i + 8:i + 8 + size])
+        i += 8 + size
+    return stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+class DockerClient:
+    """Cliente del daemon con pool de conexiones (un solo AsyncClient por worker)."""
+
+    def __init__(self, max_connections: int = 20):
+        self._max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            uds, base_url = _resolve_endpoint()
+            limits = httpx.Limits(max_connections=self._max_connections,
+                                  max_keepalive_connections=self._max_connections)
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=uds, limits=limits),
+                base_url=f"{base_url}/{API_VERSION}",
+                # Sin límite de lectura: el stream de exec dura lo que dure el
+                # comando. Sin límite de espera por el pool: con más tests en
+                # paralelo que conexiones, los demás esperan su turno
+                timeout=httpx.Timeout(10.0, read=None, pool=None),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = await self._http().request(method, path, **kwargs)
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise DockerAPIError(response.status_code, message)
+        return response
+
+    # =========================================================================
+    # CONTENEDORES
+    # =========================================================================
+
+    async def list_containers(self, name: Optional[str] = None, all: bool = False) -> List[dict]:
+        """Equivalente a `docker ps [--all] --filter name=...`."""
+        params = {"all": "true" if all else "false"}
+        if name:
+            params["filters"] = json.dumps({"name": [name]})
+        response = await self._request("GET", "/containers/json", params=params)
+        return response.json()
+
+    async def container_names(self, name: Optional[str] = None, all: bool = False) -> List[str]:
+        """Nombres (sin la "/" inicial), como `docker ps --format {{.Names}}`."""
+        containers = await self.list_containers(name, all=all)
+        return [n.lstrip("/") for c in containers for n in c.get("Names", [])]
+
+    async def inspect_container(self, name: str) -> Optional[dict]:
+        """`docker inspect` de un contenedor, o None si no existe."""
+        try:
+            return (await self._request("GET", f"/containers/{name}/json")).json()
+        except DockerAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    async def start_container(self, name: str):
+        """`docker start` (no falla si ya está corriendo)."""
+        await self._request("POST", f"/containers/{name}/start")
+
+    async def connect_network(self, network: str, container: str):
+        """`docker network connect <network> <container>`."""
+        await self._request("POST", f"/networks/{network}/connect", json={"Container": container})
+
+    async def remove_container(self, name: str, force: bool = True) -> bool:
+        """`docker rm -f`. Retorna False si el contenedor no existía."""
+        try:
+            await self._request("DELETE", f"/containers/{name}",
+                                params={"force": "true" if force else "false"})
+            return True
+        except DockerAPIError as e:
+            if e.status == 404:
+                return False
+            raise
+
+    # =========================================================================
+    # EXEC
+    # =========================================================================
+
+    async def exec(self, container: str, cmd: Sequence[str], timeout: Optional[float] = None) -> CommandResult:
+        """
+        `docker exec <container> <cmd>`: create + start (stream) + inspect.
+
+        Lanza DockerAPIError si el contenedor no existe o no está corriendo, y
+        CommandTimeout si el comando supera `timeout` (como en el CLI, el
+        proceso dentro del contenedor no se mata).
+        """
+        start = time.monotonic()
+        response = await self._request("POST", f"/containers/{container}/exec", json={
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "Cmd": list(cmd),
+        })
+        exec_id = response.json()["Id"]
+        raw = bytearray()
+
+        async def read_stream():
+            # El daemon toma la conexión y la cierra cuando termina el
+            # comando: esta conexión no vuelve al pool, el resto sí
+            async with self._http().stream("POST", f"/exec/{exec_id}/start",
+                                           json={"Detach": False, "Tty": False}) as stream:
+                if stream.status_code >= 400:
+                    await stream.aread()
+                    raise DockerAPIError(stream.status_code, stream.text)
+                async for chunk in stream.aiter_raw():
+                    raw.extend(chunk)
+
+        try:
+            await asyncio.wait_for(read_stream(), timeout)
+        except asyncio.TimeoutError:
+            stdout, stderr = _demux(bytes(raw))
+            raise CommandTimeout(["docker", "exec", container, *cmd], timeout, stdout, stderr)
+
+        returncode = await self._exit_code(exec_id)
+        stdout, stderr = _demux(bytes(raw))
+        return CommandResult(
+            args=["docker", "exec", container, *cmd],
+            returncode=returncode,
+            stdout=stdout,
+            stderr=stderr,
+            duration_s=time.monotonic() - start,
+        )
+
+    async def _exit_code(self, exec_id: str) -> int:
+        # El stream puede cerrarse un instante antes de que el daemon
+        # registre el ExitCode
+        for _ in range(50):
+            info = (await self._request("GET", f"/exec/{exec_id}/json")).json()
+            if not info.get("Running") and info.get("ExitCode") is not None:
+                return info["ExitCode"]
+            await asyncio.sleep(0.01)
+        return info.get("ExitCode") if info.get("ExitCode") is not None else -1
+
+
+# Instancia compartida por las activities del worker
+docker_api = DockerClient()
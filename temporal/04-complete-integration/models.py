@@ -1,5 +1,19 @@
-from dataclasses import dataclass
-from typing import Optional, List
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict
+
+@dataclass
+class ConnectivitySource:
+    container: str  # contenedor desde el que se ejecuta el test
+    ip: str
+
+@dataclass
+class ConnectivityMatrix:
+    sources: List[ConnectivitySource]
+    destinations: List[str]
+    test_types: List[str] = field(default_factory=lambda: ["ping", "http"])
+    timeouts: Dict[str, float] = field(default_factory=lambda: {"ping": 10.0, "http": 10.0})
+    max_concurrency: int = 16
+    http_expect: Optional[str] = "Servidor Test"  # texto esperado en la respuesta HTTP
 
 @dataclass
 class NetworkDeploymentRequest:
@@ -7,6 +21,7 @@ class NetworkDeploymentRequest:
     router_ip: str
     software_version: str
     network_config: Optional[dict] = None
+    connectivity_matrix: Optional[ConnectivityMatrix] = None  # None = matriz por defecto
 
 @dataclass
 class ConnectivityTest:
@@ -22,4 +37,41 @@ class DeploymentResult:
     router_deployed: bool
     connectivity_established: bool
     tests: List[ConnectivityTest]
-    summary: str
\ No newline at end of file
+    summary: str
+
+@dataclass
+class ProvisionResult:
+    router_id: str
+    router_ip: str
+    action: str  # "none" (ya estaba), "repaired", "deployed"
+    skipped: bool  # True si no corrió Ansible
+    reasons: List[str] = field(default_factory=list)  # diferencias encontradas
+    fingerprint: Optional[str] = None
+    duration_s: float = 0.0
+    ansible: Optional[dict] = None  # resumen de la corrida (ansible_progress), si hubo
+
+@dataclass
+class FleetDeploymentRequest:
+    routers: List[NetworkDeploymentRequest]
+    child_workflow: str                 # workflow que despliega un router
+    task_queue: Optional[str] = None    # None = la task queue del fleet
+    child_signal: Optional[str] = None  # signal enviado a cada child al iniciarlo
+    max_concurrent: int = 10            # ventana de routers en paralelo
+    canary_size: int = 1                # primer lote; si falla alguno, se aborta
+    max_failure_ratio: float = 0.2      # circuit breaker: fallidos / terminados
+    min_failure_sample: int = 10        # terminados antes de evaluar el ratio
+    continue_as_new_every: int = 200    # routers por ejecución (historia acotada)
+    # Estado que se arrastra entre continue-as-new
+    succeeded: int = 0
+    failed: List[str] = field(default_factory=list)
+    canary_done: bool = False
+    runs: int = 1
+
+@dataclass
+class FleetDeploymentResult:
+    status: str  # "completed", "canary_failed", "circuit_open"
+    total: int
+    succeeded: int
+    failed: List[str]
+    not_started: int
+    runs: int
\ No newline at end of file
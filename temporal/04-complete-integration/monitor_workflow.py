@@ -14,6 +14,7 @@ import asyncio
 import json
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 
 async def get_workflow_status(workflow_id: str) -> dict:
     """
@@ -22,7 +23,7 @@ async def get_workflow_status(workflow_id: str) -> dict:
     Retorna info completa para análisis externo (ej: IA)
     """
     
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect("localhost:7233", data_converter=data_converter())
     
     try:
         # Obtener handle del workflow
@@ -73,7 +74,7 @@ async def list_failed_workflows(limit: int = 10) -> list:
     Útil para enviar a IA y obtener diagnóstico automático.
     """
     
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect("localhost:7233", data_converter=data_converter())
     
     failed_workflows = []
     
@@ -107,7 +108,7 @@ async def monitor_workflow_realtime(workflow_id: str, interval_seconds: int = 5)
     print(f"MONITOREANDO WORKFLOW: {workflow_id}")
     print(f"{'='*80}\n")
     
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect("localhost:7233", data_converter=data_converter())
     
     try:
         handle = client.get_workflow_handle(workflow_id)
@@ -0,0 +1,125 @@
+"""
+Estado deseado de un router: decidir si hay que desplegarlo, repararlo o nada.
+
+Redesplegar un router (docker rm -f + playbook completo) cuesta decenas de
+segundos; un retry de la activity o una re-ejecución del workflow sobre un
+router que ya está bien no debería pagarlo.
+
+El playbook crea el contenedor con labels que describen lo desplegado:
+
+    netdeploy.router_ip         request.router_ip
+    netdeploy.software_version  request.software_version
+    netdeploy.network_config    hash de request.network_config
+    netdeploy.playbook          hash de deploy_router.yml (cambia el playbook → redeploy)
+    netdeploy.fingerprint       hash de todo lo anterior
+
+Los labels se ponen en el `docker run`, antes de conectar las redes y
+verificar el firewall. Por eso la última tarea del playbook escribe el
+fingerprint en COMPLETE_MARKER dentro del contenedor: si falta o es otro, el
+playbook falló o se cortó a mitad. El firewall lo puede cambiar después el
+DAG de Airflow, así que también se compara `iptables -S FORWARD` con
+FIREWALL_RULES.
+
+plan_router() compara el contenedor actual (docker inspect, y con el
+contenedor corriendo la marca y el firewall) con el pedido:
+
+    create    no existe el contenedor
+    recreate  el fingerprint no coincide (los labels no se pueden cambiar
+              en un contenedor existente: se vuelve a desplegar), falta la
+              marca de despliegue completo o el firewall no es el del playbook
+    repair    mismo fingerprint, pero el contenedor está detenido o le falta
+              alguna red: se arranca / se conecta, sin correr Ansible
+    none      ya está en el estado deseado
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from models import NetworkDeploymentRequest
+
+LABEL_PREFIX = "netdeploy."
+FINGERPRINT_LABEL = LABEL_PREFIX + "fingerprint"
+PLAYBOOK = Path(__file__).resolve().parent / "ansible-playbooks" / "deploy_router.yml"
+# Redes a las que el playbook conecta el router (nombres de docker-compose)
+REQUIRED_NETWORKS = (
+    "04-complete-integration_client_net",
+    "04-complete-integration_server_net",
+)
+# Escrita por la última tarea de deploy_router.yml con el fingerprint
+COMPLETE_MARKER = "/etc/netdeploy.done"
+# `iptables -S FORWARD` tras el playbook (ICMP permitido, HTTP bloqueado).
+# Tiene que coincidir con el `docker run` de deploy_router.yml
+FIREWALL_RULES = (
+    "-P FORWARD ACCEPT",
+    "-A FORWARD -p icmp -j ACCEPT",
+    "-A FORWARD -p tcp -m tcp --dport 80 -j DROP",
+)
+
+
+@dataclass
+class RouterPlan:
+    action: str  # "create", "recreate", "repair", "none"
+    reasons: List[str] = field(default_factory=list)
+    start: bool = False  # repair: arrancar el contenedor
+    connect: List[str] = field(default_factory=list)  # repair: redes a conectar
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def desired_labels(request: NetworkDeploymentRequest, playbook: Path = PLAYBOOK) -> Dict[str, str]:
+    """Labels que debería tener el contenedor del router para este pedido."""
+    labels = {
+        LABEL_PREFIX + "router_ip": request.router_ip,
+        LABEL_PREFIX + "software_version": request.software_version,
+        LABEL_PREFIX + "network_config": _digest(
+            json.dumps(request.network_config or {}, sort_keys=True).encode()
+        ),
+        LABEL_PREFIX + "playbook": _digest(playbook.read_bytes()),
+    }
+    labels[FINGERPRINT_LABEL] = _digest(json.dumps(labels, sort_keys=True).encode())
+    return labels
+
+
+def plan_router(container: Optional[dict], labels: Dict[str, str],
+                networks=REQUIRED_NETWORKS, marker: Optional[str] = None,
+                firewall: Optional[List[str]] = None) -> RouterPlan:
+    """
+    Qué falta para llevar `container` (docker inspect, o None) al estado de `labels`.
+
+    marker y firewall son el contenido de COMPLETE_MARKER y las líneas de
+    `iptables -S FORWARD`; solo se comparan con el contenedor corriendo (None
+    en uno detenido: al arrancar, el contenedor vuelve a aplicar el firewall).
+    """
+    if container is None:
+        return RouterPlan("create", ["container missing"])
+
+    current = container.get("Config", {}).get("Labels") or {}
+    if current.get(FINGERPRINT_LABEL) != labels[FINGERPRINT_LABEL]:
+        reasons = [
+            f"{key[len(LABEL_PREFIX):]}: {current.get(key, 'unset')} -> {value}"
+            for key, value in labels.items()
+            if key != FINGERPRINT_LABEL and current.get(key) != value
+        ]
+        return RouterPlan("recreate", reasons or ["fingerprint mismatch"])
+
+    state = container.get("State", {})
+    if state.get("Running"):
+        if marker != labels[FINGERPRINT_LABEL]:
+            return RouterPlan("recreate", ["deployment incomplete (playbook did not finish)"])
+        if firewall is not None and list(firewall) != list(FIREWALL_RULES):
+            return RouterPlan("recreate", [f"firewall drift: {' | '.join(firewall) or 'empty'}"])
+
+    plan = RouterPlan("none")
+    if not state.get("Running"):
+        plan.start = True
+        plan.reasons.append(f"container {state.get('Status', 'not running')}")
+    attached = (container.get("NetworkSettings", {}).get("Networks") or {}).keys()
+    plan.connect = [n for n in networks if n not in attached]
+    plan.reasons += [f"network {n} not connected" for n in plan.connect]
+    if plan.start or plan.connect:
+        plan.action = "repair"
+    return plan
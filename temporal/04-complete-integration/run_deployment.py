@@ -1,6 +1,7 @@
 import asyncio
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 from models import NetworkDeploymentRequest
 
 async def run_connectivity_demo():
@@ -22,7 +23,7 @@ async def run_connectivity_demo():
     
     try:
         # Conectar a Temporal
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect("localhost:7233", data_converter=data_converter())
         print("Conectado a Temporal Server")
         
         # Crear request de despliegue
@@ -1,15 +1,18 @@
 import asyncio
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 from activities import (
     test_client_server_connectivity,
     provision_router_via_ansible_runner,
+    provision_routers_batch,
     wait_for_manual_verification,
     deploy_router_software,
     generate_deployment_report,
     cleanup_failed_deployment
 )
 from workflows import NetworkDeploymentWithConnectivity
+from fleet_workflow import FleetDeploymentWorkflow
 
 async def main():
     """
@@ -28,17 +31,18 @@ async def main():
     
     try:
         # Conectar a Temporal Server
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect("localhost:7233", data_converter=data_converter())
         print("Conectado a Temporal Server (localhost:7233)")
         
         # Crear worker
         worker = Worker(
             client,
             task_queue="caso04-connectivity-queue",
-            workflows=[NetworkDeploymentWithConnectivity],
+            workflows=[NetworkDeploymentWithConnectivity, FleetDeploymentWorkflow],
             activities=[
                 test_client_server_connectivity,
                 provision_router_via_ansible_runner,
+                provision_routers_batch,
                 wait_for_manual_verification,
                 deploy_router_software,
                 generate_deployment_report,
@@ -51,12 +55,14 @@ async def main():
         print("Activities disponibles:")
         print("  - test_client_server_connectivity")
         print("  - provision_router_via_ansible_runner")
+        print("  - provision_routers_batch")
         print("  - deploy_router_software")
         print("  - generate_deployment_report")
         print("  - cleanup_failed_deployment")
         print()
         print("Workflows disponibles:")
         print("  - NetworkDeploymentWithConnectivity")
+        print("  - FleetDeploymentWorkflow")
         print()
         print("="*80)
         print("WORKER INICIADO - Esperando workflows...")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test de command_runner sin Docker ni Temporal: un "playbook" largo simulado
+(un proceso Python que imprime una línea por tarea) corre junto a otras
+"activities" en el mismo event loop, como en el worker.
+
+Verifica que:
+  1. mientras corre el playbook, el loop sigue atendiendo (latencia del
+     ticker baja) y los comandos cortos terminan antes que el playbook
+  2. la salida llega línea por línea, no al final
+  3. la cancelación termina el proceso
+  4. el timeout termina el proceso y lanza CommandTimeout
+Como referencia, repite el caso 1 con subprocess.run (el código anterior).
+
+Uso:
+    python test_command_runner.py
+    python -m pytest test_command_runner.py
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+from command_runner import CommandTimeout, run_command
+
+PLAYBOOK_S = 3.0
+FAKE_PLAYBOOK = [
+    sys.executable, "-u", "-c",
+    "import time\n"
+    f"for i in range(6):\n"
+    f"    print(f'TASK [paso {{i}}] ok: [router]', flush=True)\n"
+    f"    time.sleep({PLAYBOOK_S / 6})\n",
+]
+SHORT_CMD = [sys.executable, "-c", "print('pong')"]
+
+
+async def ticker(stop: asyncio.Event, interval: float = 0.05) -> float:
+    """Otra activity: mide cuánto tarda el loop en volver a atenderla."""
+    worst = 0.0
+    while not stop.is_set():
+        before = time.monotonic()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.monotonic() - before - interval)
+    return worst
+
+
+async def short_activities(n: int) -> list:
+    """Comandos cortos (ping/wget) que llegan mientras corre el playbook."""
+    finished = []
+    for _ in range(n):
+        await asyncio.sleep(0.2)
+        result = await run_command(SHORT_CMD, timeout=10)
+        assert result.returncode == 0 and result.stdout.strip() == "pong"
+        finished.append(time.monotonic())
+    return finished
+
+
+async def scenario(playbook) -> dict:
+    stop = asyncio.Event()
+    start = time.monotonic()
+    tick = asyncio.create_task(ticker(stop))
+    shorts = asyncio.create_task(short_activities(5))
+    # Que el ticker ya esté esperando cuando arranca el playbook
+    await asyncio.sleep(0.1)
+    await playbook()
+    playbook_end = time.monotonic()
+    finished = await shorts
+    stop.set()
+    return {
+        "playbook_s": playbook_end - start,
+        "worst_loop_lag_s": await tick,
+        "shorts_done_during_playbook": sum(t < playbook_end for t in finished),
+    }
+
+
+async def check_concurrent_progress():
+    lines = []
+
+    async def playbook():
+        def on_line(stream, line):
+            lines.append((time.monotonic(), line))
+        result = await run_command(FAKE_PLAYBOOK, timeout=30, on_line=on_line,
+                                   heartbeat=lambda: None, heartbeat_interval=0.5)
+        assert result.returncode == 0, result.stderr
+
+    r = await scenario(playbook)
+    spread = lines[-1][0] - lines[0][0]
+    print(f"run_command:     playbook {r['playbook_s']:.2f}s, peor lag del loop "
+          f"{r['worst_loop_lag_s'] * 1000:.0f}ms, comandos cortos durante el playbook "
+          f"{r['shorts_done_during_playbook']}/5, líneas repartidas en {spread:.2f}s")
+    assert r["worst_loop_lag_s"] < 0.5
+    assert r["shorts_done_during_playbook"] == 5
+    assert len(lines) == 6 and spread > PLAYBOOK_S / 2, "la salida no llegó en streaming"
+
+
+async def blocking_baseline():
+    async def playbook():
+        subprocess.run(FAKE_PLAYBOOK, capture_output=True, text=True, timeout=30)
+
+    r = await scenario(playbook)
+    print(f"subprocess.run:  playbook {r['playbook_s']:.2f}s, peor lag del loop "
+          f"{r['worst_loop_lag_s'] * 1000:.0f}ms, comandos cortos durante el playbook "
+          f"{r['shorts_done_during_playbook']}/5")
+
+
+async def check_cancellation():
+    lines = []
+    task = asyncio.create_task(run_command(FAKE_PLAYBOOK, on_line=lambda s, l: lines.append(l)))
+    await asyncio.sleep(0.5)
+    start = time.monotonic()
+    task.cancel()
+    try:
+        await task
+        raise AssertionError("la tarea no se canceló")
+    except asyncio.CancelledError:
+        pass
+    elapsed = time.monotonic() - start
+    print(f"cancelación:     proceso terminado en {elapsed * 1000:.0f}ms tras {len(lines)} líneas")
+    assert elapsed < 2.0
+
+
+async def check_timeout():
+    start = time.monotonic()
+    try:
+        await run_command(FAKE_PLAYBOOK, timeout=0.7)
+        raise AssertionError("no hubo timeout")
+    except CommandTimeout as e:
+        elapsed = time.monotonic() - start
+        print(f"timeout:         CommandTimeout a los {elapsed:.2f}s, stdout parcial "
+              f"{len(e.stdout.splitlines())} líneas")
+        assert elapsed < 2.0 and "paso 0" in e.stdout
+
+
+# pytest no corre corutinas: cada test abre su propio loop con asyncio.run
+def test_concurrent_progress():
+    asyncio.run(check_concurrent_progress())
+
+
+def test_cancellation():
+    asyncio.run(check_cancellation())
+
+
+def test_timeout():
+    asyncio.run(check_timeout())
+
+
+async def main():
+    print("=" * 80)
+    print("TEST command_runner: activities concurrentes durante un playbook largo")
+    print("=" * 80)
+    await check_concurrent_progress()
+    await blocking_baseline()
+    await check_cancellation()
+    await check_timeout()
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
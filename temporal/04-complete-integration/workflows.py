@@ -1,7 +1,7 @@
 import asyncio
 from datetime import timedelta
 from temporalio import workflow
-from models import NetworkDeploymentRequest, DeploymentResult
+from models import NetworkDeploymentRequest, DeploymentResult, ProvisionResult
 
 @workflow.defn
 class NetworkDeploymentWithConnectivity:
@@ -26,15 +26,21 @@ class NetworkDeploymentWithConnectivity:
             # Step 1: Test inicial
             initial_test = await workflow.execute_activity(
                 "test_client_server_connectivity",
-                "initial_test",
+                args=["initial_test", request.connectivity_matrix],
                 start_to_close_timeout=timedelta(minutes=5)
             )
             
-            # Step 2: Deploy router (sin retry loop)
+            # Step 2: Deploy router (sin retry loop). Idempotente: si el router
+            # ya está en el estado deseado no se corre Ansible
             infra_result = await workflow.execute_activity(
                 "provision_router_via_ansible_runner",
                 request,
-                start_to_close_timeout=timedelta(minutes=10)
+                start_to_close_timeout=timedelta(minutes=10),
+                result_type=ProvisionResult
+            )
+            workflow.logger.info(
+                f"Router {request.router_id}: {infra_result.action} "
+                f"(skipped={infra_result.skipped}, {infra_result.duration_s}s) {infra_result.reasons}"
             )
             
             # Step 3: PAUSA
@@ -54,7 +60,7 @@ class NetworkDeploymentWithConnectivity:
             # Test final
             final_test = await workflow.execute_activity(
                 "test_client_server_connectivity",
-                "final_test",
+                args=["final_test", request.connectivity_matrix],
                 start_to_close_timeout=timedelta(minutes=5)
             )
             
@@ -11,6 +11,7 @@ Ejemplo de cómo construir tu propia UI que:
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from temporalio.client import Client
+from payload_codec import data_converter
 import jwt
 from typing import List
 
@@ -108,7 +109,7 @@ async def list_workflows(token: str, namespace: str = None):
     for ns in namespaces_to_query:
         try:
             print(f"[DEBUG] Consultando namespace: {ns}")
-            client = await Client.connect("localhost:7233", namespace=ns)
+            client = await Client.connect("localhost:7233", namespace=ns, data_converter=data_converter())
             
             count = 0
             async for workflow in client.list_workflows():
@@ -148,7 +149,7 @@ async def get_workflow_detail(workflow_id: str, namespace: str, token: str):
         raise HTTPException(403, f"No tienes acceso a {namespace}")
     
     # Consultar workflow
-    client = await Client.connect("localhost:7233", namespace=namespace)
+    client = await Client.connect("localhost:7233", namespace=namespace, data_converter=data_converter())
     handle = client.get_workflow_handle(workflow_id)
     desc = await handle.describe()
     
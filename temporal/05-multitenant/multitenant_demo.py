@@ -1,6 +1,7 @@
 import asyncio
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 from models import NetworkDeploymentRequest
 
 async def deploy_for_tenant(tenant_id: str, router_number: int):
@@ -9,7 +10,8 @@ async def deploy_for_tenant(tenant_id: str, router_number: int):
     # Conectar al namespace del tenant
     client = await Client.connect(
         "localhost:7233",
-        namespace=tenant_id  # ⭐ Namespace separado
+        namespace=tenant_id,  # ⭐ Namespace separado
+        data_converter=data_converter(),
     )
     
     deployment_request = NetworkDeploymentRequest(
@@ -134,7 +136,7 @@ async def query_tenant_workflows(tenant_id: str):
     print(f"\n🔍 Consultando workflows del tenant: {tenant_id}")
     
     try:
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect("localhost:7233", data_converter=data_converter())
         
         # Listar workflows usando search attributes
         # Nota: Requiere configuración de search attributes en Temporal
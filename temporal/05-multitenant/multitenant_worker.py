@@ -1,6 +1,7 @@
 import asyncio
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 from activities import (
     test_client_server_connectivity,
     provision_router_via_ansible_runner,
@@ -40,7 +41,8 @@ async def main():
             # Conectar al namespace específico del tenant
             client = await Client.connect(
                 "localhost:7233",
-                namespace=tenant_id  # ⭐ Namespace separado
+                namespace=tenant_id,  # ⭐ Namespace separado
+                data_converter=data_converter(),
             )
             
             # Task queue dentro del namespace
@@ -8,6 +8,7 @@ En producción + autenticación = seguridad completa.
 
 import asyncio
 from temporalio.client import Client
+from payload_codec import data_converter
 from workflows import NetworkDeploymentWorkflow
 from models import NetworkDeploymentRequest
 
@@ -25,7 +26,8 @@ async def get_tenant_client(tenant_id: str) -> Client:
     """
     return await Client.connect(
         "localhost:7233",
-        namespace=f"tenant-{tenant_id}"
+        namespace=f"tenant-{tenant_id}",
+        data_converter=data_converter(),
     )
 
 async def start_deployment_for_tenant(user_id: str, router_config: dict):
@@ -5,6 +5,7 @@ Script simple para probar un deployment de un solo tenant.
 import asyncio
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 from models import NetworkDeploymentRequest
 
 async def simple_tenant_demo():
@@ -19,7 +20,7 @@ async def simple_tenant_demo():
     
     try:
         # Conectar a Temporal
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect("localhost:7233", data_converter=data_converter())
         print(f"✅ Conectado a Temporal Server\n")
         
         # Crear request
@@ -7,6 +7,7 @@ import asyncio
 import sys
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 
 
 async def execute_lifecycle_workflow():
@@ -14,7 +15,7 @@ async def execute_lifecycle_workflow():
     print("🚀 Conectando a Temporal Server...")
     
     try:
-        client = await Client.connect('localhost:7233')
+        client = await Client.connect('localhost:7233', data_converter=data_converter())
         print("✅ Conectado a Temporal Server")
         
         workflow_id = f"lifecycle-demo-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -47,7 +48,7 @@ async def execute_quick_test():
     print("🧪 Conectando a Temporal Server...")
     
     try:
-        client = await Client.connect('localhost:7233')
+        client = await Client.connect('localhost:7233', data_converter=data_converter())
         print("✅ Conectado a Temporal Server")
         
         test_id = f"quick-test-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
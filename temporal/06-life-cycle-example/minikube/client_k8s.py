@@ -7,6 +7,7 @@ import asyncio
 import sys
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 
 
 async def execute_lifecycle_workflow(version_id: str = None):
@@ -19,7 +20,7 @@ async def execute_lifecycle_workflow(version_id: str = None):
     
     try:
         # Conectar usando el DNS interno de Kubernetes
-        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233')
+        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233', data_converter=data_converter())
         print("✅ Conectado a Temporal Server")
         
         workflow_id = f"lifecycle-demo-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -65,7 +66,7 @@ async def execute_quick_test(version_id: str = None):
     print("🧪 Conectando a Temporal Server...")
     
     try:
-        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233')
+        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233', data_converter=data_converter())
         print("✅ Conectado a Temporal Server")
         
         test_id = f"quick-test-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -8,6 +8,7 @@ import asyncio
 import sys
 from datetime import datetime
 from temporalio.client import Client
+from payload_codec import data_converter
 
 
 async def execute_versioned_workflow(version: str):
@@ -15,7 +16,7 @@ async def execute_versioned_workflow(version: str):
     print(f"🔒 Conectando a Temporal Server...")
     
     try:
-        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233')
+        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233', data_converter=data_converter())
         print("✅ Conectado a Temporal Server")
         
         workflow_id = f"versioned-{version}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -48,7 +49,7 @@ async def execute_quick_versioned(version: str):
     print(f"🧪 Conectando a Temporal Server...")
     
     try:
-        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233')
+        client = await Client.connect('temporal-frontend-lb.temporal.svc.cluster.local:7233', data_converter=data_converter())
         print("✅ Conectado")
         
         test_id = f"quick-versioned-{version}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
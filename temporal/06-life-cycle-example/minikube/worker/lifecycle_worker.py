@@ -11,6 +11,7 @@ from typing import Optional
 
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 
 # Importar workflows y activities
 from workflows.lifecycle_workflows import LifecycleWorkflow, QuickTestWorkflow
@@ -61,7 +62,8 @@ class LifecycleWorker:
             # Conectar a Temporal
             self.client = await Client.connect(
                 self.temporal_host,
-                namespace=self.namespace
+                namespace=self.namespace,
+                data_converter=data_converter(),
             )
             self.logger.info("✅ Connected to Temporal Server")
             
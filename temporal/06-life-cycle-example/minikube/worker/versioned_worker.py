@@ -11,6 +11,7 @@ from typing import Optional
 
 from temporalio.client import Client
 from temporalio.worker import Worker
+from payload_codec import data_converter
 
 from workflows.lifecycle_workflows import LifecycleWorkflow, QuickTestWorkflow
 from activities.lifecycle_activities import (
@@ -52,7 +53,8 @@ class VersionedWorker:
         try:
             self.client = await Client.connect(
                 self.temporal_host,
-                namespace=self.namespace
+                namespace=self.namespace,
+                data_converter=data_converter(),
             )
             self.logger.info("✅ Connected to Temporal Server")
             
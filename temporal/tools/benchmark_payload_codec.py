@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark de CompressionCodec (payload_codec.py): tamaño y throughput.
+
+Payloads representativos de los casos:
+  lifecycle_result   `result` acumulado de LifecycleWorkflow (caso 06): steps con
+                     worker_info/validación/reporte y worker_versions por chunk
+  deployment_report  report_data de generate_deployment_report (caso 04): la
+                     matriz de tests inicial y final con stdout crudo de ping/wget
+  fleet_request      FleetDeploymentRequest con 200 routers (casos 01–04)
+  small_status       un string de estado (queda bajo el umbral: no se comprime)
+
+Por payload y codec (off, zlib -1/6, zstd 3 si está instalado) reporta bytes,
+ratio y MB/s de encode y decode (MB del payload sin comprimir).
+
+Con --history además corre un workflow que pasa cada payload a una activity
+y lo retorna (input + resultado de activity + resultado del workflow), en el
+test server de Temporal (WorkflowEnvironment.start_time_skipping, no necesita
+un servidor), y compara los bytes de la historia con y sin compresión.
+
+Uso:
+    python tools/benchmark_payload_codec.py
+    python tools/benchmark_payload_codec.py --scale 4 --history
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from temporalio import activity, workflow
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+with workflow.unsafe.imports_passed_through():
+    import temporalio.converter
+    from payload_codec import CompressionCodec, data_converter, zstandard
+
+TASK_QUEUE_NAME = "payload-codec-benchmark"
+
+PING_STDOUT = """PING {dest} ({dest}): 56 data bytes
+64 bytes from {dest}: seq=0 ttl=63 time=0.{a} ms
+64 bytes from {dest}: seq=1 ttl=63 time=0.{b} ms
+
+--- {dest} ping statistics ---
+2 packets transmitted, 2 packets received, 0% packet loss
+round-trip min/avg/max = 0.{a}/0.{b}/0.{b} ms
+"""
+WGET_STDOUT = """<!DOCTYPE html>
+<html><head><title>Servidor Test</title></head>
+<body><h1>Servidor Test - Caso 04</h1>
+<p>Si ves esta página, el router deja pasar HTTP desde {source} hacia {dest}.</p>
+</body></html>
+"""
+
+
+# =============================================================================
+# PAYLOADS REPRESENTATIVOS
+# =============================================================================
+
+def lifecycle_result(scale: int) -> dict:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    worker_info = {
+        "version": "v2.0.0", "hostname": "lifecycle-worker-v2-7d9f8b6c5-x2k4q",
+        "pid": 1, "python_version": "3.11.7", "build_time": "2024-01-01T10:00:00Z",
+        "git_commit": "a1b2c3d4e5f6", "features": ["enhanced_processing", "new_validation", "metrics"],
+    }
+    steps = [{"step": 1, "name": "get_worker_info", "status": "COMPLETED",
+              "worker_info": worker_info, "timestamp": now.isoformat()}]
+    for minute in range(5 * scale):
+        steps.append({
+            "step": 2, "name": "process_chunk", "status": "COMPLETED",
+            "chunk": {"minute": minute + 1, "total": 5 * scale, "worker_version": f"v{1 + minute % 2}.0.0",
+                      "hostname": f"lifecycle-worker-v{1 + minute % 2}-7d9f8b6c5-x2k4q",
+                      "processing_time": 30, "timestamp": (now + timedelta(minutes=minute)).isoformat()},
+            "worker_info": worker_info,
+        })
+    steps.append({"step": 3, "name": "validation", "status": "COMPLETED",
+                  "validation_result": {"valid": True, "checks": {f"check_{i}": "PASSED" for i in range(20)}}})
+    return {
+        "workflow_id": "lifecycle-demo-20240101-120000",
+        "start_time": now.isoformat(),
+        "steps": steps,
+        "worker_versions": [f"v{1 + i % 2}.0.0" for i in range(6 * scale)],
+    }
+
+
+def deployment_report(scale: int) -> dict:
+    sources = [f"192.168.100.{10 + i}" for i in range(4 * scale)]
+    destinations = [f"192.168.200.{10 + i}" for i in range(4)]
+
+    def phase(http_ok: bool) -> dict:
+        tests = []
+        for s_index, source in enumerate(sources):
+            for d_index, dest in enumerate(destinations):
+                tests.append({"test_type": "ping", "source": source, "destination": dest, "success": True,
+                              "duration_ms": 2012 + s_index, "output": PING_STDOUT.format(
+                                  dest=dest, a=100 + s_index * 7 % 900, b=100 + d_index * 13 % 900)})
+                tests.append({"test_type": "http", "source": source, "destination": f"http://{dest}",
+                              "success": http_ok, "duration_ms": 15 + d_index,
+                              "output": WGET_STDOUT.format(source=source, dest=dest) if http_ok else "",
+                              "error": None if http_ok else "wget: download timed out"})
+        return {"phase": "final_test" if http_ok else "initial_test", "tests": tests,
+                "success_count": sum(t["success"] for t in tests), "total_count": len(tests)}
+
+    return {
+        "request": {"router_id": "vrouter-connectivity-001", "router_ip": "192.168.100.2",
+                    "software_version": "frr-8.0"},
+        "initial_test": phase(False),
+        "final_test": phase(True),
+    }
+
+
+def fleet_request(scale: int) -> dict:
+    routers = [{"router_id": f"router-{i:05d}", "router_ip": f"10.0.{i // 256}.{i % 256}",
+                "software_version": "frr-8.0", "network_config": {"vlan": 100 + i % 10, "ospf_area": "0.0.0.0"}}
+               for i in range(200 * scale)]
+    return {"routers": routers, "child_workflow": "NetworkDeploymentWorkflow", "max_concurrent": 50,
+            "canary_size": 5, "max_failure_ratio": 0.2, "continue_as_new_every": 200}
+
+
+def payloads(scale: int) -> dict:
+    return {
+        "lifecycle_result": lifecycle_result(scale),
+        "deployment_report": deployment_report(scale),
+        "fleet_request": fleet_request(scale),
+        "small_status": "Router vrouter-connectivity-001 deployed at 192.168.100.2",
+    }
+
+
+def codecs() -> dict:
+    configs = {
+        "off": CompressionCodec(None),
+        "zlib-1": CompressionCodec("zlib", level=1),
+        "zlib-6": CompressionCodec("zlib", level=6),
+    }
+    if zstandard is not None:
+        configs["zstd-3"] = CompressionCodec("zstd", level=3)
+    return configs
+
+
+# =============================================================================
+# TAMAÑO Y THROUGHPUT
+# =============================================================================
+
+async def _rate(op, raw_bytes: int, min_time: float = 0.3) -> float:
+    """MB/s de `op` (repetida hasta juntar min_time segundos)."""
+    runs, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        await op()
+        runs += 1
+    return raw_bytes * runs / (time.perf_counter() - start) / 1e6
+
+
+async def codec_table(samples: dict):
+    converter = temporalio.converter.default().payload_converter
+    print(f"{'payload':<20}{'codec':<8}{'bytes':>10}{'ratio':>8}{'enc MB/s':>10}{'dec MB/s':>10}")
+    for name, value in samples.items():
+        payload = converter.to_payloads([value])[0]
+        raw = payload.ByteSize()
+        for codec_name, codec in codecs().items():
+            encoded = (await codec.encode([payload]))[0]
+            assert (await codec.decode([encoded]))[0] == payload
+            enc = await _rate(lambda: codec.encode([payload]), raw)
+            dec = await _rate(lambda: codec.decode([encoded]), raw)
+            print(f"{name:<20}{codec_name:<8}{encoded.ByteSize():>10}{raw / encoded.ByteSize():>8.1f}"
+                  f"{enc:>10.0f}{dec:>10.0f}")
+
+
+# =============================================================================
+# HISTORIA
+# =============================================================================
+
+@activity.defn
+async def echo_payload(data: dict) -> dict:
+    return data
+
+
+@workflow.defn
+class PayloadEchoWorkflow:
+    """Input del workflow → input de la activity → resultado → resultado del workflow."""
+
+    @workflow.run
+    async def run(self, data: dict) -> dict:
+        return await workflow.execute_activity(
+            echo_payload, data, start_to_close_timeout=timedelta(seconds=30)
+        )
+
+
+async def history_table(samples: dict):
+    print(f"\n{'payload':<20}{'codec':<8}{'history bytes':>15}{'vs off':>8}")
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        for name, value in samples.items():
+            if not isinstance(value, dict):
+                continue
+            baseline = None
+            for codec_name, codec in codecs().items():
+                config = env.client.config()
+                config["data_converter"] = data_converter(codec)
+                client = Client(**config)
+                async with Worker(client, task_queue=TASK_QUEUE_NAME,
+                                  workflows=[PayloadEchoWorkflow], activities=[echo_payload]):
+                    handle = await client.start_workflow(
+                        PayloadEchoWorkflow.run, value, id=f"codec-bench-{uuid.uuid4().hex[:8]}",
+                        task_queue=TASK_QUEUE_NAME,
+                    )
+                    assert await handle.result() == value
+                    history = await handle.fetch_history()
+                size = sum(event.ByteSize() for event in history.events)
+                baseline = baseline or size
+                print(f"{name:<20}{codec_name:<8}{size:>15}{size / baseline:>8.0%}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del codec de compresión de payloads")
+    parser.add_argument("--scale", type=int, default=1, help="multiplica el tamaño de los payloads")
+    parser.add_argument("--history", action="store_true", help="medir también bytes de historia")
+    args = parser.parse_args()
+
+    samples = payloads(args.scale)
+    print("=" * 80)
+    print(f"PAYLOAD CODEC BENCHMARK (scale {args.scale}, zstd {'sí' if zstandard else 'no instalado'})")
+    print("=" * 80)
+    await codec_table(samples)
+    if args.history:
+        await history_table(samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Codec server para la UI de Temporal (y `temporal workflow show --codec-endpoint`).
+
+Con TEMPORAL_PAYLOAD_CODEC activado los payloads de la historia están
+comprimidos ("binary/zlib" / "binary/zstd") y la UI los muestra como
+binarios. La UI manda los payloads a este servidor y muestra lo que devuelve:
+
+    POST /decode   {"payloads": [...]}  → payloads descomprimidos
+    POST /encode   {"payloads": [...]}  → payloads comprimidos (con el flag del entorno)
+
+Formato: JSON de temporal.api.common.v1.Payloads (metadata y data en
+base64). Responde CORS para los orígenes de --origins (la UI corre en el
+navegador).
+
+Uso:
+    python tools/codec_server.py                       # http://localhost:8888
+    python tools/codec_server.py --port 8888 --origins http://localhost:8233 http://localhost:8080
+
+En la UI: Settings (ícono de engranaje) → Codec Server → http://localhost:8888
+Con la UI en Docker/Kubernetes: TEMPORAL_CODEC_ENDPOINT=http://localhost:8888
+"""
+
+import argparse
+
+from aiohttp import web
+from google.protobuf import json_format
+from temporalio.api.common.v1 import Payloads
+
+from payload_codec import CompressionCodec, codec_from_env
+
+# UI del dev server (temporal server start-dev) y port-forward del caso 06
+DEFAULT_ORIGINS = ["http://localhost:8233", "http://localhost:8080"]
+
+
+def build_app(codec: CompressionCodec, origins) -> web.Application:
+    def cors_headers(request: web.Request) -> dict:
+        origin = request.headers.get("Origin")
+        if origin not in origins:
+            return {}
+        return {
+            "Access-Control-Allow-Origin": origin,
+            "Access-Control-Allow-Methods": "POST",
+            "Access-Control-Allow-Headers": "content-type,x-namespace",
+        }
+
+    def handler(encode: bool):
+        async def handle(request: web.Request) -> web.Response:
+            payloads = json_format.Parse(await request.read(), Payloads())
+            if encode:
+                result = await codec.encode(payloads.payloads)
+            else:
+                result = await codec.decode(payloads.payloads)
+            return web.json_response(
+                text=json_format.MessageToJson(Payloads(payloads=result)),
+                headers=cors_headers(request),
+            )
+        return handle
+
+    async def options(request: web.Request) -> web.Response:
+        return web.Response(headers=cors_headers(request))
+
+    app = web.Application()
+    app.add_routes([
+        web.post("/encode", handler(encode=True)),
+        web.post("/decode", handler(encode=False)),
+        web.options("/encode", options),
+        web.options("/decode", options),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Codec server de compresión para la UI de Temporal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--origins", nargs="*", default=DEFAULT_ORIGINS)
+    args = parser.parse_args()
+
+    codec = codec_from_env()
+    print(f"Codec server en http://{args.host}:{args.port} "
+          f"(encode: {codec.algorithm or 'off'}, decode: zlib/zstd), CORS: {args.origins}")
+    web.run_app(build_app(codec, args.origins), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compresión de payloads de Temporal, compartida por workers y clientes.
+
+Los inputs/resultados de activities y workflows (el `result` acumulado de
+LifecycleWorkflow, el report_data de generate_deployment_report con las
+salidas de ping/wget, la lista de routers de FleetDeploymentWorkflow...) se
+guardan tal cual en la historia. CompressionCodec comprime cada payload que
+supere un umbral antes de que salga del proceso y lo descomprime al leerlo:
+
+  - el payload original (metadata + data) se serializa y se comprime con
+    zlib o zstd; el payload nuevo lleva encoding "binary/zlib" o
+    "binary/zstd"
+  - los payloads chicos (< TEMPORAL_PAYLOAD_CODEC_MIN_BYTES, default 1024)
+    y los que no achican quedan sin tocar
+  - decode siempre reconoce ambos encodings, esté o no activada la
+    compresión: se puede prender o apagar el flag sin romper historias
+    que ya tienen payloads comprimidos
+
+Configuración (la misma en workers y clientes):
+    TEMPORAL_PAYLOAD_CODEC=zlib     # off (default) | zlib | zstd (pip install zstandard)
+
+Uso:
+    from payload_codec import data_converter
+
+    client = await Client.connect("localhost:7233", data_converter=data_converter())
+
+La UI de Temporal muestra los payloads comprimidos como binarios; para
+verlos decodificados, correr tools/codec_server.py y configurarlo como codec
+endpoint de la UI.
+
+El mismo archivo está en temporal/tools y en los casos 01–06.
+"""
+import dataclasses
+import os
+import zlib
+from typing import List, Optional, Sequence
+
+import temporalio.converter
+from temporalio.api.common.v1 import Payload
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional; zlib viene con Python
+    zstandard = None
+
+CODEC_ENV = "TEMPORAL_PAYLOAD_CODEC"
+MIN_BYTES_ENV = "TEMPORAL_PAYLOAD_CODEC_MIN_BYTES"
+DEFAULT_MIN_BYTES = 1024
+ALGORITHMS = ("zlib", "zstd")
+ENCODINGS = {"zlib": b"binary/zlib", "zstd": b"binary/zstd"}
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("zstd payload codec requires the zstandard package (pip install zstandard)")
+
+
+def compress(algorithm: str, data: bytes, level: Optional[int] = None) -> bytes:
+    level = DEFAULT_LEVELS[algorithm] if level is None else level
+    if algorithm == "zlib":
+        return zlib.compress(data, level)
+    _require_zstd()
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def decompress(algorithm: str, data: bytes) -> bytes:
+    if algorithm == "zlib":
+        return zlib.decompress(data)
+    _require_zstd()
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+class CompressionCodec(temporalio.converter.PayloadCodec):
+    """Comprime payloads de al menos `min_bytes`; algorithm=None solo decodifica."""
+
+    def __init__(self, algorithm: Optional[str] = None, min_bytes: int = DEFAULT_MIN_BYTES,
+                 level: Optional[int] = None):
+        if algorithm is not None and algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown payload codec {algorithm!r}, expected one of {ALGORITHMS}")
+        if algorithm == "zstd":
+            _require_zstd()
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.level = level
+        self._by_encoding = {encoding: name for name, encoding in ENCODINGS.items()}
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._encode(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._decode(payload) for payload in payloads]
+
+    def _encode(self, payload: Payload) -> Payload:
+        if self.algorithm is None or payload.ByteSize() < self.min_bytes:
+            return payload
+        raw = payload.SerializeToString()
+        data = compress(self.algorithm, raw, self.level)
+        if len(data) >= len(raw):
+            return payload
+        return Payload(metadata={"encoding": ENCODINGS[self.algorithm]}, data=data)
+
+    def _decode(self, payload: Payload) -> Payload:
+        algorithm = self._by_encoding.get(payload.metadata.get("encoding", b""))
+        if algorithm is None:
+            return payload
+        original = Payload()
+        original.ParseFromString(decompress(algorithm, payload.data))
+        return original
+
+
+def codec_from_env() -> CompressionCodec:
+    algorithm = os.environ.get(CODEC_ENV, "off").strip().lower()
+    return CompressionCodec(
+        algorithm=None if algorithm in ("", "off", "none") else algorithm,
+        min_bytes=int(os.environ.get(MIN_BYTES_ENV, DEFAULT_MIN_BYTES)),
+    )
+
+
+def data_converter(codec: Optional[CompressionCodec] = None) -> temporalio.converter.DataConverter:
+    """Data converter por default de Temporal + CompressionCodec (del entorno si no se pasa)."""
+    return dataclasses.replace(
+        temporalio.converter.default(),
+        payload_codec=codec if codec is not None else codec_from_env(),
+    )